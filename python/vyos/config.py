@@ -65,7 +65,7 @@ In operational mode, all functions return values from the running config.
 
 import re
 import json
-from copy import deepcopy
+from collections import OrderedDict
 
 import vyos.xml
 import vyos.util
@@ -90,6 +90,10 @@ class Config(object):
 
         self._level = []
         self._dict_cache = {}
+        # (path, effective) to the dict of that part of the config, when it
+        # is materialized on its own and not from the root dict
+        self._subtree_cache = OrderedDict()
+        self._subtree_cache_size = 32
         (self._running_config,
          self._session_config) = self._config_source.get_configtree_tuple()
 
@@ -213,9 +217,45 @@ class Config(object):
 
         return config_dict
 
+    def get_cached_dict(self, lpath=[], effective=False):
+        """
+        Returns the dict of the config under lpath, as get_sub_dict would from
+        the root dict: {key: ...} with key the last element of lpath, or {}.
+        When libvyosconfig can copy a subtree, only that part of the config
+        is exported to JSON, otherwise the root dict is used.
+        """
+        if not lpath:
+            return self.get_cached_root_dict(effective)
+
+        if effective:
+            config = self._running_config
+        else:
+            config = self._session_config
+
+        if self._dict_cache.get(effective) or not config or not config.has_subtree():
+            root_dict = self.get_cached_root_dict(effective)
+            return vyos.util.get_sub_dict(root_dict, lpath)
+
+        key = (tuple(lpath), effective)
+        if key in self._subtree_cache:
+            self._subtree_cache.move_to_end(key)
+            return self._subtree_cache[key]
+
+        if config.exists(lpath):
+            subtree = config.get_subtree(lpath, with_node=True)
+            config_dict = json.loads(subtree.to_json())
+        else:
+            config_dict = {}
+
+        self._subtree_cache[key] = config_dict
+        while len(self._subtree_cache) > self._subtree_cache_size:
+            self._subtree_cache.popitem(last=False)
+
+        return config_dict
+
     def get_config_dict(self, path=[], effective=False, key_mangling=None,
                         get_first_key=False, no_multi_convert=False,
-                        no_tag_node_value_mangle=False):
+                        no_tag_node_value_mangle=False, with_defaults=False):
         """
         Args:
             path (str list): Configuration tree path, can be empty
@@ -223,34 +263,39 @@ class Config(object):
             key_mangling=None: mangle dict keys according to regex and replacement
             get_first_key=False: if k = path[:-1], return sub-dict d[k] instead of {k: d[k]}
             no_multi_convert=False: if convert, return single value of multi node as list
+            no_tag_node_value_mangle=False: do not mangle the values of tag nodes
+            with_defaults=False: add the default values of the XML definitions
 
         Returns: a dict representation of the config under path
+
+        The dict is a CopyOnWriteDict sharing its content with the cached
+        config: it can be modified without affecting other callers.
         """
         lpath = self._make_path(path)
-        root_dict = self.get_cached_root_dict(effective)
-        conf_dict = vyos.util.get_sub_dict(root_dict, lpath, get_first_key)
+        conf_dict = self.get_cached_dict(lpath, effective)
+        if lpath:
+            conf_dict = vyos.util.get_sub_dict(conf_dict, lpath[-1:], get_first_key)
 
-        if not key_mangling and no_multi_convert:
-            return deepcopy(conf_dict)
+        if not key_mangling and no_multi_convert and not with_defaults:
+            return vyos.util.CopyOnWriteDict(conf_dict)
 
-        xmlpath = lpath if get_first_key else lpath[:-1]
-
-        if not key_mangling:
-            conf_dict = vyos.xml.multi_to_list(xmlpath, conf_dict)
-            return conf_dict
-
-        if no_multi_convert is False:
-            conf_dict = vyos.xml.multi_to_list(xmlpath, conf_dict)
-
-        if not (isinstance(key_mangling, tuple) and \
+        if key_mangling and not (isinstance(key_mangling, tuple) and \
                 (len(key_mangling) == 2) and \
                 isinstance(key_mangling[0], str) and \
                 isinstance(key_mangling[1], str)):
             raise ValueError("key_mangling must be a tuple of two strings")
 
-        conf_dict = vyos.util.mangle_dict_keys(conf_dict, key_mangling[0], key_mangling[1], abs_path=xmlpath, no_tag_node_value_mangle=no_tag_node_value_mangle)
+        xmlpath = lpath if get_first_key else lpath[:-1]
+
+        # multi node conversion, key mangling and defaults in a single pass
+        conf_dict = vyos.xml.config_dict(xmlpath, conf_dict,
+                                         multi=not no_multi_convert,
+                                         mangle=key_mangling,
+                                         tag_values=no_tag_node_value_mangle,
+                                         with_defaults=with_defaults,
+                                         top_defaults=get_first_key or not lpath)
 
-        return conf_dict
+        return vyos.util.CopyOnWriteDict(conf_dict)
 
     def is_multi(self, path):
         """
@@ -263,7 +308,7 @@ class Config(object):
         Note:
             It also returns False if node doesn't exist.
         """
-        self._config_source.set_level(self.get_level)
+        self._config_source.set_level(self.get_level())
         return self._config_source.is_multi(path)
 
     def is_tag(self, path):
@@ -277,7 +322,7 @@ class Config(object):
         Note:
             It also returns False if node doesn't exist.
         """
-        self._config_source.set_level(self.get_level)
+        self._config_source.set_level(self.get_level())
         return self._config_source.is_tag(path)
 
     def is_leaf(self, path):
@@ -291,7 +336,7 @@ class Config(object):
         Note:
             It also returns False if node doesn't exist.
         """
-        self._config_source.set_level(self.get_level)
+        self._config_source.set_level(self.get_level())
         return self._config_source.is_leaf(path)
 
     def return_value(self, path, default=None):
@@ -17,11 +17,9 @@
 A library for retrieving value dicts from VyOS configs in a declarative fashion.
 """
 import os
-import json
 
 from vyos.util import dict_search
 from vyos.xml import defaults
-from vyos.util import cmd
 
 def retrieve_config(path_hash, base_path, config):
     """
@@ -87,15 +85,18 @@ def retrieve_config(path_hash, base_path, config):
 def dict_merge(source, destination):
     """ Merge two dictionaries. Only keys which are not present in destination
     will be copied from source, anything else will be kept untouched. Function
-    will return a new dict which has the merged key/value pairs. """
-    from copy import deepcopy
-    tmp = deepcopy(destination)
+    will return a new dict which has the merged key/value pairs. Neither source
+    nor destination are copied: the new dict is a CopyOnWriteDict sharing them
+    until it is modified. """
+    from vyos.util import CopyOnWriteDict
+    from vyos.util import copy_on_write
+    tmp = CopyOnWriteDict(destination)
 
     for key, value in source.items():
         if key not in tmp:
-            tmp[key] = value
-        elif isinstance(source[key], dict):
-            tmp[key] = dict_merge(source[key], tmp[key])
+            tmp[key] = copy_on_write(value)
+        elif isinstance(value, dict):
+            tmp[key] = dict_merge(value, tmp[key])
 
     return tmp
 
@@ -166,24 +167,6 @@ def get_removed_vlans(conf, dict):
 
     return dict
 
-def T2665_set_dhcpv6pd_defaults(config_dict):
-    """ Properly configure DHCPv6 default options in the dictionary. If there is
-    no DHCPv6 configured at all, it is safe to remove the entire configuration.
-    """
-    # As this is the same for every interface type it is safe to assume this
-    # for ethernet
-    pd_defaults = defaults(['interfaces', 'ethernet', 'dhcpv6-options', 'pd'])
-
-    # Implant default dictionary for DHCPv6-PD instances
-    if dict_search('dhcpv6_options.pd.length', config_dict):
-        del config_dict['dhcpv6_options']['pd']['length']
-
-    for pd in (dict_search('dhcpv6_options.pd', config_dict) or []):
-        config_dict['dhcpv6_options']['pd'][pd] = dict_merge(pd_defaults,
-            config_dict['dhcpv6_options']['pd'][pd])
-
-    return config_dict
-
 def is_member(conf, interface, intftype=None):
     """
     Checks if passed interface is member of other interface of specified type.
@@ -332,19 +315,14 @@ def get_interface_dict(config, base, ifname=''):
             raise ConfigError('Interface (VYOS_TAGNODE_VALUE) not specified')
         ifname = os.environ['VYOS_TAGNODE_VALUE']
 
-    # retrieve interface default values
-    default_values = defaults(base)
-
-    # We take care about VLAN (vif, vif-s, vif-c) default values later on when
-    # parsing vlans in default dict and merge the "proper" values in correctly,
-    # see T2665.
-    for vif in ['vif', 'vif_s']:
-        if vif in default_values: del default_values[vif]
-
     # setup config level which is extracted in get_removed_vlans()
     config.set_level(base + [ifname])
+    # We have gathered the dict representation of the CLI, but there are
+    # default options which we need to update into the dictionary retrived.
+    # The defaults of tag nodes (vif, vif-s, vif-c, DHCPv6-PD) are added to
+    # each of their instance, and are not added when there is none (T2665).
     dict = config.get_config_dict([], key_mangling=('-', '_'),
-                                  get_first_key=True)
+                                  get_first_key=True, with_defaults=True)
 
     # Check if interface has been removed. We must use exists() as
     # get_config_dict() will always return {} - even when an empty interface
@@ -357,20 +335,6 @@ def get_interface_dict(config, base, ifname=''):
     # Add interface instance name into dictionary
     dict.update({'ifname': ifname})
 
-    # XXX: T2665: When there is no DHCPv6-PD configuration given, we can safely
-    # remove the default values from the dict.
-    if 'dhcpv6_options' not in dict:
-        if 'dhcpv6_options' in default_values:
-            del default_values['dhcpv6_options']
-
-    # We have gathered the dict representation of the CLI, but there are
-    # default options which we need to update into the dictionary
-    # retrived.
-    dict = dict_merge(default_values, dict)
-
-    # XXX: T2665: blend in proper DHCPv6-PD default values
-    dict = T2665_set_dhcpv6pd_defaults(dict)
-
     # Check if we are a member of a bridge device
     bridge = is_member(config, ifname, 'bridge')
     if bridge: dict.update({'is_bridge_member' : bridge})
@@ -406,61 +370,20 @@ def get_interface_dict(config, base, ifname=''):
         else:
             dict['ipv6']['address'].update({'eui64_old': eui64})
 
-    # Implant default dictionary in vif/vif-s VLAN interfaces. Values are
-    # identical for all types of VLAN interfaces as they all include the same
-    # XML definitions which hold the defaults.
     for vif, vif_config in dict.get('vif', {}).items():
-        default_vif_values = defaults(base + ['vif'])
-        # XXX: T2665: When there is no DHCPv6-PD configuration given, we can safely
-        # remove the default values from the dict.
-        if not 'dhcpv6_options' in vif_config:
-            del default_vif_values['dhcpv6_options']
-
-        dict['vif'][vif] = dict_merge(default_vif_values, vif_config)
-        # XXX: T2665: blend in proper DHCPv6-PD default values
-        dict['vif'][vif] = T2665_set_dhcpv6pd_defaults(dict['vif'][vif])
-
         # Check if we are a member of a bridge device
         bridge = is_member(config, f'{ifname}.{vif}', 'bridge')
-        if bridge: dict['vif'][vif].update({'is_bridge_member' : bridge})
+        if bridge: vif_config.update({'is_bridge_member' : bridge})
 
     for vif_s, vif_s_config in dict.get('vif_s', {}).items():
-        default_vif_s_values = defaults(base + ['vif-s'])
-        # XXX: T2665: we only wan't the vif-s defaults - do not care about vif-c
-        if 'vif_c' in default_vif_s_values: del default_vif_s_values['vif_c']
-
-        # XXX: T2665: When there is no DHCPv6-PD configuration given, we can safely
-        # remove the default values from the dict.
-        if not 'dhcpv6_options' in vif_s_config:
-            del default_vif_s_values['dhcpv6_options']
-
-        dict['vif_s'][vif_s] = dict_merge(default_vif_s_values, vif_s_config)
-        # XXX: T2665: blend in proper DHCPv6-PD default values
-        dict['vif_s'][vif_s] = T2665_set_dhcpv6pd_defaults(
-            dict['vif_s'][vif_s])
-
         # Check if we are a member of a bridge device
         bridge = is_member(config, f'{ifname}.{vif_s}', 'bridge')
-        if bridge: dict['vif_s'][vif_s].update({'is_bridge_member' : bridge})
+        if bridge: vif_s_config.update({'is_bridge_member' : bridge})
 
         for vif_c, vif_c_config in vif_s_config.get('vif_c', {}).items():
-            default_vif_c_values = defaults(base + ['vif-s', 'vif-c'])
-
-            # XXX: T2665: When there is no DHCPv6-PD configuration given, we can safely
-            # remove the default values from the dict.
-            if not 'dhcpv6_options' in vif_c_config:
-                del default_vif_c_values['dhcpv6_options']
-
-            dict['vif_s'][vif_s]['vif_c'][vif_c] = dict_merge(
-                    default_vif_c_values, vif_c_config)
-            # XXX: T2665: blend in proper DHCPv6-PD default values
-            dict['vif_s'][vif_s]['vif_c'][vif_c] = T2665_set_dhcpv6pd_defaults(
-                dict['vif_s'][vif_s]['vif_c'][vif_c])
-
             # Check if we are a member of a bridge device
             bridge = is_member(config, f'{ifname}.{vif_s}.{vif_c}', 'bridge')
-            if bridge: dict['vif_s'][vif_s]['vif_c'][vif_c].update(
-                {'is_bridge_member' : bridge})
+            if bridge: vif_c_config.update({'is_bridge_member' : bridge})
 
     # Check vif, vif-s/vif-c VLAN interfaces for removal
     dict = get_removed_vlans(config, dict)
@@ -470,21 +393,8 @@ def get_vlan_ids(interface):
     """
     Get the VLAN ID of the interface bound to the bridge
     """
-    vlan_ids = set()
-
-    bridge_status = cmd('bridge -j vlan show', shell=True)
-    vlan_filter_status = json.loads(bridge_status)
-
-    if vlan_filter_status is not None:
-        for interface_status in vlan_filter_status:
-            ifname = interface_status['ifname']
-            if interface == ifname:
-                vlans_status = interface_status['vlans']
-                for vlan_status in vlans_status:
-                    vlan_id = vlan_status['vlan']
-                    vlan_ids.add(vlan_id)
-
-    return vlan_ids
+    from vyos import netlink
+    return set(netlink.snapshot().vlans(interface))
 
 
 def get_accel_dict(config, base, chap_secrets):
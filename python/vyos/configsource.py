@@ -36,10 +36,35 @@ class ConfigSource:
     def __init__(self):
         self._running_config: ConfigTree = None
         self._session_config: ConfigTree = None
+        self._level = []
 
     def get_configtree_tuple(self):
         return self._running_config, self._session_config
 
+    def set_level(self, path):
+        """
+        Set the *edit level*, that is, a relative config tree path.
+        Once set, all operations will be relative to this path,
+        for example, after ``set_level("system")``, calling
+        ``exists("name-server")`` is equivalent to calling
+        ``exists("system name-server"`` without ``set_level``.
+
+        Args:
+            path (str|list): relative config path
+        """
+        # Make sure there's always a space between default path (level)
+        # and path supplied as method argument
+        # XXX: for small strings in-place concatenation is not a problem
+        if isinstance(path, str):
+            if path:
+                self._level = re.split(r'\s+', path)
+            else:
+                self._level = []
+        elif isinstance(path, list):
+            self._level = path.copy()
+        else:
+            raise TypeError("Level path must be either a whitespace-separated string or a list")
+
     def session_changed(self):
         """
         Returns:
@@ -65,6 +90,36 @@ class ConfigSource:
         """
         raise NotImplementedError(f"function not available for {type(self)}")
 
+    def _definition(self, path):
+        """
+        Returns:
+            if the node at path, relative to the level, is a tag node, a leaf
+            node, and can have multiple values according to the XML definition,
+            None if the path is not part of the XML definition
+        """
+        from vyos.xml import kw
+        from vyos.xml import index
+        from vyos.xml import load_index
+
+        node, value = load_index().lookup(self._level + path.split())
+        if node is None:
+            return None
+        if value:
+            return False, False, False
+        return (node[index.KIND] == kw.tagNode,
+                node[index.KIND] == kw.leafNode,
+                node[index.MULTI])
+
+    def _legacy(self, query, path):
+        """
+        Answer isMulti, isTag or isLeaf for a node not defined in XML, as
+        those from the Perl templates of the vyatta-cfg-* packages
+
+        Returns:
+            False, ConfigSourceSession asks cli-shell-api
+        """
+        return False
+
     def is_multi(self, path):
         """
         Args:
@@ -76,7 +131,10 @@ class ConfigSource:
         Note:
             It also returns False if node doesn't exist.
         """
-        raise NotImplementedError(f"function not available for {type(self)}")
+        definition = self._definition(path)
+        if definition is None:
+            return self._legacy('isMulti', path)
+        return definition[2]
 
     def is_tag(self, path):
         """
@@ -89,7 +147,10 @@ class ConfigSource:
         Note:
             It also returns False if node doesn't exist.
         """
-        raise NotImplementedError(f"function not available for {type(self)}")
+        definition = self._definition(path)
+        if definition is None:
+            return self._legacy('isTag', path)
+        return definition[0]
 
     def is_leaf(self, path):
         """
@@ -102,13 +163,15 @@ class ConfigSource:
         Note:
             It also returns False if node doesn't exist.
         """
-        raise NotImplementedError(f"function not available for {type(self)}")
+        definition = self._definition(path)
+        if definition is None:
+            return self._legacy('isLeaf', path)
+        return definition[1]
 
 class ConfigSourceSession(ConfigSource):
     def __init__(self, session_env=None):
         super().__init__()
         self._cli_shell_api = "/bin/cli-shell-api"
-        self._level = []
         if session_env:
             self.__session_env = session_env
         else:
@@ -163,30 +226,6 @@ class ConfigSourceSession(ConfigSource):
         else:
             return out.decode('ascii')
 
-    def set_level(self, path):
-        """
-        Set the *edit level*, that is, a relative config tree path.
-        Once set, all operations will be relative to this path,
-        for example, after ``set_level("system")``, calling
-        ``exists("name-server")`` is equivalent to calling
-        ``exists("system name-server"`` without ``set_level``.
-
-        Args:
-            path (str|list): relative config path
-        """
-        # Make sure there's always a space between default path (level)
-        # and path supplied as method argument
-        # XXX: for small strings in-place concatenation is not a problem
-        if isinstance(path, str):
-            if path:
-                self._level = re.split(r'\s+', path)
-            else:
-                self._level = []
-        elif isinstance(path, list):
-            self._level = path.copy()
-        else:
-            raise TypeError("Level path must be either a whitespace-separated string or a list")
-
     def session_changed(self):
         """
         Returns:
@@ -253,56 +292,10 @@ class ConfigSourceSession(ConfigSource):
             self.__session_env = save_env
             return(default)
 
-    def is_multi(self, path):
-        """
-        Args:
-            path (str): Configuration tree path
-
-        Returns:
-            True if a node can have multiple values, False otherwise.
-
-        Note:
-            It also returns False if node doesn't exist.
-        """
+    def _legacy(self, query, path):
         try:
             path = " ".join(self._level) + " " + path
-            self._run(self._make_command('isMulti', path))
-            return True
-        except VyOSError:
-            return False
-
-    def is_tag(self, path):
-        """
-         Args:
-            path (str): Configuration tree path
-
-        Returns:
-            True if a node is a tag node, False otherwise.
-
-        Note:
-            It also returns False if node doesn't exist.
-        """
-        try:
-            path = " ".join(self._level) + " " + path
-            self._run(self._make_command('isTag', path))
-            return True
-        except VyOSError:
-            return False
-
-    def is_leaf(self, path):
-        """
-         Args:
-            path (str): Configuration tree path
-
-        Returns:
-            True if a node is a leaf node, False otherwise.
-
-        Note:
-            It also returns False if node doesn't exist.
-        """
-        try:
-            path = " ".join(self._level) + " " + path
-            self._run(self._make_command('isLeaf', path))
+            self._run(self._make_command(query, path))
             return True
         except VyOSError:
             return False
@@ -316,3 +309,14 @@ class ConfigSourceString(ConfigSource):
             self._session_config = ConfigTree(session_config_text) if session_config_text else None
         except ValueError:
             raise ConfigSourceError(f"Init error in {type(self)}")
+
+class ConfigSourceTree(ConfigSource):
+    def __init__(self, running_config=None, session_config=None):
+        """
+        Config source from already parsed ConfigTree objects, for callers
+        keeping trees across sessions (e.g. vyos-configd)
+        """
+        super().__init__()
+
+        self._running_config = running_config
+        self._session_config = session_config
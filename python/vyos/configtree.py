@@ -15,7 +15,7 @@
 import re
 import json
 
-from ctypes import cdll, c_char_p, c_void_p, c_int
+from ctypes import cdll, c_char_p, c_void_p, c_int, c_bool
 
 
 def escape_backslash(string: str) -> str:
@@ -42,7 +42,9 @@ class ConfigTreeError(Exception):
 
 
 class ConfigTree(object):
-    def __init__(self, config_string, libpath='/usr/lib/libvyosconfig.so.0'):
+    def __init__(self, config_string=None, address=None, libpath='/usr/lib/libvyosconfig.so.0'):
+        if config_string is None and address is None:
+            raise TypeError("ConfigTree() requires one of 'config_string' or 'address'")
         self.__config = None
         self.__lib = cdll.LoadLibrary(libpath)
 
@@ -126,6 +128,19 @@ class ConfigTree(object):
         self.__destroy = self.__lib.destroy
         self.__destroy.argtypes = [c_void_p]
 
+        # older versions of libvyosconfig can not copy a subtree
+        try:
+            self.__get_subtree = self.__lib.get_subtree
+            self.__get_subtree.argtypes = [c_void_p, c_char_p, c_bool]
+            self.__get_subtree.restype = c_void_p
+        except AttributeError:
+            self.__get_subtree = None
+
+        if address is not None:
+            self.__config = address
+            self.__version = ''
+            return
+
         config_section, version_section = extract_version(config_string)
         config_section = escape_backslash(config_section)
         config = self.__from_string(config_section.encode())
@@ -281,3 +296,21 @@ class ConfigTree(object):
         else:
             raise ConfigTreeError("Path [{}] doesn't exist".format(path_str))
 
+    def has_subtree(self):
+        return self.__get_subtree is not None
+
+    def get_subtree(self, path, with_node=False):
+        """
+        Returns a copy of the tree under path as a new ConfigTree,
+        holding the node at path itself when with_node is set
+        """
+        check_path(path)
+        if self.__get_subtree is None:
+            raise ConfigTreeError("get_subtree is not supported by libvyosconfig")
+
+        path_str = " ".join(map(str, path)).encode()
+
+        res = self.__get_subtree(self.__config, path_str, with_node)
+        if res is None:
+            raise ConfigTreeError("Path [{}] doesn't exist".format(path_str))
+        return ConfigTree(address=res)
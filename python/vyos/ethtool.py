@@ -13,82 +13,320 @@
 # You should have received a copy of the GNU Lesser General Public
 # License along with this library.  If not, see <http://www.gnu.org/licenses/>.
 
-from vyos.util import popen
+import os
+import json
+import errno
+import socket
+import fcntl
+import struct
+import ctypes
+import tempfile
+
+from vyos.util import read_json
+
+# ethtool(8) operations done in-process with the SIOCETHTOOL ioctl
+
+SIOCETHTOOL = 0x8946
+
+ETHTOOL_GSET = 0x1
+ETHTOOL_GDRVINFO = 0x3
+ETHTOOL_GSTRINGS = 0x1b
+ETHTOOL_GPERMADDR = 0x20
+ETHTOOL_GSSET_INFO = 0x37
+ETHTOOL_GFEATURES = 0x3a
+ETHTOOL_GRINGPARAM = 0x10
+ETHTOOL_SRINGPARAM = 0x11
+ETHTOOL_GPAUSEPARAM = 0x12
+ETHTOOL_SPAUSEPARAM = 0x13
+
+# the "ethtool -K" name of a feature to its (get, set) ioctl command
+_features = {
+    'sg': (0x18, 0x19),
+    'tso': (0x1e, 0x1f),
+    'ufo': (0x21, 0x22),
+    'gso': (0x23, 0x24),
+    'gro': (0x2b, 0x2c),
+}
+
+_ringparam = ('rx_max', 'rx_mini_max', 'rx_jumbo_max', 'tx_max',
+              'rx', 'rx_mini', 'rx_jumbo', 'tx')
+
+_pauseparam = ('autoneg', 'rx', 'tx')
+
+ETH_SS_FEATURES = 4
+ETH_GSTRING_LEN = 32
+
+# the "ethtool -k" name of the offloads to the kernel features they change,
+# the offload can only be changed if one of its features can
+_offloads = {
+    'scatter-gather': ('tx-scatter-gather', 'tx-scatter-gather-fraglist'),
+    'tcp-segmentation-offload': ('tx-tcp-segmentation', 'tx-tcp-ecn-segmentation',
+                                 'tx-tcp-mangleid-segmentation', 'tx-tcp6-segmentation'),
+    'udp-fragmentation-offload': ('tx-udp-fragmentation',),
+    'generic-segmentation-offload': ('tx-generic-segmentation',),
+    'generic-receive-offload': ('rx-gro',),
+    'large-receive-offload': ('rx-lro',),
+}
+
+# the bits of the legacy "supported" link modes to the speed they provide
+_speeds = {
+    0: 10, 1: 10, 2: 100, 3: 100, 4: 1000, 5: 1000, 12: 10000, 15: 2500,
+    17: 1000, 18: 10000, 19: 10000, 21: 20000, 22: 20000, 23: 40000,
+    24: 40000, 25: 40000, 26: 40000, 27: 56000, 28: 56000, 29: 56000,
+    30: 56000,
+}
+
+def _call(ifname, data):
+    """
+    runs the ethtool command in data (a bytes starting with the command)
+    and returns the data as set by the kernel, raises OSError on failure
+    """
+    buffer = ctypes.create_string_buffer(data, len(data))
+    ifreq = struct.pack('16sP', ifname.encode(), ctypes.addressof(buffer))
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        fcntl.ioctl(sock.fileno(), SIOCETHTOOL, ifreq)
+    return buffer.raw
+
+def _ioctl(ifname, command, values=()):
+    """
+    runs an ethtool command, whose structure is made of u32 values, and
+    returns the values the kernel set, raises OSError on failure
+    """
+    data = _call(ifname, struct.pack(f'={1+len(values)}I', command, *values))
+    return struct.unpack(f'={1+len(values)}I', data)[1:]
+
+def get_driver_info(ifname):
+    """
+    returns the driver and bus of the device, and its permanent MAC address
+    {'driver': 'e1000e', 'bus_info': '0000:00:19.0', 'permaddr': '00:..'}
+    """
+    data = _call(ifname, struct.pack('=I', ETHTOOL_GDRVINFO) + bytes(192))
+    text = lambda offset: data[offset:offset+32].split(b'\0', 1)[0].decode()
+    info = {'driver': text(4), 'bus_info': text(100), 'permaddr': ''}
+    try:
+        data = _call(ifname, struct.pack('=II', ETHTOOL_GPERMADDR, 32) + bytes(32))
+        size = struct.unpack_from('=I', data, 4)[0]
+        if any(data[8:8+size]):
+            info['permaddr'] = ':'.join(f'{_:02x}' for _ in data[8:8+size])
+    except OSError:
+        pass
+    return info
+
+def get_fixed_features(ifname):
+    """
+    returns the features of the device (as named by "ethtool -k") and if
+    they are fixed: {'rx-gro': False, 'generic-receive-offload': False, ...}
+    """
+    data = _call(ifname, struct.pack('=IIQI', ETHTOOL_GSSET_INFO, 0, 1 << ETH_SS_FEATURES, 0))
+    count = struct.unpack_from('=I', data, 16)[0]
+
+    data = _call(ifname, struct.pack('=III', ETHTOOL_GSTRINGS, ETH_SS_FEATURES, count)
+                         + bytes(count * ETH_GSTRING_LEN))
+    names = [data[12+i*ETH_GSTRING_LEN:12+(i+1)*ETH_GSTRING_LEN].split(b'\0', 1)[0].decode()
+             for i in range(count)]
+
+    blocks = (count + 31) // 32
+    data = _call(ifname, struct.pack('=II', ETHTOOL_GFEATURES, blocks) + bytes(blocks * 16))
+    fixed = {}
+    for i, name in enumerate(names):
+        if not name:
+            continue
+        available, requested, active, never_changed = \
+            struct.unpack_from('=IIII', data, 8 + (i // 32) * 16)
+        bit = 1 << (i % 32)
+        fixed[name] = not available & bit or bool(never_changed & bit)
+
+    for offload, features in _offloads.items():
+        found = [fixed[_] for _ in features if _ in fixed]
+        if found:
+            fixed[offload] = all(found)
+    return fixed
+
+def get_link_settings(ifname):
+    """
+    returns the link settings of the device, as shown by "ethtool {ifname}"
+    {'speed': 1000, 'duplex': 'full', 'autoneg': True, 'supported': [10, 100, 1000]}
+    """
+    data = _call(ifname, struct.pack('=I', ETHTOOL_GSET) + bytes(40))
+    supported, advertising, speed, duplex, port, phy, transceiver, autoneg = \
+        struct.unpack_from('=IIHBBBBB', data, 4)
+    speed_hi = struct.unpack_from('=H', data, 28)[0]
+    speed = (speed_hi << 16) | speed
+    return {
+        'speed': speed if speed not in (0, 0xFFFF, 0xFFFFFFFF) else None,
+        'duplex': {0: 'half', 1: 'full'}.get(duplex, None),
+        'autoneg': bool(autoneg),
+        'supported': sorted(set(v for k, v in _speeds.items() if supported & (1 << k))),
+    }
+
+def get_feature(ifname, option):
+    """ returns if the offload option (sg, tso, ufo, gso or gro) is on """
+    return bool(_ioctl(ifname, _features[option][0], (0,))[0])
+
+def set_feature(ifname, option, value):
+    """ as "ethtool -K {ifname} {option} {value}", value being on or off """
+    _ioctl(ifname, _features[option][1], (1 if value == 'on' else 0,))
+
+def get_ring_buffers(ifname):
+    """
+    returns the maximum and current size of the ring buffers as a dict
+    {'rx_max': 4096, 'rx': 256, ...}
+    """
+    return dict(zip(_ringparam, _ioctl(ifname, ETHTOOL_GRINGPARAM, (0,) * len(_ringparam))))
+
+def set_ring_buffer(ifname, b_type, b_size):
+    """
+    as "ethtool -G {ifname} {b_type} {b_size}", returns False if the
+    ring buffer already has this size
+    """
+    current = get_ring_buffers(ifname)
+    if current[b_type] == int(b_size):
+        return False
+    current[b_type] = int(b_size)
+    _ioctl(ifname, ETHTOOL_SRINGPARAM, tuple(current[_] for _ in _ringparam))
+    return True
+
+def get_pause(ifname):
+    """ returns the pause parameters as a dict {'autoneg': 1, 'rx': 1, 'tx': 1} """
+    return dict(zip(_pauseparam, _ioctl(ifname, ETHTOOL_GPAUSEPARAM, (0,) * len(_pauseparam))))
+
+def set_pause(ifname, enable):
+    """ as "ethtool --pause {ifname} autoneg {enable} tx {enable} rx {enable}" """
+    value = 1 if enable == 'on' else 0
+    _ioctl(ifname, ETHTOOL_SPAUSEPARAM, (value,) * len(_pauseparam))
 
 class Ethtool:
     """
     Class is used to retrive and cache information about an ethernet adapter
+
+    What the adapter can do does not change, so it is read with the ethtool
+    ioctls only the first time an adapter is seen and kept in a cache under
+    /run, shared by all the commits until the next reboot. The entries are
+    found by driver, bus and permanent MAC address, so a NIC replaced or
+    moved to another slot is probed again.
     """
 
-    # dictionary containing driver featurs, it will be populated on demand and
-    # the content will look like:
+    cache = '/run/vyos-ethtool.json'
+
+    # dictionary containing driver featurs and if they are fixed (can not be
+    # changed), the content will look like:
     # {
-    #   'tls-hw-tx-offload': {'fixed': True, 'on': False},
-    #   'tx-checksum-fcoe-crc': {'fixed': True, 'on': False},
-    #   'tx-checksum-ip-generic': {'fixed': False, 'on': True},
-    #   'tx-checksum-ipv4': {'fixed': True, 'on': False},
-    #   'tx-checksum-ipv6': {'fixed': True, 'on': False},
-    #   'tx-checksum-sctp': {'fixed': True, 'on': False},
-    #   'tx-checksumming': {'fixed': False, 'on': True},
-    #   'tx-esp-segmentation': {'fixed': True, 'on': False},
+    #   'tls-hw-tx-offload': True,
+    #   'tx-checksum-ip-generic': False,
+    #   'generic-receive-offload': False,
     # }
     features = { }
     ring_buffers = { }
+    pause = False
 
     def __init__(self, ifname):
-        # Now populate features dictionaty
-        out, err = popen(f'ethtool -k {ifname}')
-        # skip the first line, it only says: "Features for eth0":
-        for line in out.splitlines()[1:]:
-            if ":" in line:
-                key, value = [s.strip() for s in line.strip().split(":", 1)]
-                fixed = "fixed" in value
-                if fixed:
-                    value = value.split()[0].strip()
-                self.features[key.strip()] = {
-                    "on": value == "on",
-                    "fixed": fixed
-                }
-
-        out, err = popen(f'ethtool -g {ifname}')
-        # We are only interested in line 2-5 which contains the device maximum
-        # ringbuffers
-        for line in out.splitlines()[2:6]:
-            if ':' in line:
-                key, value = [s.strip() for s in line.strip().split(":", 1)]
-                key = key.lower().replace(' ', '_')
-                self.ring_buffers[key] = int(value)
+        found = self.capabilities(ifname)
+        self.features = found['features']
+        self.ring_buffers = found['ring_buffers']
+        self.pause = found['pause']
+
+    @classmethod
+    def _key(cls, ifname):
+        info = get_driver_info(ifname)
+        # virtual devices have no bus, their ifname tells them apart
+        bus = info['bus_info'] or ifname
+        return f"{info['driver']}/{bus}/{info['permaddr']}"
 
+    @classmethod
+    def _probe(cls, ifname):
+        """
+        returns the capabilities of the device, and if they can be cached: a
+        probe failing as the device does not support it (EOPNOTSUPP) is an
+        answer, any other failure may not happen the next time
+        """
+        found = {'features': {}, 'ring_buffers': {}, 'pause': False}
+        complete = True
+        try:
+            found['features'] = get_fixed_features(ifname)
+        except OSError as e:
+            complete &= e.errno == errno.EOPNOTSUPP
+        # We are only interested in the device maximum ringbuffers
+        try:
+            for key, value in get_ring_buffers(ifname).items():
+                if key.endswith('_max'):
+                    found['ring_buffers'][key[:-4]] = value
+        except OSError as e:
+            # Configuration of ring-buffers is not supported on every device
+            complete &= e.errno == errno.EOPNOTSUPP
+        try:
+            get_pause(ifname)
+            found['pause'] = True
+        except OSError as e:
+            complete &= e.errno == errno.EOPNOTSUPP
+        return found, complete
+
+    @classmethod
+    def capabilities(cls, ifname):
+        """ returns the capabilities of the device, probing it if not cached """
+        try:
+            key = cls._key(ifname)
+        except OSError:
+            # not an ethtool device, nothing to cache it with
+            return cls._probe(ifname)[0]
+
+        cached = read_json(cls.cache, {})
+        if key in cached:
+            return cached[key]
+
+        found, complete = cls._probe(ifname)
+        if not complete:
+            # probed again the next time, rather than kept until reboot
+            return found
+
+        # the commits of other interfaces may be writing it too, the last
+        # write may lose an entry, which will then only be probed again
+        cached = read_json(cls.cache, {})
+        cached[key] = found
+        try:
+            # threads share the pid, each needs its own temporary file
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(cls.cache))
+        except OSError:
+            return found
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(cached, f)
+            os.replace(tmp, cls.cache)
+        except OSError:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+        return found
 
     def is_fixed_lro(self):
         # in case of a missing configuration, rather return "fixed". In Ethtool
         # terminology "fixed" means the setting can not be changed by the user.
-        return self.features.get('large-receive-offload', True).get('fixed', True)
+        return self.features.get('large-receive-offload', True)
 
     def is_fixed_gro(self):
         # in case of a missing configuration, rather return "fixed". In Ethtool
         # terminology "fixed" means the setting can not be changed by the user.
-        return self.features.get('generic-receive-offload', True).get('fixed', True)
+        return self.features.get('generic-receive-offload', True)
 
     def is_fixed_gso(self):
         # in case of a missing configuration, rather return "fixed". In Ethtool
         # terminology "fixed" means the setting can not be changed by the user.
-        return self.features.get('generic-segmentation-offload', True).get('fixed', True)
+        return self.features.get('generic-segmentation-offload', True)
 
     def is_fixed_sg(self):
         # in case of a missing configuration, rather return "fixed". In Ethtool
         # terminology "fixed" means the setting can not be changed by the user.
-        return self.features.get('scatter-gather', True).get('fixed', True)
+        return self.features.get('scatter-gather', True)
 
     def is_fixed_tso(self):
         # in case of a missing configuration, rather return "fixed". In Ethtool
         # terminology "fixed" means the setting can not be changed by the user.
-        return self.features.get('tcp-segmentation-offload', True).get('fixed', True)
+        return self.features.get('tcp-segmentation-offload', True)
 
     def is_fixed_ufo(self):
         # in case of a missing configuration, rather return "fixed". In Ethtool
         # terminology "fixed" means the setting can not be changed by the user.
-        return self.features.get('udp-fragmentation-offload', True).get('fixed', True)
+        return self.features.get('udp-fragmentation-offload', True)
 
     def get_rx_buffer(self):
         # Configuration of RX ring-buffers is not supported on every device,
@@ -99,3 +337,6 @@ class Ethtool:
         # Configuration of TX ring-buffers is not supported on every device,
         # thus when it's impossible return None
         return self.ring_buffers.get('tx', None)
+
+    def is_pause_supported(self):
+        return self.pause
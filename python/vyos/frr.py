@@ -63,10 +63,26 @@ Apply the new configuration:
 >>>     print(e)
 >>>     exit(1)
 ```
+
+Apply only the changes made to a loaded configuration (frr-reload is used if
+the commands are refused):
+```
+>>> frr_cfg = FRRConfig()
+>>> frr_cfg.load_configuration('bgpd')
+>>> frr_cfg.modify_section(r'^router bgp \d+$', new_bgp_section)
+>>> frr_cfg.commit_configuration('bgpd')
+{'method': 'delta', 'lines': 3, 'elapsed': 0.012}
+```
 """
 
 import tempfile
 import re
+import socket
+import threading
+import time
+from bisect import bisect_left
+from bisect import insort
+from fractions import Fraction
 from vyos import util
 from vyos.util import chown
 from vyos.util import cmd
@@ -90,6 +106,9 @@ path_vtysh = '/usr/bin/vtysh'
 path_frr_reload = '/usr/lib/frr/frr-reload.py'
 path_config = '/run/frr'
 
+# set once FRR was changed, and so must be saved
+_unsaved = False
+
 
 class FrrError(Exception):
     pass
@@ -120,6 +139,240 @@ class ConfigSectionNotFound(FrrError):
     pass
 
 
+# the vty socket of a daemon can not be used, vtysh is used instead
+_unavailable = (FileNotFoundError, ConnectionRefusedError, PermissionError)
+
+
+class Vty:
+    """
+    A connection to the vty socket of a FRR daemon, as used by vtysh:
+    a command is sent terminated by a NUL, the daemon answers with the output
+    of the command, three NUL and the status of the command (0 on success)
+    """
+    def __init__(self, daemon, timeout):
+        self.daemon = daemon
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.socket.settimeout(timeout)
+        try:
+            self.socket.connect(os.path.join(path_config, f'{daemon}.vty'))
+        except OSError:
+            self.socket.close()
+            raise
+        # the number of commands handed to the daemon
+        self.sent = 0
+        # the connection may start in view mode, where enable is needed
+        self.run('enable')
+
+    def run(self, command):
+        """ returns the status and output of the command """
+        self.socket.sendall(command.encode() + b'\0')
+        self.sent += 1
+        data = bytearray()
+        while len(data) < 4 or data[-4:-1] != b'\0\0\0':
+            chunk = self.socket.recv(65536)
+            if not chunk:
+                raise ConnectionResetError(f'connection to {self.daemon} closed')
+            data += chunk
+        return data[-1], data[:-4].decode(errors='replace')
+
+    def close(self):
+        self.socket.close()
+
+
+class VtyPool:
+    """
+    The connections to the vty sockets of the FRR daemons, kept open to be
+    reused, with at most size commands run at the same time for a daemon
+    """
+    size = 2
+    timeout = 60
+
+    def __init__(self, size=0, timeout=0):
+        self.size = size or self.size
+        self.timeout = timeout or self.timeout
+        self._lock = threading.Lock()
+        # daemon to the connections not in use and to the slots available
+        self._idle = {}
+        self._slots = {}
+
+    def run(self, daemon, commands, configure=False):
+        """
+        runs the commands in a connection to daemon, in configuration mode
+        if configure is set, stopping at the first failing command
+        returns the status and the output of the commands run
+        """
+        with self._lock:
+            slots = self._slots.setdefault(daemon, threading.BoundedSemaphore(self.size))
+        if not slots.acquire(timeout=self.timeout):
+            raise TimeoutError(f'no connection to {daemon} available')
+
+        try:
+            with self._lock:
+                idle = self._idle.setdefault(daemon, [])
+                vty = idle.pop() if idle else None
+
+            if vty is not None:
+                sent = vty.sent
+                try:
+                    status, output = self._run(vty, commands, configure)
+                except (BrokenPipeError, ConnectionResetError):
+                    vty.close()
+                    # the daemon was restarted since the connection was last
+                    # used and refused the first command: nothing was run,
+                    # it is run again on a new one
+                    if vty.sent != sent:
+                        raise
+                    vty = None
+                except OSError:
+                    # a command may have been run (or still be running on a
+                    # timeout), it must not be run a second time
+                    vty.close()
+                    raise
+
+            if vty is None:
+                vty = Vty(daemon, self.timeout)
+                try:
+                    status, output = self._run(vty, commands, configure)
+                except OSError:
+                    vty.close()
+                    raise
+
+            with self._lock:
+                self._idle[daemon].append(vty)
+        finally:
+            slots.release()
+
+        return status, ''.join(output)
+
+    @staticmethod
+    def _run(vty, commands, configure):
+        status, output = 0, []
+        if configure:
+            status, _ = vty.run('configure terminal')
+        for command in commands:
+            if status:
+                break
+            status, answer = vty.run(command)
+            output.append(answer)
+        if configure:
+            vty.run('end')
+        return status, output
+
+    def close(self):
+        """ closes the connections not in use """
+        with self._lock:
+            for connections in self._idle.values():
+                for vty in connections:
+                    vty.close()
+            self._idle = {}
+
+
+_pool = VtyPool()
+
+
+class ConfigCache:
+    """
+    The running configuration of the daemons, read once and then kept as
+    committed by FRRConfig, for the scripts of a commit not to read it again.
+
+    The generation of a daemon is increased each time its configuration is
+    changed, a configuration is only kept when it was changed from the cached
+    one by the same FRRConfig, and forgotten when changed by any other means.
+    daemon None stands for the integrated configuration of all the daemons.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        # daemon to the generation and lines of its configuration
+        self._configs = {}
+        self._generations = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, daemon):
+        """ returns the generation and the lines of the configuration of daemon """
+        with self._lock:
+            generation = self._generations.get(daemon, 0)
+            cached = self._configs.get(daemon, None)
+            if cached is not None and cached[0] == generation:
+                self.hits += 1
+                return cached
+            self.misses += 1
+
+        lines = tuple(get_configuration(daemon=daemon).split('\n'))
+
+        with self._lock:
+            # not kept if changed while being read
+            if self._generations.get(daemon, 0) == generation:
+                self._configs[daemon] = (generation, lines)
+        return generation, lines
+
+    def changed(self, daemon):
+        """ the configuration of daemon was changed, returns its generation """
+        with self._lock:
+            # a daemon read but never changed has no generation yet
+            daemons = set(self._generations) | set(self._configs) | {daemon, None}
+            if daemon is not None:
+                daemons = (daemon, None)
+            for name in daemons:
+                self._generations[name] = self._generations.get(name, 0) + 1
+                self._configs.pop(name, None)
+            return self._generations[daemon]
+
+    def update(self, daemon, generation, lines):
+        """
+        keeps lines as the configuration of daemon if at generation,
+        no other change being made since, returns if it was kept
+        """
+        with self._lock:
+            if self._generations.get(daemon, 0) != generation:
+                return False
+            self._configs[daemon] = (generation, tuple(lines))
+            return True
+
+    def invalidate(self):
+        """ forgets all the configurations and clears the counters """
+        with self._lock:
+            self._configs = {}
+            self.hits = 0
+            self.misses = 0
+
+    def statistics(self):
+        return {'hits': self.hits, 'misses': self.misses}
+
+
+_cache = ConfigCache()
+
+
+def _changed(daemon):
+    """ records that the configuration of daemon (None for all) was changed """
+    global _unsaved
+    _unsaved = True
+    return _cache.changed(daemon or None)
+
+
+def changed(daemon=None):
+    """
+    to call after changing the configuration of daemon (None for all) with
+    vtysh rather than this module, so it is read again and saved
+    """
+    _changed(daemon)
+
+
+def invalidate():
+    """
+    to call when the configuration of FRR may have been changed by other means
+    than this module, for example at the start of a commit
+    the connections to the daemons are closed, as they may have been restarted
+    """
+    _cache.invalidate()
+    _pool.close()
+
+
+def cache_statistics():
+    """ returns how many configurations loaded came from the cache (hits) or FRR """
+    return _cache.statistics()
+
+
 def get_configuration(daemon=None, marked=False):
     """ Get current running FRR configuration
     daemon:  Collect only configuration for the specified FRR daemon,
@@ -132,17 +385,28 @@ def get_configuration(daemon=None, marked=False):
     if daemon and daemon not in _frr_daemons:
         raise ValueError(f'The specified daemon type is not supported {repr(daemon)}')
 
-    cmd = f"{path_vtysh} -c 'show run'"
+    config = None
     if daemon:
-        cmd += f' -d {daemon}'
+        try:
+            # the daemon does not add any header over its socket
+            code, config = _pool.run(daemon, ['show running-config'])
+            if code:
+                raise OSError(code, config)
+        except _unavailable as e:
+            LOG.debug('get_configuration: using vtysh, %s', e)
+
+    if config is None:
+        cmd = f"{path_vtysh} -c 'show run'"
+        if daemon:
+            cmd += f' -d {daemon}'
 
-    output, code = util.popen(cmd, stderr=util.STDOUT)
-    if code:
-        raise OSError(code, output)
+        output, code = util.popen(cmd, stderr=util.STDOUT)
+        if code:
+            raise OSError(code, output)
 
-    config = output.replace('\r', '')
-    # Remove first header lines from FRR config
-    config = config.split("\n", 3)[-1]
+        config = output.replace('\r', '')
+        # Remove first header lines from FRR config
+        config = config.split("\n", 3)[-1]
     # Mark the configuration with end tags
     if marked:
         config = mark_configuration(config)
@@ -198,10 +462,12 @@ def reload_configuration(config, daemon=None):
     cmd += f' {f.name}'
 
     LOG.debug(f'reload_configuration: Executing command against frr-reload: "{cmd}"')
+    _changed(daemon)
     output, code = util.popen(cmd, stderr=util.STDOUT)
     f.close()
-    for i, e in enumerate(output.split('\n')):
-        LOG.debug(f'frr-reload output: {i:3} {e}')
+    if LOG.isEnabledFor(logging.DEBUG):
+        for i, e in enumerate(output.split('\n')):
+            LOG.debug('frr-reload output: %3d %s', i, e)
     if code == 1:
         raise CommitError(f'Configuration FRR failed while commiting code, please enabling debugging to examine logs')
     elif code:
@@ -210,24 +476,89 @@ def reload_configuration(config, daemon=None):
     return output
 
 
+def push_configuration(lines, daemon=None):
+    """ Apply configuration commands in a single vtysh session
+    Unlike reload_configuration() only the commands given are run, the running
+    configuration is not read back and compared.
+
+    lines:   list of commands, as in the configuration, a line entering a
+             context (such as "router bgp 65000") is followed by the commands
+             for the context, indented, and "exit"
+    daemon:  Apply the commands to the specified FRR daemon,
+             supplying daemon=None applies to all the daemons
+    return:  The output of vtysh
+    """
+    if daemon and daemon not in _frr_daemons:
+        raise ValueError(f'The specified daemon type is not supported {repr(daemon)}')
+
+    _changed(daemon)
+
+    if daemon:
+        try:
+            code, output = _pool.run(daemon, [_.strip() for _ in lines], configure=True)
+            if code:
+                raise ConfigurationNotValid(f'Configuration FRR failed: {repr(output)}')
+            return output
+        except _unavailable as e:
+            LOG.debug('push_configuration: using vtysh, %s', e)
+
+    f = tempfile.NamedTemporaryFile('w')
+    f.write('\n'.join(lines) + '\n')
+    f.flush()
+
+    cmd = f'{path_vtysh}'
+    if daemon:
+        cmd += f' -d {daemon}'
+    cmd += f' -f {f.name}'
+
+    LOG.debug('push_configuration: Executing command against vtysh: "%s"', cmd)
+    output, code = util.popen(cmd, stderr=util.STDOUT)
+    f.close()
+    if code:
+        raise ConfigurationNotValid(f'Configuration FRR failed: {repr(output)}')
+
+    return output.replace('\r', '')
+
+
 def save_configuration():
     """Save FRR configuration to /run/frr/config/frr.conf
-       It save configuration on each commit. T3217
+       It save configuration on each commit where FRR was changed. T3217
     """
+    global _unsaved
+    if not _unsaved:
+        LOG.debug('save_configuration: FRR configuration not changed')
+        return
 
     cmd(f'{path_vtysh} -n -w')
+    _unsaved = False
 
     return
 
 
-def execute(command):
+def execute(command, daemon=None):
     """ Run commands inside vtysh
     command:  str containing commands to execute inside a vtysh session
+    daemon:   Run the command on the specified FRR daemon only, over its
+              vty socket, supplying daemon=None runs it with vtysh
     """
     if not isinstance(command, str):
         raise ValueError(f'command needs to be a string: {repr(command)}')
 
+    if daemon and daemon not in _frr_daemons:
+        raise ValueError(f'The specified daemon type is not supported {repr(daemon)}')
+
+    if daemon:
+        try:
+            code, output = _pool.run(daemon, [command])
+            if code:
+                raise OSError(code, output)
+            return output
+        except _unavailable as e:
+            LOG.debug('execute: using vtysh, %s', e)
+
     cmd = f"{path_vtysh} -c '{command}'"
+    if daemon:
+        cmd += f' -d {daemon}'
 
     output, code = util.popen(cmd, stderr=util.STDOUT)
     if code:
@@ -253,6 +584,17 @@ def configure(lines, daemon=False):
     if daemon and daemon not in _frr_daemons:
         raise ValueError(f'The specified daemon type is not supported {repr(daemon)}')
 
+    _changed(daemon)
+
+    if daemon:
+        try:
+            code, output = _pool.run(daemon, lines, configure=True)
+            if code:
+                raise ConfigurationNotValid(f'Configuration FRR failed: {repr(output)}')
+            return output
+        except _unavailable as e:
+            LOG.debug('configure: using vtysh, %s', e)
+
     cmd = f'{path_vtysh}'
     if daemon:
         cmd += f' -d {daemon}'
@@ -339,26 +681,25 @@ def _find_first_block(config, start_pattern, stop_pattern, start_at=0):
     On a successful match it continues the search for the regex <stop_pattern> until it is found.
     After a successful run a set is returned containing the start and stop line numbers.
     '''
-    LOG.debug(f'_find_first_block: find start={repr(start_pattern)} stop={repr(stop_pattern)} start_at={start_at}')
+    LOG.debug('_find_first_block: find start=%r stop=%r start_at=%d', start_pattern, stop_pattern, start_at)
+    start = re.compile(start_pattern)
+    stop = re.compile(stop_pattern)
     _start = None
     for i, element in enumerate(config[start_at:], start=start_at):
-        # LOG.debug(f'_find_first_block: running line {i:3} "{element}"')
         if not _start:
-            if not re.match(start_pattern, element):
-                LOG.debug(f'_find_first_block: no match     {i:3} "{element}"')
+            if not start.match(element):
                 continue
             _start = i
-            LOG.debug(f'_find_first_block: Found start  {i:3} "{element}"')
+            LOG.debug('_find_first_block: Found start  %3d "%s"', i, element)
             continue
 
-        if not re.match(stop_pattern, element):
-            LOG.debug(f'_find_first_block: no match     {i:3} "{element}"')
+        if not stop.match(element):
             continue
 
-        LOG.debug(f'_find_first_block: Found stop   {i:3} "{element}"')
+        LOG.debug('_find_first_block: Found stop   %3d "%s"', i, element)
         return (_start, i)
 
-    LOG.debug('_find_first_block: exit start={repr(start_pattern)} stop={repr(stop_pattern)} start_at={start_at}')
+    LOG.debug('_find_first_block: exit start=%r stop=%r start_at=%d', start_pattern, stop_pattern, start_at)
     return None
 
 
@@ -373,13 +714,13 @@ def _find_first_element(config, pattern, start_at=0):
     TODO: for now it returns -1 on a no-match because 0 also returns as False
     TODO: that means that we can not use False matching to tell if its
     '''
-    LOG.debug(f'_find_first_element: find start="{pattern}" start_at={start_at}')
+    LOG.debug('_find_first_element: find start="%s" start_at=%d', pattern, start_at)
+    regex = re.compile(pattern + '$')
     for i, element in enumerate(config[start_at:], start=0):
-        if re.match(pattern + '$', element):
-            LOG.debug(f'_find_first_element: Found stop {i:3} "{element}"')
+        if regex.match(element):
+            LOG.debug('_find_first_element: Found stop %3d "%s"', i, element)
             return i
-        LOG.debug(f'_find_first_element: no match   {i:3} "{element}"')
-    LOG.debug(f'_find_first_element: Did not find any match, exiting')
+    LOG.debug('_find_first_element: Did not find any match, exiting')
     return -1
 
 
@@ -395,12 +736,346 @@ def _find_elements(config, pattern, start_at=0):
     return [i for i, element in enumerate(config[start_at:], start=0) if re.match(pattern + '$', element)]
 
 
+def _literal(pattern):
+    """
+    returns the text every match of the regex pattern (without alternatives)
+    starts with, which is empty if it can not be told
+    """
+    text = ''
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c == '\\':
+            if i + 1 >= len(pattern) or pattern[i+1].isalnum():
+                # \d, \S, ... are not literals
+                break
+            c = pattern[i+1]
+            i += 2
+        elif c in '.^$*+?{}[]|()':
+            break
+        else:
+            i += 1
+        # the character is optional
+        if i < len(pattern) and pattern[i] in '*?{':
+            break
+        text += c
+    return text
+
+
+def _split(pattern, separator):
+    """ split the regex pattern on separator when not escaped, grouped or in a class """
+    parts = []
+    depth = 0
+    klass = False
+    start = 0
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c == '\\':
+            i += 2
+            continue
+        if klass:
+            klass = c != ']'
+        elif c == '[':
+            klass = True
+        elif c == '(':
+            depth += 1
+        elif c == ')':
+            depth -= 1
+            if depth < 0:
+                return parts, pattern[start:i], pattern[i+1:]
+        elif c == separator and not depth:
+            parts.append(pattern[start:i])
+            start = i + 1
+        i += 1
+    return parts, pattern[start:], ''
+
+
+def _prefixes(pattern):
+    """
+    returns the texts a line matching the regex pattern must start with,
+    one for each alternative, or None if it can not be told
+    """
+    alternatives, last, _ = _split(pattern, '|')
+    found = []
+    for alternative in alternatives + [last]:
+        if alternative.startswith('^'):
+            alternative = alternative[1:]
+        if alternative.startswith('('):
+            inner = alternative[1:]
+            if inner.startswith('?:'):
+                inner = inner[2:]
+            elif inner.startswith('?'):
+                return None
+            parts, inner_last, rest = _split(inner, '|')
+            # the group is optional
+            if rest[:1] in ('*', '?', '{'):
+                return None
+            inner = '|'.join(parts + [inner_last])
+            prefixes = _prefixes(inner)
+            if prefixes is None:
+                return None
+            found.extend(prefixes)
+            continue
+        text = _literal(alternative)
+        if not text:
+            return None
+        found.append(text)
+    return found
+
+
+# lines leaving a context, or separating sections, which are not configuration
+_exits = ('exit', 'exit-address-family', 'exit-vrf', 'exit-vnc', 'end')
+
+# commands setting a value, replaced when set again: the old one is not removed
+# as "no neighbor 192.0.2.1 remote-as 65001" would remove the whole neighbor
+_overrides = re.compile(r'(neighbor \S+ remote-as|(bgp |ospf )?router-id|hostname) ')
+
+# sections which can not be removed with "no", their content is removed instead
+_kept = ('interface ',)
+
+# lines defining a BGP neighbor (or peer-group): removing it removes every
+# "neighbor X ..." line, which can then not be removed on their own
+_neighbor = re.compile(r'neighbor (\S+) (interface (v6only )?)?(remote-as|peer-group)\b')
+
+
+def _tree(blocks):
+    """
+    returns the lines of the blocks (lists of lines) as a tree using the
+    indentation, {line: {indented lines: {...}}}
+    """
+    tree = {}
+    for lines in blocks:
+        stack = [(-1, tree)]
+        for line in lines:
+            text = line.strip()
+            if not text or text.startswith('!') or text in _exits:
+                continue
+            indent = len(line) - len(line.lstrip())
+            while stack[-1][0] >= indent:
+                stack.pop()
+            inner = stack[-1][1].setdefault(text, {})
+            stack.append((indent, inner))
+    return tree
+
+
+def _negate(line):
+    if line.startswith('no '):
+        return line[3:]
+    return f'no {line}'
+
+
+def _delta(old, new, depth=0, gone=frozenset()):
+    """
+    returns the vtysh commands changing the configuration tree old into new,
+    the removals first, each context entered is left with "exit"
+    gone are the BGP neighbors removed by an enclosing context
+    """
+    indent = ' ' * depth
+    lines = []
+
+    replaced = set()
+    for text in new:
+        match = _overrides.match(text)
+        if match and text not in old:
+            replaced.add(match.group(0))
+
+    defined = set(match.group(1) for match in map(_neighbor.match, new) if match)
+    removed = set(match.group(1) for match in map(_neighbor.match, old)
+                  if match and match.group(1) not in defined)
+    negated = set()
+
+    for text, inner in old.items():
+        if text in new:
+            continue
+        match = _overrides.match(text)
+        if match and match.group(0) in replaced:
+            continue
+        if text.startswith('neighbor '):
+            name = text.split(' ', 2)[1]
+            if name in gone:
+                continue
+            if name in removed:
+                # only the first line defining it is negated
+                if _neighbor.match(text) and name not in negated:
+                    lines.append(indent + _negate(text))
+                    negated.add(name)
+                continue
+        if inner and (depth or text.startswith(_kept)):
+            lines.append(indent + text)
+            lines.extend(_delta(inner, {}, depth + 1, gone | removed))
+            lines.append(indent + ' exit')
+            continue
+        lines.append(indent + _negate(text))
+
+    for text, inner in new.items():
+        changed = _delta(old.get(text, {}), inner, depth + 1, gone | removed)
+        if text in old and not changed:
+            continue
+        lines.append(indent + text)
+        if changed:
+            lines.extend(changed)
+            lines.append(indent + ' exit')
+
+    return lines
+
+
+class _Block:
+    """ a top-level line of the configuration and the lines indented after it """
+    __slots__ = ('lines', 'key', 'sequence', 'prev', 'next', 'removed')
+
+    def __init__(self, lines, key, sequence=0):
+        self.lines = lines
+        self.key = key
+        self.sequence = sequence
+        self.prev = None
+        self.next = None
+        self.removed = False
+
+
+class FRRBlocks:
+    """
+    The configuration as a list of blocks, a block being a line starting with
+    a non blank character (its header) and the indented lines following it.
+
+    The blocks are linked in the order of the configuration and their headers
+    are kept sorted, so a block can be found by header with a binary search,
+    removed or inserted without going through every line of the configuration.
+    Each block has a key telling its place, which is between the keys of its
+    neighbours for inserted blocks.
+
+    The blocks removed and inserted since the blocks were created (or since
+    rebase()) are recorded, so the changes are known without comparing the
+    whole configuration.
+    """
+    def __init__(self, lines=[]):
+        self._head = _Block([], Fraction(0))
+        self._tail = _Block([], Fraction(1))
+        self._head.next = self._tail
+        self._tail.prev = self._head
+        # (header, sequence) sorted, and the block of each sequence
+        self._headers = []
+        self._blocks = {}
+        # the blocks removed and inserted, by sequence
+        self._removed = {}
+        self._added = {}
+        self._insert(self._tail, lines)
+        self.rebase()
+
+    @staticmethod
+    def _parse(lines):
+        blocks = []
+        for line in lines:
+            if not blocks or (line[:1] and not line[:1].isspace()):
+                blocks.append([line])
+            else:
+                blocks[-1].append(line)
+        return blocks
+
+    def _insert(self, before, lines):
+        """ inserts the blocks of lines before the block before """
+        blocks = self._parse(lines)
+        prev = before.prev
+        step = (before.key - prev.key) / (len(blocks) + 1)
+        for number, content in enumerate(blocks, start=1):
+            sequence = len(self._blocks)
+            block = _Block(content, prev.key + step * number, sequence)
+            block.prev = prev
+            block.next = before
+            prev.next = block
+            before.prev = block
+            prev = block
+
+            self._blocks[sequence] = block
+            self._added[sequence] = block
+            insort(self._headers, (content[0], sequence))
+
+    def __iter__(self):
+        block = self._head.next
+        while block is not self._tail:
+            yield block
+            block = block.next
+
+    def lines(self):
+        """ returns the lines of the configuration """
+        return [line for block in self for line in block.lines]
+
+    def is_last(self, block):
+        return block.next is self._tail
+
+    def find(self, pattern):
+        """
+        returns the blocks whose header matches the regex pattern (as a whole
+        line) in the order of the configuration, or None if the pattern can
+        also match indented lines, or if its start could not be told
+        """
+        prefixes = _prefixes(pattern)
+        if prefixes is None or any(_[0].isspace() for _ in prefixes):
+            return None
+
+        regex = re.compile(pattern + '$')
+        found = {}
+        for prefix in prefixes:
+            index = bisect_left(self._headers, (prefix,))
+            while index < len(self._headers):
+                header, sequence = self._headers[index]
+                if not header.startswith(prefix):
+                    break
+                index += 1
+                block = self._blocks[sequence]
+                if not block.removed and regex.match(header):
+                    found[sequence] = block
+        return sorted(found.values(), key=lambda _: _.key)
+
+    def remove(self, block):
+        block.removed = True
+        block.prev.next = block.next
+        block.next.prev = block.prev
+        if self._added.pop(block.sequence, None) is None:
+            self._removed[block.sequence] = block
+
+    def insert_before(self, block, lines):
+        """ inserts lines before block, or at the end if block is None """
+        self._insert(block or self._tail, lines)
+
+    def replace(self, block, lines):
+        """ replaces the block with lines """
+        following = block.next
+        self.remove(block)
+        self._insert(following, lines)
+
+    def changes(self):
+        """
+        returns the lines of the blocks removed and of the blocks inserted
+        (in the order of the configuration)
+        """
+        def ordered(blocks):
+            return [_.lines for _ in sorted(blocks.values(), key=lambda _: _.key)]
+        return ordered(self._removed), ordered(self._added)
+
+    def rebase(self):
+        """ forgets the changes, the current blocks being the originals """
+        self._removed = {}
+        self._added = {}
+
+
 class FRRConfig:
     '''Main FRR Configuration manipulation object
     Using this object the user could load, manipulate and commit the configuration to FRR
+
+    The configuration is kept as FRRBlocks, config gives it as a list of lines
+
+    When the configuration was loaded from FRR, committing it only pushes the
+    commands for the sections changed, see delta()
     '''
     def __init__(self, config=[]):
         self.imported_config = ''
+        # the daemon the configuration was loaded from, '' for all,
+        # and the generation of its configuration in the cache
+        self.daemon = None
+        self.generation = None
+        # what the last commit did: method ('delta', 'reload'), lines and elapsed
+        self.statistics = {}
 
         if isinstance(config, list):
             self.config = config.copy()
@@ -411,11 +1086,23 @@ class FRRConfig:
         else:
             raise ValueError(
                 'The config element needs to be a string or list type object')
+        self._tracked = True
 
-        if config:
-            LOG.debug(f'__init__: frr library initiated with initial config')
+        if config and LOG.isEnabledFor(logging.DEBUG):
+            LOG.debug('__init__: frr library initiated with initial config')
             for i, e in enumerate(self.config):
-                LOG.debug(f'__init__: initial              {i:3} {e}')
+                LOG.debug('__init__: initial              %3d %s', i, e)
+
+    @property
+    def config(self):
+        return self.blocks.lines()
+
+    @config.setter
+    def config(self, lines):
+        self.blocks = FRRBlocks(lines)
+        # the changes are only known from the blocks while they are
+        # the original configuration with modifications
+        self._tracked = lines == getattr(self, 'original_config', None)
 
     def load_configuration(self, daemon=None):
         '''Load the running configuration from FRR into the config object
@@ -423,18 +1110,22 @@ class FRRConfig:
                 None to load the consolidated config
 
         Using this overwrites the current loaded config objects and replaces the original loaded config
+        The configuration is read from FRR only once per commit, see ConfigCache
         '''
-        self.imported_config = get_configuration(daemon=daemon)
+        self.generation, lines = _cache.get(daemon or None)
+        self.imported_config = '\n'.join(lines)
         if daemon:
             LOG.debug(f'load_configuration: Configuration loaded from FRR daemon {daemon}')
         else:
             LOG.debug(f'load_configuration: Configuration loaded from FRR integrated config')
 
-        self.original_config = self.imported_config.split('\n')
-        self.config = self.original_config.copy()
+        self.original_config = list(lines)
+        self.config = self.original_config
+        self.daemon = daemon or ''
 
-        for i, e in enumerate(self.imported_config.split('\n')):
-            LOG.debug(f'load_configuration:  loaded    {i:3} {e}')
+        if LOG.isEnabledFor(logging.DEBUG):
+            for i, e in enumerate(self.original_config):
+                LOG.debug('load_configuration:  loaded    %3d %s', i, e)
         return
 
     def test_configuration(self):
@@ -450,47 +1141,132 @@ class FRRConfig:
                    None to use the consolidated config
         '''
         LOG.debug('commit_configuration:  Commiting configuration')
-        for i, e in enumerate(self.config):
-            LOG.debug(f'commit_configuration: new_config {i:3} {e}')
-        reload_configuration('\n'.join(self.config), daemon=daemon)
+        start = time.monotonic()
+
+        lines = None
+        loaded = self.daemon == (daemon or '')
+        if loaded:
+            lines = self.delta()
+        # the generation the configuration will have in the cache once committed
+        generation = self.generation
+
+        if lines is not None:
+            try:
+                if lines:
+                    generation += 1
+                    push_configuration(lines, daemon=daemon)
+                self.original_config = self.config
+                self.blocks.rebase()
+                self._tracked = True
+            except ConfigurationNotValid as e:
+                LOG.debug('commit_configuration: delta failed, reloading: %s', e)
+                lines = None
+
+        method = 'delta'
+        if lines is None:
+            method = 'reload'
+            lines = self.config
+            if LOG.isEnabledFor(logging.DEBUG):
+                for i, e in enumerate(lines):
+                    LOG.debug('commit_configuration: new_config %3d %s', i, e)
+            if generation is not None:
+                generation += 1
+            reload_configuration('\n'.join(lines), daemon=daemon)
+
+        # the configuration now running is the one committed, unless it was
+        # also changed by someone else meanwhile
+        if loaded and _cache.update(daemon or None, generation, self.config):
+            self.generation = generation
+
+        self.statistics = {
+            'method': method,
+            'lines': len(lines),
+            'elapsed': time.monotonic() - start,
+        }
+        LOG.info('commit_configuration: %(method)s of %(lines)d lines in %(elapsed).3fs', self.statistics)
+        return self.statistics
+
+    def delta(self):
+        '''Return the vtysh commands changing the original configuration
+           into the current one, see push_configuration()
+           Only the sections changed are compared when known.
+        '''
+        if self._tracked:
+            old, new = self.blocks.changes()
+        else:
+            old = FRRBlocks._parse(self.original_config)
+            new = FRRBlocks._parse(self.config)
+        lines = _delta(_tree(old), _tree(new))
+        if LOG.isEnabledFor(logging.DEBUG):
+            for i, e in enumerate(lines):
+                LOG.debug('delta: %3d %s', i, e)
+        return lines
 
     def modify_section(self, start_pattern, replacement=[], stop_pattern=r'\S+', remove_stop_mark=False, count=0):
         if isinstance(replacement, str):
             replacement = replacement.split('\n')
         elif not isinstance(replacement, list):
             return ValueError("The replacement element needs to be a string or list type object")
-        LOG.debug(f'modify_section: starting search for {repr(start_pattern)} until {repr(stop_pattern)}')
+        LOG.debug('modify_section: starting search for %r until %r', start_pattern, stop_pattern)
+
+        # While searching, always assume that the user wants to search for the exact pattern he entered
+        # To be more specific the user needs a override, eg. a "pattern.*"
+        found = None
+        if stop_pattern == r'\S+' and not remove_stop_mark:
+            found = self.blocks.find(start_pattern)
+        if found is None:
+            return self._modify_lines(start_pattern, replacement, stop_pattern, remove_stop_mark, count)
+
+        _count = 0
+        for block in found:
+            if count and count <= _count:
+                # Break out of the loop after specified amount of matches
+                LOG.debug('modify_section: reached limit (%d)', _count)
+                break
+            if self.blocks.is_last(block):
+                # a section only ends with the next one
+                break
+            if LOG.isEnabledFor(logging.DEBUG):
+                for e in block.lines:
+                    LOG.debug('modify_section:   remove       %s', e)
+                for e in replacement:
+                    LOG.debug('modify_section:   add          %s', e)
+            if replacement:
+                self.blocks.replace(block, replacement)
+            else:
+                self.blocks.remove(block)
+            _count += 1
+
+        return _count
+
+    def _modify_lines(self, start_pattern, replacement, stop_pattern, remove_stop_mark, count):
+        """ modify_section() for the patterns not only matching a block header """
+        config = self.config
 
         _count = 0
         _next_start = 0
         while True:
             if count and count <= _count:
                 # Break out of the loop after specified amount of matches
-                LOG.debug(f'modify_section: reached limit ({_count}), exiting loop at line {_next_start}')
+                LOG.debug('modify_section: reached limit (%d), exiting loop at line %d', _count, _next_start)
                 break
-            # While searching, always assume that the user wants to search for the exact pattern he entered
-            # To be more specific the user needs a override, eg. a "pattern.*"
             _w = _find_first_block(
-                self.config, start_pattern+'$', stop_pattern, start_at=_next_start)
+                config, start_pattern+'$', stop_pattern, start_at=_next_start)
             if not _w:
                 # Reached the end, no more elements to remove
-                LOG.debug(f'modify_section: No more config sections found, exiting')
+                LOG.debug('modify_section: No more config sections found, exiting')
                 break
             start_element, end_element = _w
-            LOG.debug(f'modify_section:   found match between {start_element} and {end_element}')
-            for i, e in enumerate(self.config[start_element:end_element+1 if remove_stop_mark else end_element],
-                                  start=start_element):
-                LOG.debug(f'modify_section:   remove       {i:3} {e}')
-            del self.config[start_element:end_element +
+            LOG.debug('modify_section:   found match between %d and %d', start_element, end_element)
+            del config[start_element:end_element +
                             1 if remove_stop_mark else end_element]
             if replacement:
                 # Append the replacement config at the current position
-                for i, e in enumerate(replacement, start=start_element):
-                    LOG.debug(f'modify_section:   add          {i:3} {e}')
-                self.config[start_element:start_element] = replacement
+                config[start_element:start_element] = replacement
             _count += 1
             _next_start = start_element + len(replacement)
 
+        self.config = config
         return _count
 
     def add_before(self, before_pattern, addition):
@@ -500,12 +1276,22 @@ class FRRConfig:
         elif not isinstance(addition, list):
             return ValueError("The replacement element needs to be a string or list type object")
 
-        start = _find_first_element(self.config, before_pattern)
-        if start < 0:
+        found = self.blocks.find(before_pattern)
+        if found is None:
+            config = self.config
+            start = _find_first_element(config, before_pattern)
+            if start < 0:
+                return False
+            config[start:start] = addition
+            self.config = config
+            return True
+
+        if not found:
             return False
-        for i, e in enumerate(addition, start=start):
-            LOG.debug(f'add_before:   add          {i:3} {e}')
-        self.config[start:start] = addition
+        if LOG.isEnabledFor(logging.DEBUG):
+            for e in addition:
+                LOG.debug('add_before:   add          %s', e)
+        self.blocks.insert_before(found[0], addition)
         return True
 
     def __str__(self):
@@ -62,12 +62,15 @@ class BondIf(Interface):
         'bond_arp_ip_target': {
             # XXX: no validation of the IP
             'location': '/sys/class/net/{ifname}/bonding/arp_ip_target',
+            'action': True,
         },
         'bond_add_port': {
             'location': '/sys/class/net/{ifname}/bonding/slaves',
+            'action': True,
         },
         'bond_del_port': {
             'location': '/sys/class/net/{ifname}/bonding/slaves',
+            'action': True,
         },
         'bond_primary': {
             'convert': lambda name: name if name else '\0',
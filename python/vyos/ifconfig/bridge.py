@@ -16,13 +16,12 @@
 from netifaces import interfaces
 import json
 
+from vyos import netlink
 from vyos.ifconfig.interface import Interface
 from vyos.validate import assert_boolean
 from vyos.validate import assert_positive
 from vyos.util import cmd
 from vyos.util import dict_search
-from vyos.configdict import get_vlan_ids
-from vyos.configdict import list_diff
 
 @Interface.register
 class BridgeIf(Interface):
@@ -95,9 +94,11 @@ class BridgeIf(Interface):
     _command_set = {**Interface._command_set, **{
         'add_port': {
             'shellcmd': 'ip link set dev {value} master {ifname}',
+            'netlink': lambda i, v: netlink.set_link(v, master=i),
         },
         'del_port': {
             'shellcmd': 'ip link set dev {value} nomaster',
+            'netlink': lambda i, v: netlink.set_link(v, master=''),
         },
     }}
 
@@ -272,29 +273,10 @@ class BridgeIf(Interface):
         vlan_filter = '1' if 'enable_vlan' in config else '0'
         self.set_vlan_filter(vlan_filter)
 
-        ifname = config['ifname']
         if int(vlan_filter):
-            add_vlan = []
-            cur_vlan_ids = get_vlan_ids(ifname)
-
-            tmp = dict_search('vif', config)
-            if tmp:
-                for vif, vif_config in tmp.items():
-                    add_vlan.append(vif)
-
-            # Remove redundant VLANs from the system
-            for vlan in list_diff(cur_vlan_ids, add_vlan):
-                cmd = f'bridge vlan del dev {ifname} vid {vlan} self'
-                self._cmd(cmd)
-
-            for vlan in add_vlan:
-                cmd = f'bridge vlan add dev {ifname} vid {vlan} self'
-                self._cmd(cmd)
-
             # VLAN of bridge parent interface is always 1
             # VLAN 1 is the default VLAN for all unlabeled packets
-            cmd = f'bridge vlan add dev {ifname} vid 1 pvid untagged self'
-            self._cmd(cmd)
+            self.set_bridge_vlans(dict_search('vif', config) or [], '1', master=False)
 
         tmp = dict_search('member.interface', config)
         if tmp:
@@ -332,39 +314,8 @@ class BridgeIf(Interface):
                     lower.set_path_priority(value)
 
                 if int(vlan_filter):
-                    add_vlan = []
-                    native_vlan_id = None
-                    allowed_vlan_ids= []
-                    cur_vlan_ids = get_vlan_ids(interface)
-
-                    if 'native_vlan' in interface_config:
-                        vlan_id = interface_config['native_vlan']
-                        add_vlan.append(vlan_id)
-                        native_vlan_id = vlan_id
-
-                    if 'allowed_vlan' in interface_config:
-                        for vlan in interface_config['allowed_vlan']:
-                            vlan_range = vlan.split('-')
-                            if len(vlan_range) == 2:
-                                for vlan_add in range(int(vlan_range[0]),int(vlan_range[1]) + 1):
-                                    add_vlan.append(str(vlan_add))
-                                    allowed_vlan_ids.append(str(vlan_add))
-                            else:
-                                add_vlan.append(vlan)
-                                allowed_vlan_ids.append(vlan)
-
-                    # Remove redundant VLANs from the system
-                    for vlan in list_diff(cur_vlan_ids, add_vlan):
-                        cmd = f'bridge vlan del dev {interface} vid {vlan} master'
-                        self._cmd(cmd)
-
-                    for vlan in allowed_vlan_ids:
-                        cmd = f'bridge vlan add dev {interface} vid {vlan} master'
-                        self._cmd(cmd)
-                    # Setting native VLAN to system
-                    if native_vlan_id:
-                        cmd = f'bridge vlan add dev {interface} vid {native_vlan_id} pvid untagged master'
-                        self._cmd(cmd)
+                    lower.set_bridge_vlans(interface_config.get('allowed_vlan', []),
+                                           interface_config.get('native_vlan', None))
 
         # call base class first
         super().update(config)
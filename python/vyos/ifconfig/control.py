@@ -14,21 +14,126 @@
 # License along with this library.  If not, see <http://www.gnu.org/licenses/>.
 
 import os
+import threading
 
 from inspect import signature
 from inspect import _empty
+from contextlib import contextmanager
 
 from vyos import debug
+from vyos import netlink
 from vyos.util import popen
 from vyos.util import cmd
 from vyos.ifconfig.section import Section
 
 
+class SysfsWriter:
+    """
+    Writes the sysfs and procfs files of the interfaces, skipping the write
+    when the file already has the value. Within batch() the writes are kept
+    (the last value written to a file wins) and done together when the
+    outermost batch ends, or before a command is run by an interface. They
+    are dropped if the outermost batch ends with an exception.
+
+    Action files, where each write adds or removes an entry ('+eth0',
+    '-192.0.2.1' to the bonding slaves or arp_ip_target), are written at
+    once, after the pending writes, and never coalesced or skipped.
+
+    The writes of each thread are kept apart, written and skipped count the
+    writes done and saved by the process.
+    """
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.written = 0
+        self.skipped = 0
+
+    def _state(self):
+        if not hasattr(self._local, 'pending'):
+            self._local.pending = {}
+            self._local.depth = 0
+        return self._local
+
+    @contextmanager
+    def batch(self):
+        state = self._state()
+        state.depth += 1
+        try:
+            yield self
+        except BaseException:
+            # the writes of a failed update are not left for the next one
+            if state.depth == 1:
+                state.pending = {}
+            raise
+        finally:
+            state.depth -= 1
+        if not state.depth:
+            self.flush()
+
+    def pending(self, filename):
+        """ returns the value waiting to be written to filename or None """
+        return self._state().pending.get(filename, None)
+
+    def write(self, filename, value, action=False):
+        if action:
+            self.flush()
+            try:
+                self._write(filename, str(value))
+            except OSError as e:
+                raise OSError(f"could not write '{value}' > '{filename}': {e.strerror}")
+            return
+
+        state = self._state()
+        state.pending[filename] = str(value)
+        if not state.depth:
+            self.flush()
+
+    def _write(self, filename, value):
+        with open(filename, 'w') as f:
+            f.write(value)
+        with self._lock:
+            self.written += 1
+
+    def flush(self):
+        """
+        writes the pending values, raises an OSError listing every file
+        which could not be written once all the others were
+        """
+        state = self._state()
+        pending, state.pending = state.pending, {}
+        errors = []
+        for filename, value in pending.items():
+            try:
+                with open(filename, 'r') as f:
+                    if f.read().rstrip('\n') == value:
+                        with self._lock:
+                            self.skipped += 1
+                        continue
+            except OSError:
+                # some files can be written but not read
+                pass
+            try:
+                self._write(filename, value)
+            except OSError as e:
+                errors.append(f"'{value}' > '{filename}': {e.strerror}")
+        if errors:
+            raise OSError('could not write ' + ', '.join(errors))
+
+
+sysfs = SysfsWriter()
+
+
 class Control(Section):
     _command_get = {}
     _command_set = {}
     _signature = {}
 
+    # The _command_get and _command_set entries can provide a 'netlink'
+    # function, doing the operation in-process, which is then used rather
+    # than running the 'shellcmd'. Setting the backend to 'shell' uses the
+    # commands for every entry.
+    backend = 'netlink'
+
     def __init__(self, **kargs):
         # some commands (such as operation comands - show interfaces, etc.)
         # need to query the interface statistics. If the interface
@@ -45,15 +150,40 @@ class Control(Section):
         return debug.message(message, self.debug)
 
     def _popen(self, command):
+        # the command may depend on the pending sysfs writes
+        sysfs.flush()
+        self._invalidate()
         return popen(command, self.debug)
 
     def _cmd(self, command):
+        # the command may depend on the pending sysfs writes
+        sysfs.flush()
+        self._invalidate()
         return cmd(command, self.debug)
 
+    def _invalidate(self):
+        """
+        A command ran by an interface may change its link, so the state
+        shared by all the interfaces is read again the next time it is used
+        """
+        ifname = getattr(self, 'ifname', None)
+        if ifname:
+            netlink.invalidate(ifname)
+
+    def _netlink(self, table, name):
+        if self.backend != 'netlink':
+            return None
+        return table[name].get('netlink', None)
+
     def _get_command(self, config, name):
         """
         Using the defined names, set data write to sysfs.
         """
+        netlink = self._netlink(self._command_get, name)
+        if netlink:
+            self._debug_msg(f"netlink get {name} of {config['ifname']}")
+            return netlink(config['ifname'])
+
         cmd = self._command_get[name]['shellcmd'].format(**config)
         return self._command_get[name].get('format', lambda _: _)(self._cmd(cmd))
 
@@ -95,6 +225,13 @@ class Control(Section):
             except Exception as e:
                 raise e.__class__(f'Could not set {name}. {e}')
 
+        netlink = self._netlink(self._command_set, name)
+        if netlink:
+            sysfs.flush()
+            # netlink functions are given the value before conversion
+            self._debug_msg(f"netlink set {name} of {config['ifname']} to '{value}'")
+            return netlink(config['ifname'], value)
+
         convert = self._command_set[name].get('convert', None)
         if convert:
             value = convert(value)
@@ -115,21 +252,21 @@ class Control(Section):
         """
         Provide a single primitive w/ error checking for reading from sysfs.
         """
-        value = None
-        with open(filename, 'r') as f:
-            value = f.read().rstrip('\n')
+        value = sysfs.pending(filename)
+        if value is None:
+            with open(filename, 'r') as f:
+                value = f.read().rstrip('\n')
 
         self._debug_msg("read '{}' < '{}'".format(value, filename))
         return value
 
-    def _write_sysfs(self, filename, value):
+    def _write_sysfs(self, filename, value, action=False):
         """
         Provide a single primitive w/ error checking for writing to sysfs.
         """
         self._debug_msg("write '{}' > '{}'".format(value, filename))
         if os.path.isfile(filename):
-            with open(filename, 'w') as f:
-                f.write(str(value))
+            sysfs.write(filename, value, action)
             return True
         return False
 
@@ -163,7 +300,8 @@ class Control(Section):
             value = convert(value)
 
         commited = self._write_sysfs(
-            self._sysfs_set[name]['location'].format(**config), value)
+            self._sysfs_set[name]['location'].format(**config), value,
+            self._sysfs_set[name].get('action', False))
         if not commited:
             errmsg = self._sysfs_set.get('errormsg', '')
             if errmsg:
@@ -16,6 +16,7 @@
 import os
 import re
 
+from vyos import ethtool
 from vyos.ifconfig.interface import Interface
 from vyos.util import run
 from vyos.util import dict_search
@@ -41,6 +42,13 @@ class EthernetIf(Interface):
 
     @staticmethod
     def feature(ifname, option, value):
+        if EthernetIf.backend == 'netlink':
+            try:
+                ethtool.set_feature(ifname, option, value)
+            except OSError:
+                # as with ethtool, not every driver supports every feature
+                pass
+            return False
         run(f'ethtool -K {ifname} {option} {value}','ifconfig')
         return False
 
@@ -120,6 +128,24 @@ class EthernetIf(Interface):
                             'flow control settings!')
             return
 
+        if self.backend == 'netlink':
+            if not ethtool.Ethtool(ifname).is_pause_supported():
+                # the interface does not support it
+                return ''
+            try:
+                # Get current flow control settings:
+                if ethtool.get_pause(ifname)['autoneg'] and enable == 'on':
+                    # flowcontrol is already enabled - see below
+                    return ''
+            except OSError:
+                # the interface does not support it
+                return ''
+            try:
+                ethtool.set_pause(ifname, enable)
+            except OSError:
+                print(f'could not set flowcontrol for {ifname}')
+            return ''
+
         # Get current flow control settings:
         cmd = f'ethtool --show-pause {ifname}'
         output, code = self._popen(cmd)
@@ -181,6 +207,21 @@ class EthernetIf(Interface):
 
         # Get current speed and duplex settings:
         ifname = self.config['ifname']
+        if self.backend == 'netlink':
+            try:
+                current = ethtool.get_link_settings(ifname)
+            except OSError:
+                current = None
+            if current is not None:
+                if current['autoneg']:
+                    if speed == 'auto' and duplex == 'auto':
+                        # bail out early as nothing is to change
+                        return
+                elif str(current['speed']) == speed and current['duplex'] == duplex:
+                    # bail out early as nothing is to change
+                    return
+                return self._cmd(self._speed_duplex_cmd(speed, duplex))
+
         cmd = f'ethtool {ifname}'
         tmp = self._cmd(cmd)
 
@@ -206,12 +247,16 @@ class EthernetIf(Interface):
                 # bail out early as nothing is to change
                 return
 
+        return self._cmd(self._speed_duplex_cmd(speed, duplex))
+
+    def _speed_duplex_cmd(self, speed, duplex):
+        ifname = self.config['ifname']
         cmd = f'ethtool -s {ifname}'
         if speed == 'auto' or duplex == 'auto':
             cmd += ' autoneg on'
         else:
             cmd += f' speed {speed} duplex {duplex} autoneg off'
-        return self._cmd(cmd)
+        return cmd
 
     def set_gro(self, state):
         """
@@ -302,6 +347,13 @@ class EthernetIf(Interface):
         >>> i.set_ring_buffer('rx', '4096')
         """
         ifname = self.config['ifname']
+        if self.backend == 'netlink':
+            try:
+                ethtool.set_ring_buffer(ifname, b_type, b_size)
+            except (OSError, KeyError):
+                print(f'could not set "{b_type}" ring-buffer for {ifname}')
+            return ''
+
         cmd = f'ethtool -G {ifname} {b_type} {b_size}'
         output, code = self._popen(cmd)
         # ethtool error codes:
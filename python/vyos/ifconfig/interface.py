@@ -21,17 +21,21 @@ import jmespath
 
 from copy import deepcopy
 from glob import glob
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 
 from ipaddress import IPv4Network
+from ipaddress import ip_address
+from ipaddress import ip_interface
 from netifaces import ifaddresses
 # this is not the same as socket.AF_INET/INET6
 from netifaces import AF_INET
 from netifaces import AF_INET6
 
 from vyos import ConfigError
+from vyos import netlink
 from vyos.configdict import list_diff
 from vyos.configdict import dict_merge
-from vyos.configdict import get_vlan_ids
 from vyos.template import render
 from vyos.util import mac2eui64
 from vyos.util import dict_search
@@ -47,6 +51,7 @@ from vyos.validate import assert_positive
 from vyos.validate import assert_range
 
 from vyos.ifconfig.control import Control
+from vyos.ifconfig.control import sysfs
 from vyos.ifconfig.vrrp import VRRP
 from vyos.ifconfig.operational import Operational
 from vyos.ifconfig import Section
@@ -77,30 +82,37 @@ class Interface(Control):
         'admin_state': {
             'shellcmd': 'ip -json link show dev {ifname}',
             'format': lambda j: 'up' if 'UP' in jmespath.search('[*].flags | [0]', json.loads(j)) else 'down',
+            'netlink': lambda i: 'up' if 'UP' in netlink.snapshot().link(i)['flags'] else 'down',
         },
         'alias': {
             'shellcmd': 'ip -json -detail link list dev {ifname}',
             'format': lambda j: jmespath.search('[*].ifalias | [0]', json.loads(j)) or '',
+            'netlink': lambda i: netlink.snapshot().link(i).get('ifalias', ''),
         },
         'mac': {
             'shellcmd': 'ip -json -detail link list dev {ifname}',
             'format': lambda j: jmespath.search('[*].address | [0]', json.loads(j)),
+            'netlink': lambda i: netlink.snapshot().link(i).get('address', None),
         },
         'min_mtu': {
             'shellcmd': 'ip -json -detail link list dev {ifname}',
             'format': lambda j: jmespath.search('[*].min_mtu | [0]', json.loads(j)),
+            'netlink': lambda i: netlink.snapshot().link(i).get('min_mtu', None),
         },
         'max_mtu': {
             'shellcmd': 'ip -json -detail link list dev {ifname}',
             'format': lambda j: jmespath.search('[*].max_mtu | [0]', json.loads(j)),
+            'netlink': lambda i: netlink.snapshot().link(i).get('max_mtu', None),
         },
         'mtu': {
             'shellcmd': 'ip -json -detail link list dev {ifname}',
             'format': lambda j: jmespath.search('[*].mtu | [0]', json.loads(j)),
+            'netlink': lambda i: netlink.snapshot().link(i).get('mtu', None),
         },
         'oper_state': {
             'shellcmd': 'ip -json -detail link list dev {ifname}',
             'format': lambda j: jmespath.search('[*].operstate | [0]', json.loads(j)),
+            'netlink': lambda i: netlink.snapshot().link(i).get('operstate', None),
         },
     }
 
@@ -108,29 +120,81 @@ class Interface(Control):
         'admin_state': {
             'validate': lambda v: assert_list(v, ['up', 'down']),
             'shellcmd': 'ip link set dev {ifname} {value}',
+            'netlink': lambda i, v: netlink.set_link(i, up=v == 'up'),
         },
         'alias': {
             'convert': lambda name: name if name else '',
             'shellcmd': 'ip link set dev {ifname} alias "{value}"',
+            'netlink': lambda i, v: netlink.set_link(i, alias=v),
         },
         'bridge_port_isolation': {
             'validate': lambda v: assert_list(v, ['on', 'off']),
             'shellcmd': 'bridge link set dev {ifname} isolated {value}',
+            'netlink': lambda i, v: netlink.set_bridge_port(i, isolated=v == 'on'),
         },
         'mac': {
             'validate': assert_mac,
             'shellcmd': 'ip link set dev {ifname} address {value}',
+            'netlink': lambda i, v: netlink.set_link(i, address=v),
         },
         'mtu': {
             'validate': assert_mtu,
             'shellcmd': 'ip link set dev {ifname} mtu {value}',
+            'netlink': lambda i, v: netlink.set_link(i, mtu=v),
         },
         'vrf': {
             'convert': lambda v: f'master {v}' if v else 'nomaster',
             'shellcmd': 'ip link set dev {ifname} {value}',
+            'netlink': lambda i, v: netlink.set_link(i, master=v),
         },
     }
 
+    # at most that many VLANs are configured at the same time, most of the
+    # work is waiting for the kernel or for the commands run
+    _vlan_workers = 8
+
+    # The value update() sets for the settings it only applies when the
+    # interface does not already have them, computed from the configuration.
+    _update_values = {
+        'link_detect': lambda c: '2' if 'disable_link_detect' in c else '1',
+        'arp_cache_tmo': lambda c: dict_search('ip.arp_cache_timeout', c) or '30',
+        'arp_filter': lambda c: '0' if dict_search('ip.disable_arp_filter', c) != None else '1',
+        'arp_accept': lambda c: '1' if dict_search('ip.enable_arp_accept', c) != None else '0',
+        'arp_announce': lambda c: '1' if dict_search('ip.enable_arp_announce', c) != None else '0',
+        'arp_ignore': lambda c: '1' if dict_search('ip.enable_arp_ignore', c) != None else '0',
+        'proxy_arp': lambda c: '1' if dict_search('ip.enable_proxy_arp', c) != None else '0',
+        'proxy_arp_pvlan': lambda c: '1' if dict_search('ip.proxy_arp_pvlan', c) != None else '0',
+        'ipv4_forwarding': lambda c: '0' if dict_search('ip.disable_forwarding', c) != None else '1',
+        'ipv4_source_validation': lambda c: dict_search('ip.source_validation', c) or '0',
+        'ipv6_forwarding': lambda c: '0' if dict_search('ipv6.disable_forwarding', c) != None else '1',
+        'ipv6_accept_ra': lambda c: '2' if (dict_search('ipv6.address.autoconf', c) != None
+                                            or 'dhcpv6' in c.get('address', [])) else '1',
+        'ipv6_autoconf': lambda c: '1' if dict_search('ipv6.address.autoconf', c) != None else '0',
+        'ipv6_dad_messages': lambda c: dict_search('ipv6.dup_addr_detect_transmits', c) or '1',
+        'xdp': lambda c: 'xdp' in c,
+    }
+
+    # The _sysfs_set entry written by the setter of these settings, which
+    # update() reads the current value from, and how the value is written
+    # there when the setter converts it itself.
+    _update_sysfs = {
+        'link_detect': ('link_detect', None),
+        'arp_cache_tmo': ('arp_cache_tmo', None),
+        'arp_filter': ('arp_filter', None),
+        'arp_accept': ('arp_accept', None),
+        'arp_announce': ('arp_announce', None),
+        'arp_ignore': ('arp_ignore', None),
+        'proxy_arp': ('proxy_arp', None),
+        'proxy_arp_pvlan': ('proxy_arp_pvlan', None),
+        'ipv4_forwarding': ('ipv4_forwarding', None),
+        'ipv4_source_validation': ('rp_filter',
+            lambda v: {'strict': '1', 'loose': '2'}.get(v, '0')),
+        'ipv6_forwarding': ('ipv6_forwarding', None),
+        'ipv6_accept_ra': ('ipv6_accept_ra', None),
+        'ipv6_autoconf': ('ipv6_autoconf', None),
+        'ipv6_dad_messages': ('ipv6_dad_transmits', None),
+    }
+
     _sysfs_set = {
         'arp_cache_tmo': {
             'convert': lambda tmo: (int(tmo) * 1000),
@@ -239,6 +303,11 @@ class Interface(Control):
         self.config['ifname'] = self.ifname = ifname
 
         self._admin_state_down_cnt = 0
+        # the interface was created by this instance
+        self._created = False
+        # how many times update() applied or skipped each setting
+        self.applied = Counter()
+        self.skipped = Counter()
 
         # we must have updated config before initialising the Interface
         super().__init__(**kargs)
@@ -261,6 +330,7 @@ class Interface(Control):
                         raise ConfigError(f'missing required option {k} for {name} {ifname} creation')
 
                 self._create()
+                self._created = True
             # If we can not connect to the interface then let the caller know
             # as the class could not be correctly initialised
             else:
@@ -307,6 +377,9 @@ class Interface(Control):
         # NOTE (Improvement):
         # after interface removal no other commands should be allowed
         # to be called and instead should raise an Exception:
+        if self.backend == 'netlink':
+            self._debug_msg(f'netlink del link {self.ifname}')
+            return netlink.del_link(self.ifname)
         cmd = 'ip link del dev {ifname}'.format(**self.config)
         return self._cmd(cmd)
 
@@ -754,6 +827,12 @@ class Interface(Control):
         ['172.16.33.30/24', 'fe80::20c:29ff:fe11:a174/64']
         """
 
+        if self.backend == 'netlink':
+            # IPv4 addresses first, as netifaces lists them
+            addrs = sorted(netlink.snapshot().addrs(self.ifname),
+                           key=lambda _: _['family'])
+            return [f"{_['local']}/{_['prefixlen']}" for _ in addrs]
+
         ipv4 = []
         ipv6 = []
 
@@ -780,6 +859,26 @@ class Interface(Control):
 
         return ipv4 + ipv6
 
+    def _is_addr_assigned(self, addr):
+        """
+        Check if the address, with or without a prefix length, is assigned
+        to the interface, as vyos.validate.is_intf_addr_assigned()
+        """
+        if self.backend != 'netlink':
+            return is_intf_addr_assigned(self.ifname, addr)
+
+        address, _, prefixlen = addr.partition('/')
+        try:
+            assigned = netlink.snapshot().addrs(self.ifname)
+        except OSError:
+            return False
+        for found in assigned:
+            if ip_address(found['local']) != ip_address(address):
+                continue
+            if not prefixlen or int(prefixlen) == found['prefixlen']:
+                return True
+        return False
+
     def add_addr(self, addr):
         """
         Add IP(v6) address to interface. Address is only added if it is not
@@ -823,9 +922,13 @@ class Interface(Control):
             self.set_dhcp(True)
         elif addr == 'dhcpv6':
             self.set_dhcpv6(True)
-        elif not is_intf_addr_assigned(self.ifname, addr):
-            self._cmd(f'ip addr add "{addr}" '
-                    f'{"brd + " if addr_is_v4 else ""}dev "{self.ifname}"')
+        elif not self._is_addr_assigned(addr):
+            if self.backend == 'netlink':
+                self._debug_msg(f'netlink add address {addr} to {self.ifname}')
+                netlink.add_addr(self.ifname, addr)
+            else:
+                self._cmd(f'ip addr add "{addr}" '
+                        f'{"brd + " if addr_is_v4 else ""}dev "{self.ifname}"')
         else:
             return False
 
@@ -864,8 +967,12 @@ class Interface(Control):
             self.set_dhcp(False)
         elif addr == 'dhcpv6':
             self.set_dhcpv6(False)
-        elif is_intf_addr_assigned(self.ifname, addr):
-            self._cmd(f'ip addr del "{addr}" dev "{self.ifname}"')
+        elif self._is_addr_assigned(addr):
+            if self.backend == 'netlink':
+                self._debug_msg(f'netlink del address {addr} from {self.ifname}')
+                netlink.del_addr(self.ifname, addr)
+            else:
+                self._cmd(f'ip addr del "{addr}" dev "{self.ifname}"')
         else:
             return False
 
@@ -886,7 +993,56 @@ class Interface(Control):
         self.set_dhcpv6(False)
 
         # flush all addresses
-        self._cmd(f'ip addr flush dev "{self.ifname}"')
+        if self.backend == 'netlink':
+            self._debug_msg(f'netlink flush addresses of {self.ifname}')
+            netlink.flush_addrs(self.ifname)
+        else:
+            self._cmd(f'ip addr flush dev "{self.ifname}"')
+
+    def set_bridge_vlans(self, allowed=[], native=None, master=True):
+        """
+        Set the VLANs of the bridge port to the allowed VLANs (tagged) and
+        the native VLAN (pvid untagged), or the VLANs of the bridge itself
+        if master is False. Only the VLANs which changed are removed/added.
+
+        allowed are the VLANs as found in the CLI, ranges such as 10-20
+        being accepted.
+
+        Example:
+        >>> from vyos.ifconfig import Interface
+        >>> Interface('eth0').set_bridge_vlans(['10', '20-30'], '5')
+        """
+        ifname = self.ifname
+
+        wanted = {}
+        for vlan in allowed:
+            first, _, last = str(vlan).partition('-')
+            for vid in range(int(first), int(last or first) + 1):
+                wanted[vid] = 0
+        if native is not None:
+            wanted[int(native)] = netlink.BRIDGE_VLAN_INFO_PVID | netlink.BRIDGE_VLAN_INFO_UNTAGGED
+
+        current = netlink.snapshot().vlans(ifname)
+        delete = {vid: flags for vid, flags in current.items() if vid not in wanted}
+        add = {vid: flags for vid, flags in wanted.items() if current.get(vid, None) != flags}
+        if not add and not delete:
+            return
+
+        if self.backend == 'netlink':
+            self._debug_msg(f'netlink bridge vlans of {ifname} '
+                            f'removing {len(delete)} adding {len(add)}')
+            netlink.set_bridge_vlans(ifname, add, delete, master)
+            return
+
+        # bridge(8) also accepts ranges, but not for the pvid
+        where = 'master' if master else 'self'
+        for first, last, flags in netlink.vlan_ranges(delete):
+            vid = first if first == last else f'{first}-{last}'
+            self._cmd(f'bridge vlan del dev {ifname} vid {vid} {where}')
+        for first, last, flags in netlink.vlan_ranges(add):
+            vid = first if first == last else f'{first}-{last}'
+            pvid = ' pvid untagged' if flags else ''
+            self._cmd(f'bridge vlan add dev {ifname} vid {vid}{pvid} {where}')
 
     def add_to_bridge(self, bridge_dict):
         """
@@ -898,8 +1054,6 @@ class Interface(Control):
         # drop all interface addresses first
         self.flush_addrs()
 
-        ifname = self.ifname
-
         for bridge, bridge_config in bridge_dict.items():
             # add interface to bridge - use Section.klass to get BridgeIf class
             Section.klass(bridge)(bridge, create=True).add_port(self.ifname)
@@ -915,39 +1069,8 @@ class Interface(Control):
             bridge_vlan_filter = Section.klass(bridge)(bridge, create=True).get_vlan_filter()
 
             if int(bridge_vlan_filter):
-                cur_vlan_ids = get_vlan_ids(ifname)
-                add_vlan = []
-                native_vlan_id = None
-                allowed_vlan_ids= []
-
-                if 'native_vlan' in bridge_config:
-                    vlan_id = bridge_config['native_vlan']
-                    add_vlan.append(vlan_id)
-                    native_vlan_id = vlan_id
-
-                if 'allowed_vlan' in bridge_config:
-                    for vlan in bridge_config['allowed_vlan']:
-                        vlan_range = vlan.split('-')
-                        if len(vlan_range) == 2:
-                            for vlan_add in range(int(vlan_range[0]),int(vlan_range[1]) + 1):
-                                add_vlan.append(str(vlan_add))
-                                allowed_vlan_ids.append(str(vlan_add))
-                        else:
-                            add_vlan.append(vlan)
-                            allowed_vlan_ids.append(vlan)
-
-                # Remove redundant VLANs from the system
-                for vlan in list_diff(cur_vlan_ids, add_vlan):
-                    cmd = f'bridge vlan del dev {ifname} vid {vlan} master'
-                    self._cmd(cmd)
-
-                for vlan in allowed_vlan_ids:
-                    cmd = f'bridge vlan add dev {ifname} vid {vlan} master'
-                    self._cmd(cmd)
-                # Setting native VLAN to system
-                if native_vlan_id:
-                    cmd = f'bridge vlan add dev {ifname} vid {native_vlan_id} pvid untagged master'
-                    self._cmd(cmd)
+                self.set_bridge_vlans(bridge_config.get('allowed_vlan', []),
+                                      bridge_config.get('native_vlan', None))
 
     def set_dhcp(self, enable):
         """
@@ -1085,12 +1208,123 @@ class Interface(Control):
 
         return self._cmd(cmd)
 
+    def _update_current(self, name, value):
+        """
+        Check if the sysfs/procfs entry written for the setting already has
+        the value, the pending writes included
+        """
+        if name not in self._update_sysfs:
+            return False
+        key, convert = self._update_sysfs[name]
+        if convert is None:
+            convert = self._sysfs_set[key].get('convert', lambda v: v)
+        filename = self._sysfs_set[key]['location'].format(**self.config)
+        try:
+            return self._read_sysfs(filename) == str(convert(str(value)))
+        except (OSError, ValueError):
+            return False
+
+    def _update_setting(self, name, setter):
+        """
+        Call the setter with the value of the setting found in the
+        configuration, unless the interface already has it
+        """
+        value = self._update_values[name](self._config)
+        if not self._created and self._update_current(name, value):
+            self.skipped[name] += 1
+            return None
+        self.applied[name] += 1
+        return setter(value)
+
+    def _update_link(self, name, value, setter):
+        """
+        Call the setter with the value, unless the link already has it
+        """
+        if self.backend == 'netlink':
+            try:
+                link = netlink.snapshot().link(self.ifname)
+                if name == 'vrf':
+                    current = value and netlink.snapshot().link(value)['ifindex']
+                    same = link.get('master', 0) == (current or 0)
+                elif name == 'mtu':
+                    same = link.get('mtu', None) == int(value)
+                elif name == 'mac':
+                    same = link.get('address', '').lower() == value.lower()
+                else:
+                    same = link.get('ifalias', '') == value
+            except OSError:
+                same = False
+            if same:
+                self.skipped[name] += 1
+                return None
+        self.applied[name] += 1
+        return setter(value)
+
     def update(self, config):
         """ General helper function which works on a dictionary retrived by
         get_config_dict(). It's main intention is to consolidate the scattered
         interface setup code and provide a single point of entry when workin
         on any interface. """
 
+        # the sysfs/procfs settings are written together, once all known
+        with sysfs.batch():
+            self._update(config)
+        self._debug_msg(f'sysfs writes done {sysfs.written} skipped {sysfs.skipped}')
+
+    def _update_addrs(self, new_addr):
+        """
+        make the addresses of the interface the ones of new_addr, the
+        addresses no longer configured are removed first
+        """
+        # determine IP addresses which are assigned to the interface and build a
+        # list of addresses which are no longer in the dict so they can be removed
+        cur_addr = self.get_addr()
+        remove = []
+        for addr in list_diff(cur_addr, new_addr):
+            # we will delete all interface specific IP addresses if they are not
+            # explicitly configured on the CLI
+            if is_ipv6_link_local(addr):
+                eui64 = mac2eui64(self.get_mac(), 'fe80::/64')
+                if addr == f'{eui64}/64':
+                    continue
+            remove.append(addr)
+
+        if self.backend != 'netlink':
+            for addr in remove:
+                self.del_addr(addr)
+            for addr in new_addr:
+                self.add_addr(addr)
+            return
+
+        # as add_addr(), we can't have both DHCP and static IPv4 addresses
+        configured = [_ for _ in self._addr if _ not in remove] + new_addr
+        if 'dhcp' in configured and any(is_ipv4(_) for _ in configured):
+            raise ConfigError((
+                "Can't configure both static IPv4 and DHCP address "
+                "on the same interface"))
+
+        # the static addresses are compared with the ones assigned (read with
+        # one dump) and all the changes of this interface sent at once, rather
+        # than checking and changing each address on its own
+        assigned = set(ip_interface(_) for _ in cur_addr if _ not in remove)
+        add = [_ for _ in new_addr if _ not in ('dhcp', 'dhcpv6')
+               and ip_interface(_) not in assigned]
+        if remove or add:
+            self._debug_msg(f'netlink addresses of {self.ifname} '
+                            f'removing {len(remove)} adding {len(add)}')
+            netlink.change_addrs([(self.ifname, _) for _ in remove],
+                                 [(self.ifname, _) for _ in add])
+
+        for addr in remove:
+            if addr in self._addr:
+                self._addr.remove(addr)
+        for addr in new_addr:
+            if addr in ('dhcp', 'dhcpv6'):
+                self.add_addr(addr)
+            elif addr not in self._addr:
+                self._addr.append(addr)
+
+    def _update(self, config):
         if self.debug:
             import pprint
             pprint.pprint(config)
@@ -1107,14 +1341,13 @@ class Interface(Control):
             if 'mac' in config:
                 mac = config.get('mac')
             if mac:
-                self.set_mac(mac)
+                self._update_link('mac', mac, self.set_mac)
 
         # Update interface description
-        self.set_alias(config.get('description', ''))
+        self._update_link('alias', config.get('description', ''), self.set_alias)
 
         # Ignore link state changes
-        value = '2' if 'disable_link_detect' in config else '1'
-        self.set_link_detect(value)
+        self._update_setting('link_detect', self.set_link_detect)
 
         # Configure assigned interface IP addresses. No longer
         # configured addresses will be removed first
@@ -1131,21 +1364,7 @@ class Interface(Control):
         if 'dhcpv6' not in new_addr and not dhcpv6pd:
             self.del_addr('dhcpv6')
 
-        # determine IP addresses which are assigned to the interface and build a
-        # list of addresses which are no longer in the dict so they can be removed
-        cur_addr = self.get_addr()
-        for addr in list_diff(cur_addr, new_addr):
-            # we will delete all interface specific IP addresses if they are not
-            # explicitly configured on the CLI
-            if is_ipv6_link_local(addr):
-                eui64 = mac2eui64(self.get_mac(), 'fe80::/64')
-                if addr != f'{eui64}/64':
-                    self.del_addr(addr)
-            else:
-                self.del_addr(addr)
-
-        for addr in new_addr:
-            self.add_addr(addr)
+        self._update_addrs(new_addr)
 
         # start DHCPv6 client when only PD was configured
         if dhcpv6pd:
@@ -1159,78 +1378,50 @@ class Interface(Control):
             # unbinding will call 'ip link set dev eth0 nomaster' which will
             # also drop the interface out of a bridge or bond - thus this is
             # checked before
-            self.set_vrf(config.get('vrf', ''))
+            self._update_link('vrf', config.get('vrf', ''), self.set_vrf)
 
         # Configure ARP cache timeout in milliseconds - has default value
-        tmp = dict_search('ip.arp_cache_timeout', config)
-        value = tmp if (tmp != None) else '30'
-        self.set_arp_cache_tmo(value)
+        self._update_setting('arp_cache_tmo', self.set_arp_cache_tmo)
 
         # Configure ARP filter configuration
-        tmp = dict_search('ip.disable_arp_filter', config)
-        value = '0' if (tmp != None) else '1'
-        self.set_arp_filter(value)
+        self._update_setting('arp_filter', self.set_arp_filter)
 
         # Configure ARP accept
-        tmp = dict_search('ip.enable_arp_accept', config)
-        value = '1' if (tmp != None) else '0'
-        self.set_arp_accept(value)
+        self._update_setting('arp_accept', self.set_arp_accept)
 
         # Configure ARP announce
-        tmp = dict_search('ip.enable_arp_announce', config)
-        value = '1' if (tmp != None) else '0'
-        self.set_arp_announce(value)
+        self._update_setting('arp_announce', self.set_arp_announce)
 
         # Configure ARP ignore
-        tmp = dict_search('ip.enable_arp_ignore', config)
-        value = '1' if (tmp != None) else '0'
-        self.set_arp_ignore(value)
+        self._update_setting('arp_ignore', self.set_arp_ignore)
 
         # Enable proxy-arp on this interface
-        tmp = dict_search('ip.enable_proxy_arp', config)
-        value = '1' if (tmp != None) else '0'
-        self.set_proxy_arp(value)
+        self._update_setting('proxy_arp', self.set_proxy_arp)
 
         # Enable private VLAN proxy ARP on this interface
-        tmp = dict_search('ip.proxy_arp_pvlan', config)
-        value = '1' if (tmp != None) else '0'
-        self.set_proxy_arp_pvlan(value)
+        self._update_setting('proxy_arp_pvlan', self.set_proxy_arp_pvlan)
 
         # IPv4 forwarding
-        tmp = dict_search('ip.disable_forwarding', config)
-        value = '0' if (tmp != None) else '1'
-        self.set_ipv4_forwarding(value)
+        self._update_setting('ipv4_forwarding', self.set_ipv4_forwarding)
 
         # IPv4 source-validation
-        tmp = dict_search('ip.source_validation', config)
-        value = tmp if (tmp != None) else '0'
-        self.set_ipv4_source_validation(value)
+        self._update_setting('ipv4_source_validation', self.set_ipv4_source_validation)
 
         # IPv6 forwarding
-        tmp = dict_search('ipv6.disable_forwarding', config)
-        value = '0' if (tmp != None) else '1'
-        self.set_ipv6_forwarding(value)
+        self._update_setting('ipv6_forwarding', self.set_ipv6_forwarding)
 
         # IPv6 router advertisements
-        tmp = dict_search('ipv6.address.autoconf', config)
-        value = '2' if (tmp != None) else '1'
-        if 'dhcpv6' in new_addr:
-            value = '2'
-        self.set_ipv6_accept_ra(value)
+        self._update_setting('ipv6_accept_ra', self.set_ipv6_accept_ra)
 
         # IPv6 address autoconfiguration
-        tmp = dict_search('ipv6.address.autoconf', config)
-        value = '1' if (tmp != None) else '0'
-        self.set_ipv6_autoconf(value)
+        self._update_setting('ipv6_autoconf', self.set_ipv6_autoconf)
 
         # IPv6 Duplicate Address Detection (DAD) tries
-        tmp = dict_search('ipv6.dup_addr_detect_transmits', config)
-        value = tmp if (tmp != None) else '1'
-        self.set_ipv6_dad_messages(value)
+        self._update_setting('ipv6_dad_messages', self.set_ipv6_dad_messages)
 
         # MTU - Maximum Transfer Unit
         if 'mtu' in config:
-            self.set_mtu(config.get('mtu'))
+            self._update_link('mtu', config.get('mtu'), self.set_mtu)
 
         # Delete old IPv6 EUI64 addresses before changing MAC
         tmp = dict_search('ipv6.address.eui64_old', config)
@@ -1259,7 +1450,7 @@ class Interface(Control):
             self.add_to_bridge(bridge_dict)
 
         # eXpress Data Path - highly experimental
-        self.set_xdp('xdp' in config)
+        self._update_setting('xdp', self.set_xdp)
 
         # configure port mirror
         self.set_mirror()
@@ -1274,56 +1465,80 @@ class Interface(Control):
         state = 'down' if 'disable' in config else 'up'
         self.set_admin_state(state)
 
+        self._debug_msg(f'update of {self.ifname} applied {dict(self.applied)} '
+                        f'skipped {dict(self.skipped)}')
+
         # remove no longer required 802.1ad (Q-in-Q VLANs)
         ifname = config['ifname']
         for vif_s_id in config.get('vif_s_remove', {}):
             vif_s_ifname = f'{ifname}.{vif_s_id}'
             VLANIf(vif_s_ifname).remove()
 
-        # create/update 802.1ad (Q-in-Q VLANs)
-        for vif_s_id, vif_s_config in config.get('vif_s', {}).items():
-            tmp = deepcopy(VLANIf.get_config())
-            tmp['protocol'] = vif_s_config['protocol']
-            tmp['source_interface'] = ifname
-            tmp['vlan_id'] = vif_s_id
-
-            vif_s_ifname = f'{ifname}.{vif_s_id}'
-            vif_s_config['ifname'] = vif_s_ifname
-            s_vlan = VLANIf(vif_s_ifname, **tmp)
-            s_vlan.update(vif_s_config)
-
-            # remove no longer required client VLAN (vif-c)
-            for vif_c_id in vif_s_config.get('vif_c_remove', {}):
-                vif_c_ifname = f'{vif_s_ifname}.{vif_c_id}'
-                VLANIf(vif_c_ifname).remove()
-
-            # create/update client VLAN (vif-c) interface
-            for vif_c_id, vif_c_config in vif_s_config.get('vif_c', {}).items():
-                tmp = deepcopy(VLANIf.get_config())
-                tmp['source_interface'] = vif_s_ifname
-                tmp['vlan_id'] = vif_c_id
-
-                vif_c_ifname = f'{vif_s_ifname}.{vif_c_id}'
-                vif_c_config['ifname'] = vif_c_ifname
-                c_vlan = VLANIf(vif_c_ifname, **tmp)
-                c_vlan.update(vif_c_config)
-
         # remove no longer required 802.1q VLAN interfaces
         for vif_id in config.get('vif_remove', {}):
             vif_ifname = f'{ifname}.{vif_id}'
             VLANIf(vif_ifname).remove()
 
+        # the VLANs only depend on this interface, not on each other, so they
+        # are configured concurrently once the pending writes are done
+        sysfs.flush()
+        updates = []
+
+        # create/update 802.1ad (Q-in-Q VLANs)
+        for vif_s_id, vif_s_config in config.get('vif_s', {}).items():
+            vif_s_ifname = f'{ifname}.{vif_s_id}'
+            vif_s_config['ifname'] = vif_s_ifname
+            updates.append((self._update_vif_s, vif_s_id, vif_s_config))
+
         # create/update 802.1q VLAN interfaces
         for vif_id, vif_config in config.get('vif', {}).items():
+            vif_ifname = f'{ifname}.{vif_id}'
             tmp = deepcopy(VLANIf.get_config())
             tmp['source_interface'] = ifname
             tmp['vlan_id'] = vif_id
 
-            vif_ifname = f'{ifname}.{vif_id}'
             vif_config['ifname'] = vif_ifname
             vlan = VLANIf(vif_ifname, **tmp)
-            vlan.update(vif_config)
+            updates.append((vlan.update, vif_config))
+
+        # What the threads share can be used concurrently: the netlink
+        # snapshot is behind a lock, the pending sysfs writes are kept per
+        # thread, and the class level memos (Section._entries and
+        # Control._signature) only ever store the same value for a name.
+        if updates:
+            workers = min(self._vlan_workers, os.cpu_count() or 1)
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                # the first error is raised once all the VLANs are done
+                list(pool.map(lambda update: update[0](*update[1:]), updates))
+
+    def _update_vif_s(self, vif_s_id, vif_s_config):
+        """ create/update a 802.1ad (Q-in-Q) VLAN and its client VLANs """
+        ifname = self.config['ifname']
+        vif_s_ifname = vif_s_config['ifname']
+
+        tmp = deepcopy(VLANIf.get_config())
+        tmp['protocol'] = vif_s_config['protocol']
+        tmp['source_interface'] = ifname
+        tmp['vlan_id'] = vif_s_id
+
+        s_vlan = VLANIf(vif_s_ifname, **tmp)
+        s_vlan.update(vif_s_config)
+
+        # remove no longer required client VLAN (vif-c)
+        for vif_c_id in vif_s_config.get('vif_c_remove', {}):
+            vif_c_ifname = f'{vif_s_ifname}.{vif_c_id}'
+            VLANIf(vif_c_ifname).remove()
+
+        # create/update client VLAN (vif-c) interface
+        for vif_c_id, vif_c_config in vif_s_config.get('vif_c', {}).items():
+            vif_c_ifname = f'{vif_s_ifname}.{vif_c_id}'
+            tmp = deepcopy(VLANIf.get_config())
+            tmp['source_interface'] = vif_s_ifname
+            tmp['vlan_id'] = vif_c_id
 
+            vif_c_config['ifname'] = vif_c_ifname
+            c_vlan = VLANIf(vif_c_ifname, **tmp)
+            c_vlan.update(vif_c_config)
 
 class VLANIf(Interface):
     """ Specific class which abstracts 802.1q and 802.1ad (Q-in-Q) VLAN interfaces """
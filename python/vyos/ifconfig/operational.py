@@ -14,21 +14,103 @@
 # License along with this library.  If not, see <http://www.gnu.org/licenses/>.
 
 import os
+import mmap
+import fcntl
+import struct
 
 from time import time
 from datetime import datetime
 from functools import reduce
 from tabulate import tabulate
 
+from vyos import netlink
 from vyos.ifconfig import Control
 
+class Counters:
+    """
+    The counters of the interfaces saved when they were cleared, in a single
+    memory mapped file of fixed size records, the record of an interface
+    being found at the offset given by its ifindex. The name of the
+    interface is kept in the record, so the record of a removed interface
+    is not used for another interface given the same ifindex.
+    """
+    def __init__(self, filename, names):
+        self.filename = filename
+        self.names = names
+        # ifname, timestamp of the clear, then the counters
+        self._record = struct.Struct(f'=16sq{len(names)}Q')
+
+    def _map(self, ifindex, write):
+        """
+        returns the mmap of the file, large enough to hold the record of
+        ifindex when writing, or None if there is no record to read
+        """
+        offset = ifindex * self._record.size
+        end = offset + self._record.size
+        try:
+            fd = os.open(self.filename, os.O_RDWR | os.O_CREAT if write else os.O_RDONLY, 0o644)
+        except OSError:
+            return None
+        try:
+            size = os.fstat(fd).st_size
+            if size < end:
+                if not write:
+                    return None
+                # the file is sparse, only the records used take space
+                os.ftruncate(fd, end)
+                size = end
+            access = mmap.ACCESS_WRITE if write else mmap.ACCESS_READ
+            return mmap.mmap(fd, size, access=access)
+        finally:
+            os.close(fd)
+
+    def load(self, ifindex, ifname):
+        """
+        returns the timestamp and the dict of the counters saved for ifname
+        or None if none were saved
+        """
+        m = self._map(ifindex, False)
+        if m is None:
+            return None
+        with m:
+            record = self._record.unpack_from(m, ifindex * self._record.size)
+        name, timestamp, values = record[0], record[1], record[2:]
+        if not timestamp or name.rstrip(b'\0').decode() != ifname:
+            return None
+        return timestamp, dict(zip(self.names, values))
+
+    def save(self, records):
+        """
+        saves the counters, records being a list of (ifindex, ifname, counters)
+        with one write of the file for all of them
+        """
+        if not records:
+            return
+        now = int(time())
+        with open(self.filename, 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            m = self._map(max(_[0] for _ in records), True)
+            with m:
+                for ifindex, ifname, counters in records:
+                    values = [counters.get(_, 0) & 0xFFFFFFFFFFFFFFFF for _ in self.names]
+                    self._record.pack_into(m, ifindex * self._record.size,
+                                           ifname.encode(), now, *values)
+                m.flush()
+
+    def remove(self, ifindex):
+        """ forgets the counters saved for ifindex """
+        with open(self.filename, 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            with self._map(ifindex, True) as m:
+                offset = ifindex * self._record.size
+                m[offset:offset + self._record.size] = bytes(self._record.size)
+
+
 class Operational(Control):
     """
     A class able to load Interface statistics
     """
 
-    cache_magic = 'XYZZYX'
-
     _stat_names = {
         'rx': ['bytes', 'packets', 'errors', 'dropped', 'overrun', 'mcast'],
         'tx': ['bytes', 'packets', 'errors', 'dropped', 'carrier', 'collisions'],
@@ -47,13 +129,14 @@ class Operational(Control):
         'oper_state':{
             'location': '/sys/class/net/{ifname}/operstate',
         },
+        'ifindex':{
+            'location': '/sys/class/net/{ifname}/ifindex',
+        },
     }
 
 
-    @classmethod
-    def cachefile (cls, ifname):
-        # the file where we are saving the counters
-        return f'/var/run/vyatta/{ifname}.stats'
+    # the counters of every interface when they were last cleared
+    counters = Counters('/var/run/vyatta/counters', _stats_all)
 
 
     def __init__(self, ifname):
@@ -93,6 +176,9 @@ class Operational(Control):
         """
         # https://www.kernel.org/doc/Documentation/ABI/testing/sysfs-class-net
         # "unknown", "notpresent", "down", "lowerlayerdown", "testing", "dormant", "up"
+        if self.backend == 'netlink':
+            # as found in sysfs
+            return netlink.snapshot().link(self.ifname)['operstate'].lower()
         return self.get_interface('oper_state')
 
     @classmethod
@@ -102,63 +188,91 @@ class Operational(Control):
         """
         return datetime.fromtimestamp(epoc).strftime("%a %b %d %R:%S %Z %Y")
 
+    def ifindex(self):
+        if self.backend == 'netlink':
+            return netlink.snapshot().link(self.ifname)['ifindex']
+        return int(self.get_interface('ifindex'))
+
     def save_counters(self, stats):
         """
-        record the provided stats to a file keeping vyatta compatibility
+        record the provided stats in the counters store
         """
-
-        with open(self.cachefile(self.ifname), 'w') as f:
-            f.write(self.cache_magic)
-            f.write('\n')
-            f.write(str(int(time())))
-            f.write('\n')
-            for k,v in stats.items():
-                if v:
-                    f.write(f'{k},{v}\n')
+        self.counters.save([(self.ifindex(), self.ifname, stats)])
 
     def load_counters(self):
         """
-        load the stats from a file keeping vyatta compatibility
+        load the stats saved in the counters store
         return a dict() with the value for each interface counter for the cache
         """
-        ifname = self.config['ifname']
-
         stats = {}
-        no_stats = {}
         for name in self._stats_all:
             stats[name] = 0
-            no_stats[name] = 0
 
         try:
-            with open(self.cachefile(self.ifname),'r') as f:
-                magic = f.readline().strip()
-                if magic != self.cache_magic:
-                    print(f'bad magic {ifname}')
-                    return no_stats
-                stats['timestamp'] = f.readline().strip()
-                for line in f:
-                    k, v = line.split(',')
-                    stats[k] = int(v)
+            found = self.counters.load(self.ifindex(), self.ifname)
+        except OSError:
+            found = None
+        if found is None:
             return stats
-        except IOError:
-            return no_stats
+
+        stats['timestamp'], saved = found
+        stats.update(saved)
+        return stats
 
     def clear_counters(self, counters=None):
-        clear = self._stats_all if counters is None else []
-        stats = self.load_counters()
-        for counter, value in stats.items():
-            stats[counter] = 0 if counter in clear else value
-        self.save_counters(stats)
+        """
+        records the current value of the counters, which are then shown
+        from that value
+        """
+        self.save_counters(self.get_stats())
+
+    @classmethod
+    def clear_all_counters(cls, ifnames):
+        """
+        records the current value of the counters of all the interfaces
+        with one netlink dump and one write of the counters store
+        """
+        stats = cls.all_stats()
+        snapshot = netlink.snapshot()
+        records = []
+        for ifname in ifnames:
+            try:
+                ifindex = snapshot.link(ifname)['ifindex']
+            except netlink.NetlinkError:
+                # the interface was removed since it was listed
+                continue
+            if ifindex in stats:
+                records.append((ifindex, ifname, stats[ifindex]))
+        cls.counters.save(records)
+
+    @classmethod
+    def all_stats(cls):
+        """
+        return a dict() with the counters of every interface, by ifindex,
+        read with a single netlink dump
+        """
+        return netlink.get_stats()
 
     def reset_counters(self):
-        os.remove(self.cachefile(self.ifname))
+        self.counters.remove(self.ifindex())
 
-    def get_stats(self):
-        """ return a dict() with the value for each interface counter """
-        stats = {}
-        for counter in self._stats_all:
-            stats[counter] = int(self.get_interface(counter))
-        return stats
+    def get_stats(self, stats=None):
+        """
+        return a dict() with the value for each interface counter
+        stats can be the result of all_stats() when the counters of many
+        interfaces are needed
+        """
+        if self.backend != 'netlink':
+            stats = {}
+            for counter in self._stats_all:
+                stats[counter] = int(self.get_interface(counter))
+            return stats
+
+        if stats is None:
+            found = netlink.get_stats(self.ifname)
+        else:
+            found = stats.get(self.ifindex(), {})
+        return {counter: found.get(counter, 0) for counter in self._stats_all}
 
     def formated_stats(self, indent=4):
         tabs = []
@@ -16,11 +16,23 @@
 import re
 import netifaces
 
+from collections import namedtuple
+
+from vyos import netlink
+
+# what the name of an interface tells about it, eth0.10.20 being:
+# Entry(section='ethernet', parent='eth0.10', vlan=10, qinq=20, key=...)
+# key is the value used to sort the interfaces
+Entry = namedtuple('Entry', ['section', 'parent', 'vlan', 'qinq', 'key'])
+
 
 class Section:
     # the known interface prefixes
     _prefixes = {}
     _classes = []
+    # the Entry of each interface name seen, a name always gives the same
+    # Entry once the classes are registered
+    _entries = {}
 
     # class need to define: definition['prefixes']
     # the interface prefixes declared by a class used to name interface with
@@ -43,6 +55,8 @@ class Section:
                 raise RuntimeError(f'only one class can be registered for prefix "{ifprefix}" type')
             cls._prefixes[ifprefix] = klass
 
+        cls._entries.clear()
+
         return klass
 
     @classmethod
@@ -85,16 +99,58 @@ class Section:
             return cls._prefixes[name]
         raise ValueError(f'No type found for interface name: {name}')
 
+    @classmethod
+    def entry(cls, ifname):
+        """
+        return the Entry describing the interface ifname, computed only
+        the first time the name is seen
+        """
+        found = cls._entries.get(ifname, None)
+        if found is not None:
+            return found
+
+        parts = re.split(r'([^0-9]+)([0-9]+)[.]?([0-9]+)?[.]?([0-9]+)?', ifname)
+        length = len(parts)
+        name = parts[1] if length >= 3 else parts[0]
+        number = int(parts[2]) if length >= 4 and parts[2] is not None else None
+        vlan = int(parts[3]) if length >= 5 and parts[3] is not None else None
+        qinq = int(parts[4]) if length >= 6 and parts[4] is not None else None
+
+        value = 0
+        # so that "lo" (or short names) are handled (as "loa")
+        for n in (name + 'aaa')[:3]:
+            value *= 100
+            value += (ord(n) - ord('a'))
+        # the +1 makes sure eth0.0.0 after eth0.0
+        value += number + 1 if number is not None else 0
+        # vlan are 16 bits, so this can not overflow
+        value = (value << 16) + (vlan + 1 if vlan is not None else 0)
+        value = (value << 16) + (qinq + 1 if qinq is not None else 0)
+
+        parent = ifname.rsplit('.', 1)[0] if vlan is not None else None
+        found = Entry(cls.section(ifname), parent, vlan, qinq, value)
+        cls._entries[ifname] = found
+        return found
+
+    @classmethod
+    def _ifnames(cls):
+        """
+        return the name of the interfaces of the system, from the links
+        snapshot shared by the process (read once until invalidated)
+        """
+        try:
+            return netlink.snapshot().ifnames()
+        except OSError:
+            return netifaces.interfaces()
+
     @classmethod
     def _intf_under_section (cls,section=''):
         """
         return a generator with the name of the configured interface
         which are under a section
         """
-        interfaces = netifaces.interfaces()
-
-        for ifname in interfaces:
-            ifsection = cls.section(ifname)
+        for ifname in cls._ifnames():
+            ifsection = cls.entry(ifname).section
             if not ifsection:
                 continue
 
@@ -108,28 +164,8 @@ class Section:
         """
         return a list of the sorted interface by number, vlan, qinq
         """
-        def key(ifname):
-            value = 0
-            parts = re.split(r'([^0-9]+)([0-9]+)[.]?([0-9]+)?[.]?([0-9]+)?', ifname)
-            length = len(parts)
-            name = parts[1] if length >= 3 else parts[0]
-            # the +1 makes sure eth0.0.0 after eth0.0
-            number = int(parts[2]) + 1 if length >= 4 and parts[2] is not None else 0
-            vlan = int(parts[3]) + 1 if length >= 5 and parts[3] is not None else 0
-            qinq = int(parts[4]) + 1 if length >= 6 and parts[4] is not None else 0
-
-            # so that "lo" (or short names) are handled (as "loa")
-            for n in (name + 'aaa')[:3]:
-                value *= 100
-                value += (ord(n) - ord('a'))
-            value += number
-            # vlan are 16 bits, so this can not overflow
-            value = (value << 16) + vlan
-            value = (value << 16) + qinq
-            return value
-
         l = list(generator)
-        l.sort(key=key)
+        l.sort(key=lambda ifname: cls.entry(ifname).key)
         return l
 
     @classmethod
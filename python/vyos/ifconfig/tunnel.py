@@ -20,6 +20,7 @@ from netaddr import EUI
 from netaddr import mac_unix_expanded
 from random import getrandbits
 
+from vyos import netlink
 from vyos.ifconfig.interface import Interface
 from vyos.util import dict_search
 from vyos.validate import assert_list
@@ -84,11 +85,13 @@ class TunnelIf(Interface):
                 'validate': lambda v: assert_list(v, ['enable', 'disable']),
                 'convert': enable_to_on,
                 'shellcmd': 'ip link set dev {ifname} multicast {value}',
+                'netlink': lambda i, v: netlink.set_link(i, multicast=v == 'enable'),
             },
             'allmulticast': {
                 'validate': lambda v: assert_list(v, ['enable', 'disable']),
                 'convert': enable_to_on,
                 'shellcmd': 'ip link set dev {ifname} allmulticast {value}',
+                'netlink': lambda i, v: netlink.set_link(i, allmulticast=v == 'enable'),
             },
         }
     }
@@ -47,3 +47,7 @@ class VTunIf(Interface):
     def del_addr(self, addr):
         # IP addresses are managed by OpenVPN daemon
         pass
+
+    def _update_addrs(self, new_addr):
+        # IP addresses are managed by OpenVPN daemon
+        pass
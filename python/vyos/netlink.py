@@ -0,0 +1,765 @@
+# Copyright 2021 VyOS maintainers and contributors <maintainers@vyos.io>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+A minimal rtnetlink client, used to query and change links and addresses
+in-process rather than by running ip(8) or bridge(8) for every operation.
+
+Only the messages and attributes VyOS needs are implemented; the dicts
+returned use the same names as the output of 'ip -json -detail'.
+"""
+
+import os
+import errno
+import socket
+import struct
+import threading
+import ipaddress
+
+NETLINK_ROUTE = 0
+
+SOL_NETLINK = 270
+NETLINK_GET_STRICT_CHK = 12
+
+NLMSG_ERROR = 2
+NLMSG_DONE = 3
+
+NLM_F_REQUEST = 0x01
+NLM_F_MULTI = 0x02
+NLM_F_ACK = 0x04
+NLM_F_DUMP = 0x300
+NLM_F_EXCL = 0x200
+NLM_F_CREATE = 0x400
+
+NLA_F_NESTED = 0x8000
+
+RTM_NEWLINK = 16
+RTM_DELLINK = 17
+RTM_GETLINK = 18
+RTM_SETLINK = 19
+RTM_NEWADDR = 20
+RTM_DELADDR = 21
+RTM_GETADDR = 22
+RTM_NEWSTATS = 92
+RTM_GETSTATS = 94
+
+IFLA_ADDRESS = 1
+IFLA_IFNAME = 3
+IFLA_MTU = 4
+IFLA_LINK = 5
+IFLA_MASTER = 10
+IFLA_PROTINFO = 12
+IFLA_OPERSTATE = 16
+IFLA_IFALIAS = 20
+IFLA_MIN_MTU = 50
+IFLA_MAX_MTU = 51
+
+IFLA_EXT_MASK = 29
+IFLA_AF_SPEC = 26
+
+IFLA_BRPORT_ISOLATED = 33
+
+IFLA_BRIDGE_FLAGS = 0
+IFLA_BRIDGE_VLAN_INFO = 2
+
+BRIDGE_FLAGS_SELF = 2
+
+BRIDGE_VLAN_INFO_PVID = 0x2
+BRIDGE_VLAN_INFO_UNTAGGED = 0x4
+BRIDGE_VLAN_INFO_RANGE_BEGIN = 0x8
+BRIDGE_VLAN_INFO_RANGE_END = 0x10
+
+RTEXT_FILTER_BRVLAN_COMPRESSED = 0x8
+
+IFA_ADDRESS = 1
+IFA_LOCAL = 2
+IFA_LABEL = 3
+IFA_BROADCAST = 4
+
+IFLA_STATS_LINK_64 = 1
+
+AF_BRIDGE = 7
+
+RT_SCOPE_UNIVERSE = 0
+RT_SCOPE_LINK = 253
+RT_SCOPE_HOST = 254
+
+IFF_UP = 0x1
+IFF_ALLMULTI = 0x200
+IFF_MULTICAST = 0x1000
+
+# in the order used by ip(8) when listing the flags
+_flags = (
+    (0x8, 'LOOPBACK'),
+    (0x2, 'BROADCAST'),
+    (0x10, 'POINTOPOINT'),
+    (0x1000, 'MULTICAST'),
+    (0x80, 'NOARP'),
+    (0x200, 'ALLMULTI'),
+    (0x100, 'PROMISC'),
+    (0x400, 'MASTER'),
+    (0x800, 'SLAVE'),
+    (0x1, 'UP'),
+    (0x10000, 'LOWER_UP'),
+    (0x20000, 'DORMANT'),
+)
+
+_operstates = ('UNKNOWN', 'NOTPRESENT', 'DOWN', 'LOWERLAYERDOWN',
+               'TESTING', 'DORMANT', 'UP')
+
+_nlmsghdr = struct.Struct('=IHHII')
+_ifinfomsg = struct.Struct('=BxHiII')
+_ifaddrmsg = struct.Struct('=BBBBi')
+_rtattr = struct.Struct('=HH')
+_if_stats_msg = struct.Struct('=BxxxII')
+_bridge_vlan_info = struct.Struct('=HH')
+
+# the fields of struct rtnl_link_stats64, as named in sysfs statistics/
+_stats64 = ('rx_packets', 'tx_packets', 'rx_bytes', 'tx_bytes',
+            'rx_errors', 'tx_errors', 'rx_dropped', 'tx_dropped',
+            'multicast', 'collisions',
+            'rx_length_errors', 'rx_over_errors', 'rx_crc_errors',
+            'rx_frame_errors', 'rx_fifo_errors', 'rx_missed_errors',
+            'tx_aborted_errors', 'tx_carrier_errors', 'tx_fifo_errors',
+            'tx_heartbeat_errors', 'tx_window_errors',
+            'rx_compressed', 'tx_compressed', 'rx_nohandler')
+
+
+class NetlinkError(OSError):
+    pass
+
+
+def _align(length):
+    return (length + 3) & ~3
+
+
+def attr(kind, payload):
+    """ returns a netlink attribute (rtattr) with its padding """
+    length = _rtattr.size + len(payload)
+    return _rtattr.pack(length, kind) + payload + b'\0' * (_align(length) - length)
+
+
+def attrs(data, offset=0):
+    """ returns the netlink attributes in data as a dict of type to payload """
+    r = {}
+    while offset + _rtattr.size <= len(data):
+        length, kind = _rtattr.unpack_from(data, offset)
+        if length < _rtattr.size:
+            break
+        r[kind & ~NLA_F_NESTED] = data[offset + _rtattr.size:offset + length]
+        offset += _align(length)
+    return r
+
+
+def _u8(value):
+    return struct.pack('=B', value)
+
+
+def _u32(value):
+    return struct.pack('=I', value)
+
+
+def _string(payload):
+    return payload.split(b'\0', 1)[0].decode()
+
+
+def _integer(payload):
+    return struct.unpack('=I', payload[:4])[0]
+
+
+class Route:
+    """
+    A NETLINK_ROUTE socket, the requests are serialised so the object can
+    be shared between threads
+    """
+    def __init__(self):
+        self._sock = socket.socket(socket.AF_NETLINK,
+                                   socket.SOCK_RAW | socket.SOCK_CLOEXEC,
+                                   NETLINK_ROUTE)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+        try:
+            # so that the kernel filters the dumps (by ifindex for example)
+            self._sock.setsockopt(SOL_NETLINK, NETLINK_GET_STRICT_CHK, 1)
+        except OSError:
+            pass
+        self._sock.bind((0, 0))
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def close(self):
+        self._sock.close()
+
+    def request(self, kind, flags, payload):
+        """
+        sends a request and returns the (type, payload) of the answers,
+        raises NetlinkError if the kernel reports an error
+        """
+        with self._lock:
+            self._seq += 1
+            seq = self._seq
+            header = _nlmsghdr.pack(_nlmsghdr.size + len(payload), kind,
+                                    flags | NLM_F_REQUEST, seq, 0)
+            self._sock.send(header + payload)
+            return list(self._answers(seq))
+
+    def batch(self, messages):
+        """
+        sends the (type, flags, payload) requests with as few writes as
+        possible, and waits for them to be acknowledged, returns the
+        NetlinkError of the messages which failed as a dict by index
+        """
+        errors = {}
+        with self._lock:
+            for start in range(0, len(messages), _batch_size):
+                pending = {}
+                data = b''
+                for index in range(start, min(start + _batch_size, len(messages))):
+                    kind, flags, payload = messages[index]
+                    self._seq += 1
+                    pending[self._seq] = index
+                    data += _nlmsghdr.pack(_nlmsghdr.size + len(payload), kind,
+                                           flags | NLM_F_REQUEST | NLM_F_ACK, self._seq, 0)
+                    data += payload
+                self._sock.send(data)
+                while pending:
+                    data = self._sock.recv(1 << 20)
+                    offset = 0
+                    while offset + _nlmsghdr.size <= len(data):
+                        length, kind, _, seq, _ = _nlmsghdr.unpack_from(data, offset)
+                        body = data[offset + _nlmsghdr.size:offset + length]
+                        offset += _align(length)
+                        if kind != NLMSG_ERROR or seq not in pending:
+                            continue
+                        index = pending.pop(seq)
+                        error = -struct.unpack_from('=i', body)[0]
+                        if error:
+                            errors[index] = NetlinkError(error, os.strerror(error))
+        return errors
+
+    def _answers(self, seq):
+        while True:
+            data = self._sock.recv(1 << 20)
+            offset = 0
+            while offset + _nlmsghdr.size <= len(data):
+                length, kind, flags, answer, _ = _nlmsghdr.unpack_from(data, offset)
+                body = data[offset + _nlmsghdr.size:offset + length]
+                offset += _align(length)
+                # left over from a previous request which failed
+                if answer != seq:
+                    continue
+                if kind == NLMSG_ERROR:
+                    error = -struct.unpack_from('=i', body)[0]
+                    if error:
+                        raise NetlinkError(error, os.strerror(error))
+                    return
+                if kind == NLMSG_DONE:
+                    return
+                yield kind, body
+                if not flags & NLM_F_MULTI:
+                    return
+
+
+# the number of messages sent with one write by Route.batch(), the kernel
+# processes them in order, and the acknowledgements fit the receive buffer
+_batch_size = 1024
+
+_route = []
+_route_lock = threading.Lock()
+
+def route():
+    """ returns the NETLINK_ROUTE socket of this process """
+    if not _route:
+        with _route_lock:
+            if not _route:
+                _route.append(Route())
+    return _route[0]
+
+
+def _link(body):
+    family, kind, index, flags, _ = _ifinfomsg.unpack_from(body)
+    found = attrs(body, _ifinfomsg.size)
+
+    link = {
+        'ifindex': index,
+        'flags': [name for bit, name in _flags if flags & bit],
+    }
+    if IFLA_IFNAME in found:
+        link['ifname'] = _string(found[IFLA_IFNAME])
+    if IFLA_MTU in found:
+        link['mtu'] = _integer(found[IFLA_MTU])
+    if IFLA_MIN_MTU in found:
+        link['min_mtu'] = _integer(found[IFLA_MIN_MTU])
+    if IFLA_MAX_MTU in found:
+        link['max_mtu'] = _integer(found[IFLA_MAX_MTU])
+    if IFLA_OPERSTATE in found:
+        state = found[IFLA_OPERSTATE][0]
+        link['operstate'] = _operstates[state] if state < len(_operstates) else 'UNKNOWN'
+    if IFLA_ADDRESS in found:
+        link['address'] = ':'.join(f'{_:02x}' for _ in found[IFLA_ADDRESS])
+    if IFLA_IFALIAS in found:
+        link['ifalias'] = _string(found[IFLA_IFALIAS])
+    if IFLA_MASTER in found:
+        link['master'] = _integer(found[IFLA_MASTER])
+    if IFLA_LINK in found:
+        link['link_index'] = _integer(found[IFLA_LINK])
+    return link
+
+
+def get_link(ifname):
+    """
+    returns the dict describing the link ifname, as 'ip -json -detail link'
+    raises NetlinkError (ENODEV) if the link does not exists
+    """
+    payload = _ifinfomsg.pack(socket.AF_UNSPEC, 0, 0, 0, 0)
+    payload += attr(IFLA_IFNAME, ifname.encode() + b'\0')
+    for kind, body in route().request(RTM_GETLINK, 0, payload):
+        if kind == RTM_NEWLINK:
+            return _link(body)
+    raise NetlinkError(errno.ENODEV, os.strerror(errno.ENODEV))
+
+
+def get_links():
+    """ returns the dicts describing every link """
+    payload = _ifinfomsg.pack(socket.AF_UNSPEC, 0, 0, 0, 0)
+    return [_link(body) for kind, body in
+            route().request(RTM_GETLINK, NLM_F_DUMP, payload)
+            if kind == RTM_NEWLINK]
+
+
+def _stats(body):
+    family, index, mask = _if_stats_msg.unpack_from(body)
+    found = attrs(body, _if_stats_msg.size)
+    payload = found.get(IFLA_STATS_LINK_64, b'')
+    # older kernels send less counters, newer ones more
+    count = min(len(payload) // 8, len(_stats64))
+    values = struct.unpack_from(f'={count}Q', payload)
+    return index, dict(zip(_stats64, values))
+
+
+def get_stats(ifname=None):
+    """
+    returns the counters of ifname, as found in sysfs statistics/, or with
+    no ifname the counters of every link, by ifindex, read with one dump
+    """
+    mask = 1 << (IFLA_STATS_LINK_64 - 1)
+    if ifname:
+        payload = _if_stats_msg.pack(socket.AF_UNSPEC, socket.if_nametoindex(ifname), mask)
+        for kind, body in route().request(RTM_GETSTATS, 0, payload):
+            if kind == RTM_NEWSTATS:
+                return _stats(body)[1]
+        raise NetlinkError(errno.ENODEV, os.strerror(errno.ENODEV))
+
+    payload = _if_stats_msg.pack(socket.AF_UNSPEC, 0, mask)
+    return dict(_stats(body) for kind, body in
+                route().request(RTM_GETSTATS, NLM_F_DUMP, payload)
+                if kind == RTM_NEWSTATS)
+
+
+def set_link(ifname, up=None, mtu=None, address=None, alias=None, master=None,
+             multicast=None, allmulticast=None):
+    """
+    changes the link ifname, only the options given are changed,
+    master is the name of the master link, or '' to remove it
+    """
+    flags = 0
+    change = 0
+    for option, bit in ((up, IFF_UP), (multicast, IFF_MULTICAST),
+                        (allmulticast, IFF_ALLMULTI)):
+        if option is None:
+            continue
+        change |= bit
+        if option:
+            flags |= bit
+
+    payload = _ifinfomsg.pack(socket.AF_UNSPEC, 0, 0, flags, change)
+    payload += attr(IFLA_IFNAME, ifname.encode() + b'\0')
+    if mtu is not None:
+        payload += attr(IFLA_MTU, _u32(int(mtu)))
+    if address is not None:
+        payload += attr(IFLA_ADDRESS, bytes.fromhex(address.replace(':', '')))
+    if alias is not None:
+        payload += attr(IFLA_IFALIAS, alias.encode())
+    if master is not None:
+        index = socket.if_nametoindex(master) if master else 0
+        payload += attr(IFLA_MASTER, _u32(index))
+
+    try:
+        route().request(RTM_NEWLINK, NLM_F_ACK, payload)
+    finally:
+        invalidate(ifname)
+
+
+def del_link(ifname):
+    payload = _ifinfomsg.pack(socket.AF_UNSPEC, 0, 0, 0, 0)
+    payload += attr(IFLA_IFNAME, ifname.encode() + b'\0')
+    try:
+        route().request(RTM_DELLINK, NLM_F_ACK, payload)
+    finally:
+        invalidate(ifname)
+
+
+def set_bridge_port(ifname, isolated):
+    """ changes the bridge port options of ifname, as 'bridge link set' """
+    index = socket.if_nametoindex(ifname)
+    payload = _ifinfomsg.pack(AF_BRIDGE, 0, index, 0, 0)
+    payload += attr(IFLA_PROTINFO | NLA_F_NESTED,
+                    attr(IFLA_BRPORT_ISOLATED, _u8(1 if isolated else 0)))
+    try:
+        route().request(RTM_SETLINK, NLM_F_ACK, payload)
+    finally:
+        invalidate(ifname)
+
+
+def _u16(value):
+    return struct.pack('=H', value)
+
+
+def _bridge_vlans(body):
+    """ returns the ifname and the {vid: flags} of a bridge dump answer """
+    found = attrs(body, _ifinfomsg.size)
+    ifname = _string(found[IFLA_IFNAME]) if IFLA_IFNAME in found else None
+    spec = found.get(IFLA_AF_SPEC, b'')
+    vlans = {}
+    begin = None
+    offset = 0
+    # IFLA_BRIDGE_VLAN_INFO is repeated, attrs() would only keep the last
+    while offset + _rtattr.size <= len(spec):
+        length, kind = _rtattr.unpack_from(spec, offset)
+        if length < _rtattr.size:
+            break
+        if kind & ~NLA_F_NESTED == IFLA_BRIDGE_VLAN_INFO:
+            flags, vid = _bridge_vlan_info.unpack_from(spec, offset + _rtattr.size)
+            if flags & BRIDGE_VLAN_INFO_RANGE_BEGIN:
+                begin = vid
+            else:
+                first = begin if flags & BRIDGE_VLAN_INFO_RANGE_END else vid
+                keep = flags & (BRIDGE_VLAN_INFO_PVID | BRIDGE_VLAN_INFO_UNTAGGED)
+                for _ in range(first, vid + 1):
+                    vlans[_] = keep
+                begin = None
+        offset += _align(length)
+    return ifname, vlans
+
+
+def get_bridge_vlans():
+    """
+    returns the VLANs of every bridge and bridge port, as 'bridge vlan show'
+    {'eth1': {1: PVID|UNTAGGED, 10: 0, 11: 0}, ...} read with one dump
+    """
+    payload = _ifinfomsg.pack(AF_BRIDGE, 0, 0, 0, 0)
+    payload += attr(IFLA_EXT_MASK, _u32(RTEXT_FILTER_BRVLAN_COMPRESSED))
+    found = {}
+    for kind, body in route().request(RTM_GETLINK, NLM_F_DUMP, payload):
+        if kind != RTM_NEWLINK:
+            continue
+        ifname, vlans = _bridge_vlans(body)
+        if ifname is not None:
+            found.setdefault(ifname, {}).update(vlans)
+    return found
+
+
+def vlan_ranges(vlans):
+    """
+    returns the (first, last, flags) ranges of consecutive VLANs with the
+    same flags from a {vid: flags} dict, a PVID is always on its own
+    """
+    ranges = []
+    for vid in sorted(vlans):
+        flags = vlans[vid]
+        if ranges and not flags & BRIDGE_VLAN_INFO_PVID:
+            first, last, previous = ranges[-1]
+            if last + 1 == vid and previous == flags:
+                ranges[-1] = (first, vid, flags)
+                continue
+        ranges.append((vid, vid, flags))
+    return ranges
+
+
+def _vlan_infos(ranges):
+    payload = b''
+    for first, last, flags in ranges:
+        if first == last:
+            payload += attr(IFLA_BRIDGE_VLAN_INFO, _bridge_vlan_info.pack(flags, first))
+            continue
+        payload += attr(IFLA_BRIDGE_VLAN_INFO,
+                        _bridge_vlan_info.pack(flags | BRIDGE_VLAN_INFO_RANGE_BEGIN, first))
+        payload += attr(IFLA_BRIDGE_VLAN_INFO,
+                        _bridge_vlan_info.pack(flags | BRIDGE_VLAN_INFO_RANGE_END, last))
+    return payload
+
+
+# the number of VLAN ranges sent with one message, so the message remains
+# well below the size of the socket buffers
+_vlan_chunk = 512
+
+def set_bridge_vlans(ifname, add={}, delete={}, master=True):
+    """
+    removes then adds VLANs of a bridge port, or of the bridge itself when
+    master is False (as 'bridge vlan add ... self'), add and delete are
+    {vid: flags} dicts, the VLANs are sent as ranges in as few messages
+    as possible
+    """
+    index = socket.if_nametoindex(ifname)
+    flags = attr(IFLA_BRIDGE_FLAGS, _u16(BRIDGE_FLAGS_SELF)) if not master else b''
+    header = _ifinfomsg.pack(AF_BRIDGE, 0, index, 0, 0)
+    try:
+        for kind, vlans in ((RTM_DELLINK, delete), (RTM_SETLINK, add)):
+            ranges = vlan_ranges(vlans)
+            while ranges:
+                chunk, ranges = ranges[:_vlan_chunk], ranges[_vlan_chunk:]
+                payload = header + attr(IFLA_AF_SPEC | NLA_F_NESTED, flags + _vlan_infos(chunk))
+                route().request(kind, NLM_F_ACK, payload)
+    finally:
+        invalidate(ifname)
+
+
+def _addr(body):
+    family, prefixlen, flags, scope, index = _ifaddrmsg.unpack_from(body)
+    found = attrs(body, _ifaddrmsg.size)
+    local = found.get(IFA_LOCAL, found.get(IFA_ADDRESS, b''))
+    return {
+        'ifindex': index,
+        'family': family,
+        'prefixlen': prefixlen,
+        'scope': scope,
+        'local': str(ipaddress.ip_address(local)) if local else None,
+        'address': found.get(IFA_ADDRESS, None),
+        'label': _string(found[IFA_LABEL]) if IFA_LABEL in found else None,
+    }
+
+
+def get_addrs(ifname=None):
+    """
+    returns the dicts describing the addresses of ifname (or of every link),
+    'local' is the address, without the prefix length
+    """
+    index = socket.if_nametoindex(ifname) if ifname else 0
+    payload = _ifaddrmsg.pack(socket.AF_UNSPEC, 0, 0, 0, index)
+    addrs = [_addr(body) for kind, body in
+             route().request(RTM_GETADDR, NLM_F_DUMP, payload)
+             if kind == RTM_NEWADDR]
+    if index:
+        addrs = [_ for _ in addrs if _['ifindex'] == index]
+    return addrs
+
+
+def _scope(ip):
+    # as ip(8) does when no scope is given
+    if ip.is_loopback:
+        return RT_SCOPE_HOST
+    if ip.version == 6 and ip.is_link_local:
+        return RT_SCOPE_LINK
+    return RT_SCOPE_UNIVERSE
+
+
+def _addr_payload(ifname, addr, scope=None):
+    interface = ipaddress.ip_interface(addr)
+    ip = interface.ip
+    family = socket.AF_INET if ip.version == 4 else socket.AF_INET6
+    prefixlen = interface.network.prefixlen
+    if scope is None:
+        scope = _scope(ip)
+    payload = _ifaddrmsg.pack(family, prefixlen, 0, scope,
+                              socket.if_nametoindex(ifname))
+    payload += attr(IFA_LOCAL, ip.packed)
+    payload += attr(IFA_ADDRESS, ip.packed)
+    return payload, interface
+
+
+def add_addr(ifname, addr, broadcast=True):
+    """
+    adds the address (with its prefix length) to ifname, with the IPv4
+    broadcast address set as 'ip addr add ... brd +' does if broadcast is set
+    """
+    payload, interface = _addr_payload(ifname, addr)
+    if broadcast and interface.version == 4 and interface.network.prefixlen < 31:
+        payload += attr(IFA_BROADCAST, interface.network.broadcast_address.packed)
+    try:
+        route().request(RTM_NEWADDR, NLM_F_ACK | NLM_F_CREATE | NLM_F_EXCL, payload)
+    finally:
+        invalidate(ifname)
+
+
+def del_addr(ifname, addr):
+    payload, _ = _addr_payload(ifname, addr, RT_SCOPE_UNIVERSE)
+    try:
+        route().request(RTM_DELADDR, NLM_F_ACK, payload)
+    finally:
+        invalidate(ifname)
+
+
+def change_addrs(delete=[], add=[]):
+    """
+    removes then adds addresses, delete and add being lists of (ifname, addr),
+    with one batch of messages, raises a NetlinkError naming every address
+    which could not be changed once all the others were
+    """
+    messages = []
+    changes = []
+    for ifname, addr in delete:
+        payload, _ = _addr_payload(ifname, addr, RT_SCOPE_UNIVERSE)
+        messages.append((RTM_DELADDR, 0, payload))
+        changes.append((ifname, f'delete {addr}'))
+    for ifname, addr in add:
+        payload, interface = _addr_payload(ifname, addr)
+        if interface.version == 4 and interface.network.prefixlen < 31:
+            payload += attr(IFA_BROADCAST, interface.network.broadcast_address.packed)
+        messages.append((RTM_NEWADDR, NLM_F_CREATE | NLM_F_EXCL, payload))
+        changes.append((ifname, f'add {addr}'))
+
+    try:
+        errors = route().batch(messages)
+    finally:
+        for ifname in set(_[0] for _ in changes):
+            invalidate(ifname)
+
+    failed = []
+    for index, error in sorted(errors.items()):
+        # removing a primary IPv4 address removes its secondaries
+        if messages[index][0] == RTM_DELADDR and error.errno == errno.EADDRNOTAVAIL:
+            continue
+        ifname, change = changes[index]
+        failed.append(f'{change} on {ifname}: {error.strerror}')
+    if failed:
+        raise NetlinkError(errno.EINVAL, 'could not ' + ', '.join(failed))
+
+
+def flush_addrs(ifname):
+    """ removes all the addresses of ifname, as 'ip addr flush dev' """
+    try:
+        for found in get_addrs(ifname):
+            payload = _ifaddrmsg.pack(found['family'], found['prefixlen'], 0,
+                                      found['scope'], found['ifindex'])
+            payload += attr(IFA_LOCAL, ipaddress.ip_address(found['local']).packed)
+            if found['address']:
+                payload += attr(IFA_ADDRESS, found['address'])
+            try:
+                route().request(RTM_DELADDR, NLM_F_ACK, payload)
+            except NetlinkError as e:
+                # removing a primary IPv4 address removes its secondaries
+                if e.errno != errno.EADDRNOTAVAIL:
+                    raise
+    finally:
+        invalidate(ifname)
+
+class Snapshot:
+    """
+    The links and addresses of the system, read with one dump of each and
+    indexed by ifname, so that reading the state of many interfaces does
+    not cost a request per attribute. The entry of a link is read again
+    after it was invalidated, as the functions of this module changing a
+    link do.
+    """
+    def __init__(self):
+        self._links = None
+        self._addrs = None
+        self._stale = set()
+        # the bridge VLANs can only be dumped for every link at once
+        self._vlans = None
+        self._vlans_stale = set()
+        self._lock = threading.Lock()
+
+    def _load(self):
+        links = {}
+        names = {}
+        for link in get_links():
+            links[link['ifname']] = link
+            names[link['ifindex']] = link['ifname']
+        addrs = {name: [] for name in links}
+        for addr in get_addrs():
+            name = names.get(addr['ifindex'], None)
+            if name is not None:
+                addrs[name].append(addr)
+        self._links = links
+        self._addrs = addrs
+        self._stale = set()
+
+    def _refresh(self, ifname):
+        self._stale.discard(ifname)
+        try:
+            self._links[ifname] = get_link(ifname)
+            self._addrs[ifname] = get_addrs(ifname)
+        except OSError:
+            # the link does not exist (anymore)
+            self._links.pop(ifname, None)
+            self._addrs.pop(ifname, None)
+
+    def _entry(self, table, ifname):
+        with self._lock:
+            if self._links is None:
+                self._load()
+            # also look for links created since the dump
+            if ifname in self._stale or ifname not in self._links:
+                self._refresh(ifname)
+            found = getattr(self, table).get(ifname, None)
+        if found is None:
+            raise NetlinkError(errno.ENODEV, os.strerror(errno.ENODEV))
+        return found
+
+    def link(self, ifname):
+        """ returns the dict describing the link ifname, as get_link() """
+        return self._entry('_links', ifname)
+
+    def addrs(self, ifname):
+        """ returns the dicts describing the addresses of ifname, as get_addrs() """
+        return self._entry('_addrs', ifname)
+
+    def vlans(self, ifname):
+        """
+        returns the bridge VLANs of ifname, as get_bridge_vlans(), the VLANs
+        of every link are dumped again if the ones of ifname may have changed
+        """
+        with self._lock:
+            if self._vlans is None or ifname in self._vlans_stale:
+                self._vlans = get_bridge_vlans()
+                self._vlans_stale = set()
+            return dict(self._vlans.get(ifname, {}))
+
+    def ifnames(self):
+        with self._lock:
+            if self._links is None:
+                self._load()
+            for ifname in list(self._stale):
+                self._refresh(ifname)
+            return list(self._links)
+
+    def invalidate(self, ifname=None):
+        """ forgets the state of the link ifname, or of every link """
+        with self._lock:
+            if ifname is None:
+                self._links = None
+                self._addrs = None
+                self._vlans = None
+                return
+            if self._links is not None:
+                self._stale.add(ifname)
+            if self._vlans is not None:
+                self._vlans_stale.add(ifname)
+
+
+_snapshot = Snapshot()
+
+def snapshot():
+    """ returns the Snapshot of the links shared by this process """
+    return _snapshot
+
+
+def invalidate(ifname=None):
+    """
+    to call after changing the link ifname by other means than this module,
+    or with no ifname when the state of every link may have changed
+    (for example at the start of a commit)
+    """
+    _snapshot.invalidate(ifname)
@@ -38,6 +38,11 @@ from subprocess import PIPE
 from subprocess import STDOUT
 from subprocess import DEVNULL
 
+# callables notified of every command run through popen with the command,
+# the pid of the child, its return code and how long it took to complete,
+# for example by vyos-configd to account for the time spent in children
+popen_hooks = []
+
 
 def popen(command, flag='', shell=None, input=None, timeout=None, env=None,
           stdout=PIPE, stderr=PIPE, decode='utf-8', autosudo=True):
@@ -74,6 +79,7 @@ def popen(command, flag='', shell=None, input=None, timeout=None, env=None,
     # a circual import dependency
     from vyos import debug
     from vyos import airbag
+    from time import monotonic as time
 
     # log if the flag is set, otherwise log if command is set
     if not debug.enabled(flag):
@@ -98,6 +104,7 @@ def popen(command, flag='', shell=None, input=None, timeout=None, env=None,
         stdin = PIPE
         input = input.encode() if type(input) is str else input
 
+    start = time()
     p = Popen(
         command,
         stdin=stdin, stdout=stdout, stderr=stderr,
@@ -106,6 +113,9 @@ def popen(command, flag='', shell=None, input=None, timeout=None, env=None,
 
     pipe = p.communicate(input, timeout)
 
+    for hook in popen_hooks:
+        hook(command, p.pid, p.returncode, time() - start)
+
     pipe_out = b''
     if stdout == PIPE:
         pipe_out = pipe[0]
@@ -422,6 +432,90 @@ def _get_sub_dict(d, lpath):
         return {}
     return _get_sub_dict(c[k], lpath)
 
+def copy_on_write(value):
+    """ Returns a private version of a dict or list value (see CopyOnWriteDict) """
+    if isinstance(value, dict):
+        return CopyOnWriteDict(value)
+    if isinstance(value, list):
+        return list(value)
+    return value
+
+class CopyOnWriteDict(dict):
+    """ A dict sharing the nested dicts and lists of the dict it was created
+    from, instead of a deepcopy of it. A nested dict or list is only copied
+    (one level at a time) the first time it is accessed, so changes made
+    through a CopyOnWriteDict never reach the original, which can be kept
+    cached and shared between callers.
+    """
+    def __init__(self, source={}):
+        dict.__init__(self, source)
+        # keys whose value is already private to this dict
+        self._owned = set()
+
+    def _own(self, key):
+        value = dict.__getitem__(self, key)
+        if key not in self._owned:
+            value = copy_on_write(value)
+            dict.__setitem__(self, key, value)
+            self._owned.add(key)
+        return value
+
+    def __getitem__(self, key):
+        return self._own(key)
+
+    def __setitem__(self, key, value):
+        dict.__setitem__(self, key, value)
+        self._owned.add(key)
+
+    def __delitem__(self, key):
+        dict.__delitem__(self, key)
+        self._owned.discard(key)
+
+    def get(self, key, default=None):
+        if key in self:
+            return self._own(key)
+        return default
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self._own(key)
+
+    def pop(self, key, *default):
+        if key not in self:
+            return dict.pop(self, key, *default)
+        value = self._own(key)
+        del self[key]
+        return value
+
+    def popitem(self):
+        key, value = dict.popitem(self)
+        if key not in self._owned:
+            value = copy_on_write(value)
+        self._owned.discard(key)
+        return key, value
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def __iter__(self):
+        # defined so dict(), {**d} and dict.update() do not take the fast path
+        # of dict subclasses, which copies the shared values without _own()
+        return dict.__iter__(self)
+
+    def items(self):
+        return [(key, self._own(key)) for key in self]
+
+    def values(self):
+        return [self._own(key) for key in self]
+
+    def copy(self):
+        return CopyOnWriteDict(self)
+
+    def __reduce__(self):
+        return (CopyOnWriteDict, (dict(self.items()),))
+
 def get_sub_dict(source, lpath, get_first_key=False):
     """ Returns the sub-dict of a nested dict, defined by path of keys.
 
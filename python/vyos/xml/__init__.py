@@ -15,6 +15,7 @@
 from vyos.xml import definition
 from vyos.xml import load
 from vyos.xml import kw
+from vyos.xml import index
 
 
 def load_configuration(cache=[]):
@@ -26,6 +27,7 @@ def load_configuration(cache=[]):
     try:
         from vyos.xml.cache import configuration
         xml.update(configuration.definition)
+        xml._index = load_index(loaded=False)
         cache.append(xml)
     except Exception:
         xml = definition.XML()
@@ -35,24 +37,49 @@ def load_configuration(cache=[]):
     return xml
 
 
+def load_index(cache=[], loaded=True):
+    """
+    returns the Index of the configuration definition, read from the file
+    created with the package, so that answering is_tag, defaults, ... does
+    not require to load the whole definition. Without the file, the Index
+    is built from the definition if loaded is set, otherwise None is returned
+    """
+    if cache:
+        return cache[0]
+
+    found = index.load(load.configuration_index)
+    if found is None:
+        if not loaded:
+            return None
+        found = load_configuration().index()
+    cache.append(found)
+    return found
+
+
 # def is_multi(lpath):
 #     return load_configuration().is_multi(lpath)
 
 
 def is_tag(lpath):
-    return load_configuration().is_tag(lpath)
+    return load_index().is_tag(lpath)
 
 
 def is_leaf(lpath, flat=True):
-    return load_configuration().is_leaf(lpath, flat)
+    return load_index().is_leaf(lpath, flat)
 
 
 def defaults(lpath, flat=False):
-    return load_configuration().defaults(lpath, flat)
+    return load_index().defaults(lpath, flat)
 
 
 def multi_to_list(lpath, conf):
-    return load_configuration().multi_to_list(lpath, conf)
+    return load_index().multi_to_list(lpath, conf)
+
+
+def config_dict(lpath, conf, multi=True, mangle=None, tag_values=False,
+                with_defaults=False, top_defaults=True):
+    return load_index().config_dict(lpath, conf, multi, mangle, tag_values,
+                                    with_defaults, top_defaults)
 
 
 if __name__ == '__main__':
@@ -12,6 +12,7 @@
 # if not, write to the Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA 
 
 from vyos.xml import kw
+from vyos.xml import index
 
 # As we index by key, the name is first and then the data:
 # {'dummy': {
@@ -34,6 +35,8 @@ class XML(dict):
         dict.__init__(self)
 
         self.tree = self[kw.tree]
+        # the flat view of the definition used to answer is_tag, defaults, ...
+        self._index = None
         # the options which matched the last incomplete world we had
         # or the last word in a list
         self.options = []
@@ -244,110 +247,34 @@ class XML(dict):
         print("plain   " + str(self.plain))
         print("options " + str(self.options))
 
-    # from functools import lru_cache
-    # @lru_cache(maxsize=100)
-    # XXX: need to use cachetool instead - for later
+    def index(self):
+        """
+        returns the Index of the definition, built from the tree
+        if it was not loaded from the file created with the package
+        """
+        if self._index is None:
+            self._index = index.Index(index.build(self))
+        return self._index
 
     def defaults(self, lpath, flat):
-        d = self[kw.default]
-        for k in lpath:
-            d = d.get(k, {})
-
-        if not flat:
-            # _flatten will make this conversion
-            d = self.multi_to_list(lpath, d, defaults=True)
-
-            r = {}
-            for k in d:
-                under = k.replace('-','_')
-                if isinstance(d[k],dict):
-                    r[under] = self.defaults(lpath + [k], flat)
-                    continue
-                r[under] = d[k]	
-            return r
-
-        def _flatten(inside, index, d):
-            r = {}
-            local = inside[index:]
-            prefix = '_'.join(_.replace('-','_') for _ in local) + '_' if local else ''
-            for k in d:
-                under = prefix + k.replace('-','_')
-                level = inside + [k]
-                if isinstance(d[k],dict):
-                    r.update(_flatten(level, index, d[k]))
-                    continue
-                if self.is_multi(level, with_tag=False):
-                    r[under] = [_.strip() for _ in d[k].split(',')]
-                    continue
-                r[under] = d[k]
-            return r
-
-        return _flatten(lpath, len(lpath), d)
+        return self.index().defaults(lpath, flat)
 
     def multi_to_list(self, lpath, conf, defaults=False):
-        r = {}
-        for k in conf:
-            # key mangling could also be done here
-            # it would prevent two parsing of the config tree
-            # under = k.replace('-','_')
-            under = k
-            fpath = lpath + [k]
-            if isinstance(conf[k],dict):
-                r[under] = self.multi_to_list(fpath, conf[k], defaults)
-                continue
-            value = conf[k]
-            if self.is_multi(fpath) and not isinstance(value, list):
-                if not defaults:
-                    value = [value]
-                else:
-                    value = value.split(' ')
-            r[under] = value
-        return r
-
-    # from functools import lru_cache
-    # @lru_cache(maxsize=100)
-    # XXX: need to use cachetool instead - for later
-
-    def _tree(self, lpath, with_tag=True):
-        """
-        returns the part of the tree searched or None if it does not exists
-        if with_tag is set, this is a configuration path (with tagNode names)
-        and tag name will be removed from the path when traversing the tree
-        """
-        tree = self[kw.tree]
-        spath = lpath.copy()
-        while spath:
-            p = spath.pop(0)
-            if p not in tree:
-                return None
-            tree = tree[p]
-            if with_tag and spath and tree[kw.node] == kw.tagNode:
-                spath.pop(0)
-        return tree
-
-    def _get(self, lpath, tag, with_tag=True):
-        tree = self._tree(lpath, with_tag)
-        if tree is None:
-            return None
-        return tree.get(tag, None)
+        return self.index().multi_to_list(lpath, conf, defaults)
 
     def is_multi(self, lpath, with_tag=True):
-        tree = self._get(lpath, kw.multi, with_tag)
-        if tree is None:
-            return None
-        return tree is True
+        return self.index().is_multi(lpath, with_tag)
 
     def is_tag(self, lpath, with_tag=True):
-        tree = self._get(lpath, kw.node, with_tag)
-        if tree is None:
-            return None
-        return tree == kw.tagNode
+        return self.index().is_tag(lpath, with_tag)
 
     def is_leaf(self, lpath, with_tag=True):
-        tree = self._get(lpath, kw.node, with_tag)
-        if tree is None:
-            return None
-        return tree == kw.leafNode
+        return self.index().is_leaf(lpath, with_tag)
 
     def exists(self, lpath, with_tag=True):
-        return self._get(lpath, kw.node, with_tag) is not None
+        return self.index().exists(lpath, with_tag)
+
+    def config_dict(self, lpath, conf, multi=True, mangle=None, tag_values=False,
+                    with_defaults=False, top_defaults=True):
+        return self.index().config_dict(lpath, conf, multi, mangle, tag_values,
+                                        with_defaults, top_defaults)
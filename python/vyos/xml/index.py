@@ -0,0 +1,340 @@
+# Copyright (C) 2020 VyOS maintainers and contributors
+#
+# This library is free software; you can redistribute it and/or modify it under the terms of
+# the GNU Lesser General Public License as published by the Free Software Foundation;
+# either version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License along with this library;
+# if not, write to the Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA
+
+import re
+import marshal
+
+from collections import OrderedDict
+
+from vyos.xml import kw
+
+# The index is a flat view of the definition, built once when the package
+# is created (see generate.py) and loaded with marshal at runtime:
+# {
+#   ('interfaces', 'ethernet'): ('[tagNode]', False, None),
+#   ('interfaces', 'ethernet', 'mtu'): ('[leafNode]', False, '1500'),
+#   ...
+# }
+# the key is the path of the node in the definition (without tagNode values)
+
+VERSION = 1
+
+KIND = 0
+MULTI = 1
+DEFAULT = 2
+
+
+def build(xml):
+    """
+    returns the content of an index for a XML definition
+    """
+    nodes = {}
+
+    def walk(path, tree, dflt):
+        nodes[tuple(path)] = (
+            tree.get(kw.node, None),
+            tree.get(kw.multi, False) is True,
+            dflt if not isinstance(dflt, dict) else None,
+        )
+        for name, inner in tree.items():
+            if kw.found(name) or not isinstance(inner, dict):
+                continue
+            sub = dflt.get(name, {}) if isinstance(dflt, dict) else {}
+            walk(path + [name], inner, sub)
+
+    walk([], xml[kw.tree], xml[kw.default])
+    return {'version': VERSION, 'nodes': nodes, 'defaults': xml[kw.default]}
+
+
+def save(fname, content):
+    with open(fname, 'wb') as w:
+        print(f'saving {fname}')
+        marshal.dump(content, w)
+
+
+def load(fname):
+    """
+    returns the Index saved in fname, or None if it can not be used
+    """
+    try:
+        with open(fname, 'rb') as r:
+            content = marshal.load(r)
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    if not isinstance(content, dict) or content.get('version', None) != VERSION:
+        return None
+    return Index(content)
+
+
+class Index:
+    """
+    answers the questions asked to the definition about a path
+    with hash lookups, without walking the definition tree
+    """
+    def __init__(self, content):
+        self.nodes = content['nodes']
+        self.default = content['defaults']
+        # configuration path (with the tagNode values) to the definition path
+        # and if it ends with a tagNode value, for the most recent paths
+        self._paths = OrderedDict()
+        self._paths_size = 1024
+        # (definition path, flat) to the result of defaults()
+        self._defaults = {}
+        # (regex, replacement) to the mangled name of each node name seen
+        self._translations = {}
+
+    def _resolve(self, lpath):
+        """
+        returns the definition path for the configuration path lpath and if
+        lpath ends with a tagNode value, or (None, False) if it does not exists
+        """
+        key = tuple(lpath)
+        if key in self._paths:
+            self._paths.move_to_end(key)
+            return self._paths[key]
+
+        path = ()
+        value = False
+        words = list(lpath)
+        while words:
+            path += (words.pop(0),)
+            entry = self.nodes.get(path, None)
+            if entry is None:
+                path = None
+                value = False
+                break
+            value = False
+            if words and entry[KIND] == kw.tagNode:
+                words.pop(0)
+                value = True
+
+        self._paths[key] = (path, value)
+        while len(self._paths) > self._paths_size:
+            self._paths.popitem(last=False)
+        return path, value
+
+    def _path(self, lpath, with_tag):
+        """
+        returns the definition path for lpath or None if it does not exists
+        if with_tag is set, this is a configuration path (with tagNode values)
+        and the tag values are removed from it
+        """
+        if not with_tag:
+            key = tuple(lpath)
+            return key if key in self.nodes else None
+        return self._resolve(lpath)[0]
+
+    def lookup(self, lpath):
+        """
+        returns the (kind, multi, default) entry of a configuration path and
+        if the path ends with a tagNode value (rather than the tagNode name)
+        as a tuple, or (None, False) if the path does not exists
+        """
+        path, value = self._resolve(lpath)
+        if path is None:
+            return None, False
+        return self.nodes[path], value
+
+    def _get(self, lpath, field, with_tag=True):
+        path = self._path(lpath, with_tag)
+        if path is None:
+            return None
+        return self.nodes[path][field]
+
+    def is_multi(self, lpath, with_tag=True):
+        return self._get(lpath, MULTI, with_tag) or None
+
+    def is_tag(self, lpath, with_tag=True):
+        kind = self._get(lpath, KIND, with_tag)
+        if kind is None:
+            return None
+        return kind == kw.tagNode
+
+    def is_leaf(self, lpath, with_tag=True):
+        kind = self._get(lpath, KIND, with_tag)
+        if kind is None:
+            return None
+        return kind == kw.leafNode
+
+    def exists(self, lpath, with_tag=True):
+        return self._get(lpath, KIND, with_tag) is not None
+
+    def default(self, lpath, with_tag=True):
+        return self._get(lpath, DEFAULT, with_tag)
+
+    def defaults(self, lpath, flat):
+        """
+        returns the default values under lpath (a path without tagNode values)
+        the result is computed once, and a private copy returned for each call
+        """
+        from vyos.util import copy_on_write
+
+        key = (tuple(lpath), flat)
+        if key not in self._defaults:
+            self._defaults[key] = self._build_defaults(lpath, flat)
+        return copy_on_write(self._defaults[key])
+
+    def _build_defaults(self, lpath, flat):
+        d = self.default
+        for k in lpath:
+            d = d.get(k, {})
+
+        if not flat:
+            # _flatten will make this conversion
+            d = self.multi_to_list(lpath, d, defaults=True)
+
+            r = {}
+            for k in d:
+                under = k.replace('-','_')
+                if isinstance(d[k],dict):
+                    r[under] = self._build_defaults(lpath + [k], flat)
+                    continue
+                r[under] = d[k]
+            return r
+
+        def _flatten(inside, index, d):
+            r = {}
+            local = inside[index:]
+            prefix = '_'.join(_.replace('-','_') for _ in local) + '_' if local else ''
+            for k in d:
+                under = prefix + k.replace('-','_')
+                level = inside + [k]
+                if isinstance(d[k],dict):
+                    r.update(_flatten(level, index, d[k]))
+                    continue
+                if self.is_multi(level, with_tag=False):
+                    r[under] = [_.strip() for _ in d[k].split(',')]
+                    continue
+                r[under] = d[k]
+            return r
+
+        return _flatten(lpath, len(lpath), d)
+
+    def multi_to_list(self, lpath, conf, defaults=False):
+        r = {}
+        for k in conf:
+            under = k
+            fpath = lpath + [k]
+            if isinstance(conf[k],dict):
+                r[under] = self.multi_to_list(fpath, conf[k], defaults)
+                continue
+            value = conf[k]
+            if self.is_multi(fpath) and not isinstance(value, list):
+                if not defaults:
+                    value = [value]
+                else:
+                    value = value.split(' ')
+            r[under] = value
+        return r
+
+    def config_dict(self, lpath, conf, multi=True, mangle=None, tag_values=False,
+                    with_defaults=False, top_defaults=True):
+        """
+        returns a new dict built from conf, the configuration under lpath (a
+        configuration path, with the tagNode values), in a single pass:
+        - the values of multi nodes are converted to lists, if multi is set
+        - the keys are mangled with mangle, a (regex, replacement) tuple,
+          except for the tagNode values if tag_values is set
+        - the default values of the definition missing in conf are added,
+          if with_defaults is set; the defaults of the children of a tagNode
+          apply to each of its values, not to the tagNode itself; unless
+          top_defaults is set, they are only added below the keys of conf
+        the definition path of each node is found while walking conf
+        alongside it, and not from the root for every key
+        """
+        nodes = self.nodes
+
+        def child(path, name):
+            if path is None:
+                return None
+            path = path + (name,)
+            return path if path in nodes else None
+
+        path = ()
+        dflt = self.default
+        tag = False
+        for word in lpath:
+            if tag:
+                tag = False
+                continue
+            path = child(path, word)
+            dflt = dflt.get(word, {}) if isinstance(dflt, dict) else {}
+            tag = path is not None and nodes[path][KIND] == kw.tagNode
+        # with the lpath ending on a tagNode name, conf is indexed by its values
+        values = tag
+
+        if mangle:
+            regex, replacement = mangle
+            table = self._translations.setdefault(mangle, {})
+
+            def name(key):
+                mangled = table.get(key, None)
+                if mangled is None:
+                    mangled = re.sub(regex, replacement, key)
+                    table[key] = mangled
+                return mangled
+
+            def value(key):
+                return key if tag_values else re.sub(regex, replacement, key)
+        else:
+            def name(key):
+                return key
+
+            def value(key):
+                return key
+
+        def is_multi(path):
+            return path is not None and nodes[path][MULTI]
+
+        def is_tag(path):
+            return path is not None and nodes[path][KIND] == kw.tagNode
+
+        def defaults(path, dflt):
+            if not isinstance(dflt, dict):
+                return dflt.split(' ') if is_multi(path) else dflt
+            if is_tag(path):
+                return None
+            r = {}
+            for k, d in dflt.items():
+                v = defaults(child(path, k), d)
+                if v is not None:
+                    r[name(k)] = v
+            return r or None
+
+        def walk(path, dflt, conf, values, inject=True):
+            r = {}
+            if values:
+                for k, v in conf.items():
+                    r[value(k)] = walk(path, dflt, v, False) if isinstance(v, dict) else v
+                return r
+
+            for k, v in conf.items():
+                inner = child(path, k)
+                if isinstance(v, dict):
+                    sub = dflt.get(k, {}) if isinstance(dflt, dict) else {}
+                    r[name(k)] = walk(inner, sub, v, is_tag(inner))
+                elif multi and is_multi(inner) and not isinstance(v, list):
+                    r[name(k)] = [v]
+                else:
+                    r[name(k)] = v
+
+            if with_defaults and inject and isinstance(dflt, dict):
+                for k, d in dflt.items():
+                    if k in conf:
+                        continue
+                    v = defaults(child(path, k), d)
+                    if v is not None:
+                        r[name(k)] = v
+            return r
+
+        return walk(path, dflt, conf, values, top_defaults)
@@ -17,8 +17,6 @@ from os.path import join
 from os.path import abspath
 from os.path import dirname
 
-import xmltodict
-
 from vyos import debug
 from vyos.xml import kw
 from vyos.xml import definition
@@ -30,6 +28,7 @@ _here = dirname(__file__)
 
 configuration_definition = abspath(join(_here, '..', '..' ,'..', 'interface-definitions'))
 configuration_cache = abspath(join(_here, 'cache', 'configuration.py'))
+configuration_index = abspath(join(_here, 'cache', 'configuration.marshal'))
 
 operational_definition = abspath(join(_here, '..', '..' ,'..', 'op-mode-definitions'))
 operational_cache = abspath(join(_here, 'cache', 'operational.py'))
@@ -278,6 +277,9 @@ def xml(folder):
     """
     read all the xml in the folder 
     """
+    # only needed when creating the package, not to use the cache
+    import xmltodict
+
     xml = definition.XML()
     for fname in glob.glob(f'{folder}/*.xml.in'):
         parsed = xmltodict.parse(_include(fname))
@@ -276,4 +276,49 @@ class TestSearch(TestCase):
         self.assertEqual(self.xml.filled, True)
         self.assertEqual(self.xml.plain, False)
 
+    def test_config_dict(self):
+        conf = {'address': '192.0.2.1/24', 'vif': {'10': {}}}
+        r = self.xml.config_dict(['interfaces', 'ethernet', 'lan0'], conf,
+                                 mangle=('-', '_'), tag_values=True, with_defaults=True)
+        self.assertEqual(r['address'], ['192.0.2.1/24'])
+        self.assertEqual(list(r['vif']), ['10'])
+        # the defaults of a tagNode are only used for its values
+        self.assertNotIn('vif_s', r)
+
+    def test_index(self):
+        import tempfile
+        from vyos.xml import index
+
+        with tempfile.NamedTemporaryFile() as f:
+            index.save(f.name, index.build(self.xml))
+            loaded = index.load(f.name)
+
+        self.assertEqual(loaded.is_tag(['interfaces', 'ethernet']), True)
+        self.assertEqual(loaded.is_tag(['interfaces', 'ethernet', 'lan0']), True)
+        self.assertEqual(loaded.is_leaf(['interfaces', 'ethernet', 'lan0', 'mtu']), True)
+        self.assertEqual(loaded.is_multi(['interfaces', 'ethernet', 'lan0', 'address']), True)
+        self.assertEqual(loaded.is_multi(['interfaces', 'ethernet', 'address'], with_tag=False), True)
+        self.assertEqual(loaded.is_tag(['interfaces', 'unknown']), None)
+        self.assertEqual(loaded.defaults(['service', 'ssh'], flat=False),
+                         self.xml.defaults(['service', 'ssh'], flat=False))
+        self.assertEqual(loaded.defaults(['service', 'ssh'], flat=True),
+                         self.xml.defaults(['service', 'ssh'], flat=True))
+        self.assertEqual(index.load(os.devnull), None)
+
+        entry, value = loaded.lookup(['interfaces', 'ethernet', 'lan0'])
+        self.assertEqual((entry[index.KIND], value), ('[tagNode]', True))
+        self.assertEqual(loaded.lookup(['interfaces', 'ethernet', 'lan0', 'unknown']), (None, False))
+
+        conf = {'address': '192.0.2.1/24', 'vif': {'10': {}}}
+        self.assertEqual(loaded.config_dict(['interfaces', 'ethernet', 'lan0'], conf,
+                                            mangle=('-', '_'), with_defaults=True),
+                         self.xml.config_dict(['interfaces', 'ethernet', 'lan0'], conf,
+                                              mangle=('-', '_'), with_defaults=True))
+
+        # only the most recent configuration paths are kept
+        loaded._paths_size = 2
+        for name in ('lan0', 'lan1', 'lan2'):
+            loaded.is_tag(['interfaces', 'ethernet', name])
+        self.assertEqual(len(loaded._paths), 2)
+
     # Need to add a check for a valuless leafNode
\ No newline at end of file
@@ -20,6 +20,7 @@ from ipaddress import IPv4Address
 from sys import exit
 
 from vyos import ConfigError
+from vyos import frr
 from vyos.config import Config
 from vyos.util import call, process_named_running
 from vyos.template import render
@@ -122,6 +123,7 @@ def apply(igmp):
 
         if os.path.exists(config_file):
             call(f'vtysh -d pimd -f {config_file}')
+            frr.changed('pimd')
             os.remove(config_file)
     elif pim_pid:
         os.kill(int(pim_pid), SIGTERM)
@@ -19,6 +19,7 @@ import os
 from ipaddress import IPv4Address
 from sys import exit
 
+from vyos import frr
 from vyos.config import Config
 from vyos import ConfigError
 from vyos.util import call, process_named_running
@@ -149,6 +150,7 @@ def apply(pim):
 
         if os.path.exists(config_file):
             call("vtysh -d pimd -f " + config_file)
+            frr.changed('pimd')
             os.remove(config_file)
     elif pim_pid:
         os.kill(int(pim_pid), SIGTERM)
@@ -20,6 +20,7 @@ from ipaddress import IPv4Address
 from sys import exit
 
 from vyos import ConfigError
+from vyos import frr
 from vyos.config import Config
 from vyos.util import call
 from vyos.template import render
@@ -105,6 +106,7 @@ def apply(mroute):
 
     if os.path.exists(config_file):
         call(f'vtysh -d staticd -f {config_file}')
+        frr.changed('staticd')
         os.remove(config_file)
 
     return None
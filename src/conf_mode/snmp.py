@@ -27,6 +27,7 @@ from vyos.util import call, chmod_755
 from vyos.validate import is_addr_assigned
 from vyos.version import get_version_data
 from vyos import ConfigError, airbag
+from vyos import frr
 airbag.enable()
 
 config_file_client  = r'/etc/snmp/snmp.conf'
@@ -568,6 +569,7 @@ def apply(snmp):
 
     # Enable AgentX in FRR
     call('vtysh -c "configure terminal" -c "agentx" >/dev/null')
+    frr.changed()
 
     return None
 
@@ -26,6 +26,7 @@ import netifaces
 from vyos.ifconfig import Section
 from vyos.ifconfig import Interface
 from vyos.ifconfig import VRRP
+from vyos.ifconfig import Operational
 from vyos.util import cmd
 
 
@@ -261,13 +262,16 @@ def run_show_counters(ifnames, iftypes, vif, vrrp):
     formating = '%-12s %10s %10s     %10s %10s'
     print(formating % ('Interface', 'Rx Packets', 'Rx Bytes', 'Tx Packets', 'Tx Bytes'))
 
+    # the counters of every interface, read at once
+    all_stats = Operational.all_stats()
+
     for interface in filtered_interfaces(ifnames, iftypes, vif, vrrp):
         oper = interface.operational.get_state()
 
         if oper not in ('up','unknown'):
             continue
 
-        stats = interface.operational.get_stats()
+        stats = interface.operational.get_stats(all_stats)
         cache = interface.operational.load_counters()
         print(formating % (
             interface.ifname,
@@ -280,9 +284,11 @@ def run_show_counters(ifnames, iftypes, vif, vrrp):
 
 @register('clear')
 def run_clear_intf(ifnames, iftypes, vif, vrrp):
+    cleared = []
     for interface in filtered_interfaces(ifnames, iftypes, vif, vrrp):
         print(f'Clearing {interface.ifname}')
-        interface.operational.clear_counters()
+        cleared.append(interface.ifname)
+    Operational.clear_all_counters(cleared)
 
 
 @register('reset')
@@ -26,6 +26,7 @@
 #include <sys/types.h>
 #include <sys/wait.h>
 #include <zmq.h>
+#include <openssl/sha.h>
 #include "mkjson.h"
 
 /*
@@ -50,6 +51,9 @@
 
 #define COMMIT_MARKER "/var/tmp/initial_in_commit"
 
+// the hexadecimal sha256 of the config text
+#define DIGEST_LEN (2 * SHA256_DIGEST_LENGTH + 1)
+
 enum {
     SUCCESS =      1 << 0,
     ERROR_COMMIT = 1 << 1,
@@ -63,6 +67,10 @@ volatile int timeout = 0;
 int initialization(void *);
 int pass_through(char **, int);
 void timer_handler(int);
+void config_digest(const char *, size_t, char *, size_t);
+int send_config(void *, const char *, const char *, size_t);
+int send_session_delta(void *, const char *, size_t, const char *, size_t,
+                       const char *);
 
 double get_posix_clock_time(void);
 
@@ -199,32 +207,37 @@ int initialization(void* Requester)
     if (timeout) return -1;
 
     FILE *fp_a = popen(GET_ACTIVE, "r");
-    getdelim(&active_str, &active_len, '\0', fp_a);
+    ssize_t active_read = getdelim(&active_str, &active_len, '\0', fp_a);
     int ret = pclose(fp_a);
 
-    if (!ret) {
-        debug_print("Sending active config\n");
-        zmq_send(Requester, active_str, active_len - 1, 0);
-        zmq_recv(Requester, buffer, 16, 0);
-        debug_print("Received active receipt\n");
-    } else {
-        debug_print("Sending empty active config\n");
-        zmq_send(Requester, empty_string, 0, 0);
-        zmq_recv(Requester, buffer, 16, 0);
-        debug_print("Received active receipt\n");
+    // an unreadable active config is sent as an empty one
+    if (ret || active_read < 0) {
+        active_read = 0;
     }
 
-    free(active_str);
+    const char *active = active_read ? active_str : empty_string;
+    char active_digest[DIGEST_LEN];
+    config_digest(active, active_read, active_digest, sizeof(active_digest));
+
+    debug_print("Sending active config\n");
+    send_config(Requester, "active", active, active_read);
+    debug_print("Received active receipt\n");
 
     FILE *fp_s = popen(GET_SESSION, "r");
-    getdelim(&session_str, &session_len, '\0', fp_s);
+    ssize_t session_read = getdelim(&session_str, &session_len, '\0', fp_s);
     pclose(fp_s);
 
+    if (session_read < 0) {
+        session_read = 0;
+    }
+    const char *session = session_read ? session_str : empty_string;
+
     debug_print("Sending session config\n");
-    zmq_send(Requester, session_str, session_len - 1, 0);
-    zmq_recv(Requester, buffer, 16, 0);
+    send_session_delta(Requester, session, session_read,
+                       active, active_read, active_digest);
     debug_print("Received session receipt\n");
 
+    free(active_str);
     free(session_str);
 
     debug_print("Sending config session pid\n");
@@ -275,6 +288,93 @@ int pass_through(char **argv, int ex_index)
     return 0;
 }
 
+/*
+ * vyos-configd keeps the config trees of the previous commit in memory,
+ * indexed by the digest of the text they were parsed from. A config is
+ * announced with its digest first and only sent if the daemon asks for it.
+ */
+void config_digest(const char *data, size_t len, char *digest, size_t size)
+{
+    unsigned char hash[SHA256_DIGEST_LENGTH];
+    SHA256((const unsigned char *)data, len, hash);
+    for (int i = 0; i < SHA256_DIGEST_LENGTH && 2 * i + 2 < size; i++)
+        snprintf(&digest[2 * i], 3, "%02x", hash[i]);
+}
+
+int send_config(void *Requester, const char *type, const char *data,
+                size_t len)
+{
+    char buffer[16];
+    char digest[DIGEST_LEN];
+    config_digest(data, len, digest, sizeof(digest));
+
+    char *announce = mkjson(MKJSON_OBJ, 2,
+                            MKJSON_STRING, "type", type,
+                            MKJSON_STRING, "hash", digest);
+    zmq_send(Requester, announce, strlen(announce), 0);
+    free(announce);
+
+    int n = zmq_recv(Requester, buffer, sizeof(buffer) - 1, 0);
+    buffer[n < 0 ? 0 : n] = '\0';
+    debug_print("Received %s digest receipt: %s\n", type, buffer);
+
+    if (strcmp(buffer, "cached") == 0)
+        return 0;
+
+    zmq_send(Requester, data, len, 0);
+    zmq_recv(Requester, buffer, sizeof(buffer), 0);
+    return 0;
+}
+
+int send_session_delta(void *Requester, const char *data, size_t len,
+                       const char *base, size_t base_len,
+                       const char *base_digest)
+{
+    char buffer[16];
+    char digest[DIGEST_LEN];
+    config_digest(data, len, digest, sizeof(digest));
+
+    // the change is whatever lies between the common prefix and suffix
+    size_t common = len < base_len ? len : base_len;
+    size_t head = 0;
+    while (head < common && data[head] == base[head])
+        head++;
+    size_t tail = 0;
+    while (tail < common - head &&
+           data[len - tail - 1] == base[base_len - tail - 1])
+        tail++;
+
+    char *announce = mkjson(MKJSON_OBJ, 5,
+                            MKJSON_STRING, "type", "session",
+                            MKJSON_STRING, "hash", digest,
+                            MKJSON_STRING, "base", base_digest,
+                            MKJSON_ULLINT, "head", (unsigned long long)head,
+                            MKJSON_ULLINT, "tail", (unsigned long long)tail);
+    zmq_send(Requester, announce, strlen(announce), 0);
+    free(announce);
+
+    int n = zmq_recv(Requester, buffer, sizeof(buffer) - 1, 0);
+    buffer[n < 0 ? 0 : n] = '\0';
+    debug_print("Received session digest receipt: %s\n", buffer);
+
+    if (strcmp(buffer, "cached") == 0)
+        return 0;
+
+    if (strcmp(buffer, "delta") == 0) {
+        debug_print("Sending session delta of %zu bytes\n", len - head - tail);
+        zmq_send(Requester, data + head, len - head - tail, 0);
+        n = zmq_recv(Requester, buffer, sizeof(buffer) - 1, 0);
+        buffer[n < 0 ? 0 : n] = '\0';
+        // the daemon could not rebuild the session config: full resync
+        if (strcmp(buffer, "resend") != 0)
+            return 0;
+    }
+
+    zmq_send(Requester, data, len, 0);
+    zmq_recv(Requester, buffer, sizeof(buffer), 0);
+    return 0;
+}
+
 void timer_handler(int signum)
 {
     debug_print("timer_handler invoked\n");
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+#
+# Copyright (C) 2021 VyOS maintainers and contributors
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 or later as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import tempfile
+import importlib.util
+
+from importlib.machinery import SourceFileLoader
+from types import SimpleNamespace
+from unittest import TestCase
+from vyos import ConfigError
+from vyos import util
+
+path = os.path.join(os.path.dirname(__file__), '..', 'services', 'vyos-configd')
+loader = SourceFileLoader('vyos_configd', path)
+spec = importlib.util.spec_from_file_location('vyos_configd', path, loader=loader)
+configd = importlib.util.module_from_spec(spec)
+loader.exec_module(configd)
+
+
+class Socket:
+    """ the client side of the zmq socket, answering with the messages given """
+    def __init__(self, *messages):
+        self.messages = list(messages)
+        self.sent = []
+
+    def send(self, message):
+        self.sent.append(message)
+
+    def recv(self):
+        return self.messages.pop(0)
+
+
+active = b'interfaces {\n    ethernet eth0 {\n        address dhcp\n    }\n}\n'
+session = b'interfaces {\n    ethernet eth0 {\n        address 192.0.2.1/24\n    }\n}\n'
+
+
+class TestConfigd(TestCase):
+    def setUp(self):
+        configd.config_cache.clear()
+        self.addCleanup(configd.config_cache.clear)
+
+    def cache(self, text):
+        digest = configd.config_digest(text)
+        configd.config_cache[digest] = (text, None)
+        return digest
+
+    def test_digest(self):
+        self.assertEqual(configd.config_digest(b'abc\n'),
+                         'edeaaff3f1774ad2888673770c6d64097e391bc362d7d6fb34982ddf0efd18cb')
+
+    def test_receive_config(self):
+        digest = self.cache(active)
+        socket = Socket()
+        self.assertEqual(configd.receive_config(socket, {'type': 'active', 'hash': digest}),
+                         (digest, active))
+        self.assertEqual(socket.sent, [b'cached'])
+
+        socket = Socket(session)
+        digest = configd.config_digest(session)
+        self.assertEqual(configd.receive_config(socket, {'type': 'active', 'hash': digest}),
+                         (digest, session))
+        self.assertEqual(socket.sent, [b'resend', b'active'])
+
+    def announce(self, text, base, head, tail):
+        return {'type': 'session', 'hash': configd.config_digest(text),
+                'base': base, 'head': head, 'tail': tail}
+
+    def test_receive_session_delta(self):
+        base = self.cache(active)
+        head = active.index(b'dhcp')
+        tail = len(active) - head - len(b'dhcp')
+        socket = Socket(b'192.0.2.1/24')
+        self.assertEqual(configd.receive_session(socket, self.announce(session, base, head, tail)),
+                         (configd.config_digest(session), session))
+        self.assertEqual(socket.sent, [b'delta', b'session'])
+
+    def test_receive_session_resync(self):
+        base = self.cache(active)
+        head = active.index(b'dhcp')
+        tail = len(active) - head - len(b'dhcp')
+        # the delta does not give the text announced
+        socket = Socket(b'192.0.2.2/24', session)
+        self.assertEqual(configd.receive_session(socket, self.announce(session, base, head, tail)),
+                         (configd.config_digest(session), session))
+        self.assertEqual(socket.sent, [b'delta', b'resend', b'session'])
+
+        # the base is not known
+        socket = Socket(session)
+        self.assertEqual(configd.receive_session(socket, self.announce(session, 'unknown', 0, 0)),
+                         (configd.config_digest(session), session))
+        self.assertEqual(socket.sent, [b'resend', b'session'])
+
+        # the session is the active config of a previous commit
+        socket = Socket()
+        self.assertEqual(configd.receive_session(socket, self.announce(active, 'unknown', 0, 0)),
+                         (base, active))
+        self.assertEqual(socket.sent, [b'cached'])
+
+    def test_cached_tree(self):
+        with self.assertRaises(TypeError):
+            configd.CachedConfigTree.set(object(), ['system', 'host-name'], 'vyos')
+
+    def script(self, error=None):
+        def apply(config):
+            util.popen('true')
+            if error:
+                raise error
+
+        return SimpleNamespace(get_config=lambda config: {}, verify=lambda config: None,
+                               generate=lambda config: None, apply=apply)
+
+    def test_run_script(self):
+        output = tempfile.NamedTemporaryFile()
+        self.addCleanup(output.close)
+        configd.session_out, configd.session_mode = output.name, 'a'
+        config = SimpleNamespace(set_level=lambda path: None)
+
+        configd.start_commit_record('session')
+        record = configd.script_record('test', None)
+        self.assertEqual(configd.run_script(self.script(), config, None, record), configd.R_SUCCESS)
+        self.assertEqual(list(record['phases']), ['get_config', 'verify', 'generate', 'apply'])
+        self.assertEqual([_['command'] for _ in record['commands']], ['true'])
+        self.assertIsNotNone(configd.commit_record['end'])
+
+        record = configd.script_record('test', None)
+        result = configd.run_script(self.script(ConfigError('not valid')), config, None, record)
+        self.assertEqual(result, configd.R_ERROR_COMMIT)
+        with open(output.name) as f:
+            self.assertIn('not valid', f.read())
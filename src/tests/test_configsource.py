@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+#
+# Copyright (C) 2020 VyOS maintainers and contributors
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 or later as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from unittest import TestCase
+from unittest.mock import patch
+from vyos.configsource import ConfigSourceSession
+from vyos.configsource import VyOSError
+from vyos.xml import kw
+from vyos.xml.index import Index
+
+# the answers of cli-shell-api for the nodes of the Perl templates
+legacy = {
+    ('isTag', 'system legacy'),
+    ('isMulti', 'system legacy one server'),
+    ('isLeaf', 'system legacy one server'),
+}
+
+class TestConfigSource(TestCase):
+    def setUp(self):
+        self.commands = []
+
+        def run(source, cmd):
+            self.commands.append(cmd[1:])
+            if (cmd[1], ' '.join(cmd[2:])) not in legacy:
+                raise VyOSError()
+            return ''
+
+        patcher = patch.object(ConfigSourceSession, '_run', run)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.source = ConfigSourceSession()
+
+    def test_node_types(self):
+        # the XML definition only knows about the interfaces
+        definition = Index({'nodes': {
+            ('interfaces',): (kw.plainNode, False, None),
+            ('interfaces', 'ethernet'): (kw.tagNode, False, None),
+        }, 'defaults': {}})
+
+        with patch('vyos.xml.load_index', lambda: definition):
+            del self.commands[:]
+            self.assertTrue(self.source.is_tag('interfaces ethernet'))
+            self.assertFalse(self.source.is_tag('interfaces ethernet eth0'))
+            self.assertEqual(self.commands, [])
+
+            # nodes unknown to the XML definition are asked to cli-shell-api
+            self.assertTrue(self.source.is_tag('system legacy'))
+            self.assertFalse(self.source.is_tag('system legacy one'))
+            self.assertTrue(self.source.is_multi('system legacy one server'))
+            self.assertTrue(self.source.is_leaf('system legacy one server'))
+            self.assertFalse(self.source.is_leaf('system unknown'))
+            self.assertEqual(self.commands[0], ['isTag', 'system', 'legacy'])
+
+            self.source.set_level(['system', 'legacy', 'one'])
+            self.assertTrue(self.source.is_multi('server'))
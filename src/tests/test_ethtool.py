@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+#
+# Copyright (C) 2021 VyOS maintainers and contributors
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 or later as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import errno
+import json
+import struct
+import tempfile
+
+from unittest import TestCase
+from unittest.mock import patch
+from vyos import ethtool
+
+# the features of the device, and which of them can be changed
+features = ['tx-scatter-gather', 'rx-gro', 'rx-lro', '']
+available = 0b011
+
+class Device:
+    """ answers the ethtool ioctls as the kernel would for one NIC """
+    def __init__(self):
+        self.errors = {}
+        self.calls = 0
+
+    def call(self, ifname, data):
+        self.calls += 1
+        command = struct.unpack_from('=I', data)[0]
+        if command in self.errors:
+            raise OSError(self.errors[command], os.strerror(self.errors[command]))
+
+        answer = bytearray(data)
+        if command == ethtool.ETHTOOL_GDRVINFO:
+            answer[4:4+6] = b'e1000e'
+            answer[100:100+12] = b'0000:00:19.0'
+        elif command == ethtool.ETHTOOL_GPERMADDR:
+            struct.pack_into('=I6B', answer, 4, 6, 0, 0x50, 0x56, 0, 0, 1)
+        elif command == ethtool.ETHTOOL_GSSET_INFO:
+            struct.pack_into('=I', answer, 16, len(features))
+        elif command == ethtool.ETHTOOL_GSTRINGS:
+            for i, name in enumerate(features):
+                offset = 12 + i * ethtool.ETH_GSTRING_LEN
+                answer[offset:offset+len(name)] = name.encode()
+        elif command == ethtool.ETHTOOL_GFEATURES:
+            struct.pack_into('=IIII', answer, 8, available, 0, 0, 0)
+        elif command == ethtool.ETHTOOL_GRINGPARAM:
+            struct.pack_into('=8I', answer, 4, 4096, 0, 0, 4096, 256, 0, 0, 256)
+        elif command == ethtool.ETHTOOL_GPAUSEPARAM:
+            struct.pack_into('=3I', answer, 4, 1, 1, 1)
+        elif command == ethtool.ETHTOOL_GSET:
+            # 10/100/1000 full duplex supported, 1000 full negotiated
+            struct.pack_into('=IIHBBBBB', answer, 4, 0b101010, 0b101010, 1000, 1, 0, 1, 0, 1)
+        return bytes(answer)
+
+class TestEthtool(TestCase):
+    def setUp(self):
+        self.device = Device()
+        patcher = patch('vyos.ethtool._call', self.device.call)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        cache = ethtool.Ethtool.cache
+        ethtool.Ethtool.cache = os.path.join(directory.name, 'ethtool.json')
+        self.addCleanup(setattr, ethtool.Ethtool, 'cache', cache)
+
+    def test_ioctls(self):
+        self.assertEqual(ethtool.get_driver_info('eth0'), {
+            'driver': 'e1000e',
+            'bus_info': '0000:00:19.0',
+            'permaddr': '00:50:56:00:00:01',
+        })
+        self.assertEqual(ethtool.get_fixed_features('eth0'), {
+            'tx-scatter-gather': False,
+            'rx-gro': False,
+            'rx-lro': True,
+            'scatter-gather': False,
+            'generic-receive-offload': False,
+            'large-receive-offload': True,
+        })
+        self.assertEqual(ethtool.get_ring_buffers('eth0')['rx_max'], 4096)
+        self.assertEqual(ethtool.get_ring_buffers('eth0')['tx'], 256)
+        self.assertEqual(ethtool.get_pause('eth0'), {'autoneg': 1, 'rx': 1, 'tx': 1})
+        self.assertEqual(ethtool.get_link_settings('eth0'), {
+            'speed': 1000,
+            'duplex': 'full',
+            'autoneg': True,
+            'supported': [10, 100, 1000],
+        })
+
+    def test_cache(self):
+        found = ethtool.Ethtool('eth0')
+        self.assertFalse(found.is_fixed_gro())
+        self.assertTrue(found.is_fixed_lro())
+        self.assertEqual(found.get_rx_buffer(), 4096)
+        self.assertTrue(found.is_pause_supported())
+
+        with open(ethtool.Ethtool.cache) as f:
+            self.assertIn('e1000e/0000:00:19.0/00:50:56:00:00:01', json.load(f))
+        # the cache was written through a temporary file, now replaced
+        self.assertEqual(os.listdir(os.path.dirname(ethtool.Ethtool.cache)),
+                         ['ethtool.json'])
+
+        # only the key of the device is read the next time
+        calls = self.device.calls
+        self.assertTrue(ethtool.Ethtool('eth0').is_pause_supported())
+        self.assertEqual(self.device.calls - calls, 2)
+
+    def test_cache_failed_probe(self):
+        # a device not supporting the pause parameters is cached as such
+        self.device.errors[ethtool.ETHTOOL_GPAUSEPARAM] = errno.EOPNOTSUPP
+        self.assertFalse(ethtool.Ethtool('eth0').is_pause_supported())
+        self.assertTrue(os.path.exists(ethtool.Ethtool.cache))
+        os.unlink(ethtool.Ethtool.cache)
+
+        # a probe failing for another reason is not cached
+        self.device.errors[ethtool.ETHTOOL_GPAUSEPARAM] = errno.EBUSY
+        self.assertFalse(ethtool.Ethtool('eth0').is_pause_supported())
+        self.assertFalse(os.path.exists(ethtool.Ethtool.cache))
+
+        del self.device.errors[ethtool.ETHTOOL_GPAUSEPARAM]
+        self.assertTrue(ethtool.Ethtool('eth0').is_pause_supported())
@@ -0,0 +1,459 @@
+#!/usr/bin/env python3
+#
+# Copyright (C) 2021 VyOS maintainers and contributors
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 or later as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import socket
+import tempfile
+import threading
+
+from unittest import TestCase
+from vyos import frr
+from vyos.frr import FRRConfig
+from vyos.frr import FRRBlocks
+from vyos.frr import _prefixes
+
+running = [
+    'frr version 7.5',
+    'frr defaults traditional',
+    'hostname vyos',
+    '!',
+    'router bgp 65000 vrf red',
+    ' bgp router-id 192.0.2.1',
+    '!',
+    'router bgp 65000',
+    ' neighbor 192.0.2.2 remote-as 65001',
+    ' !',
+    ' address-family ipv4 unicast',
+    '  network 198.51.100.0/24',
+    ' exit-address-family',
+    '',
+    '!',
+    'ip prefix-list PL seq 5 permit 192.0.2.0/24',
+    '!',
+    'route-map RM permit 10',
+    ' match ip address prefix-list PL',
+    '!',
+    'route-map RM deny 20',
+    '!',
+    'line vty',
+    '!',
+]
+
+
+class VtyServer:
+    """
+    stands for the vty sockets of FRR daemons, answering the commands
+    with answer(daemon, command), returning the status and output
+    """
+    def __init__(self, daemons, answer):
+        self.directory = tempfile.TemporaryDirectory()
+        self.answer = answer
+        self.commands = []
+        self.connections = 0
+        self.accepted = []
+        self.sockets = []
+        for daemon in daemons:
+            server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            server.bind(os.path.join(self.directory.name, f'{daemon}.vty'))
+            server.listen()
+            self.sockets.append(server)
+            threading.Thread(target=self.accept, args=(daemon, server), daemon=True).start()
+
+    def accept(self, daemon, server):
+        while True:
+            try:
+                connection, _ = server.accept()
+            except OSError:
+                return
+            self.connections += 1
+            self.accepted.append(connection)
+            threading.Thread(target=self.serve, args=(daemon, connection), daemon=True).start()
+
+    def serve(self, daemon, connection):
+        data = b''
+        while True:
+            chunk = connection.recv(4096)
+            if not chunk:
+                connection.close()
+                return
+            data += chunk
+            while b'\0' in data:
+                command, data = data.split(b'\0', 1)
+                command = command.decode()
+                self.commands.append((daemon, command))
+                status, output = self.answer(daemon, command)
+                try:
+                    connection.sendall(output.encode() + b'\0\0\0' + bytes([status]))
+                except OSError:
+                    # the client gave up waiting for the answer
+                    connection.close()
+                    return
+
+    def restart(self):
+        """ closes the connections accepted, as a restarting daemon """
+        for connection in self.accepted:
+            connection.shutdown(socket.SHUT_RDWR)
+        self.accepted = []
+
+    def close(self):
+        for server in self.sockets:
+            server.close()
+        self.directory.cleanup()
+
+
+class TestFRR(TestCase):
+    def test_prefixes(self):
+        self.assertEqual(_prefixes(r'^route-map .*'), ['route-map '])
+        self.assertEqual(_prefixes(r'^router bgp \d+ vrf red$'), ['router bgp '])
+        self.assertEqual(_prefixes(r'(ip prefix-list .*|route-map .*|line vty)'),
+                         ['ip prefix-list ', 'route-map ', 'line vty'])
+        self.assertEqual(_prefixes(r'^interface eth0\.10'), ['interface eth0.10'])
+        self.assertEqual(_prefixes(r'^mpls ldp?'), ['mpls ld'])
+        self.assertIsNone(_prefixes(r'.*'))
+        self.assertIsNone(_prefixes(r'(?=router).*'))
+
+    def test_blocks(self):
+        blocks = FRRBlocks(running)
+        self.assertEqual(blocks.lines(), running)
+        found = blocks.find(r'route-map RM .*')
+        self.assertEqual([_.lines[0] for _ in found], ['route-map RM permit 10', 'route-map RM deny 20'])
+        self.assertIsNone(blocks.find(r' neighbor .*'))
+
+        blocks.remove(found[0])
+        blocks.insert_before(found[1], ['route-map RM permit 5', '!'])
+        blocks.replace(blocks.find('line vty')[0], ['line vty', ' exec-timeout 0 0'])
+        blocks.insert_before(None, ['end'])
+        self.assertEqual(blocks.lines(), running[:17] + ['!',
+            'route-map RM permit 5', '!', 'route-map RM deny 20', '!',
+            'line vty', ' exec-timeout 0 0', '!', 'end'])
+        self.assertEqual(blocks.find('route-map RM permit .*')[0].lines[0], 'route-map RM permit 5')
+
+    def test_modify_section(self):
+        cases = [
+            (r'^router bgp \d+$', ''),
+            (r'^router bgp \d+ vrf red$', ['router bgp 65000 vrf red', ' no bgp ebgp-requires-policy']),
+            (r'^route-map .*', []),
+            (r'^route-map RM .*', ['route-map RM permit 10', '!'], 1),
+            (r'^line vty', ['removed']),
+            (r'^hostname .*', 'hostname router'),
+            (r'^no such .*', []),
+        ]
+        for case in cases:
+            config = FRRConfig(running)
+            count = config.modify_section(*case[:2], count=case[2] if len(case) > 2 else 0)
+            expected = self.legacy(running, *case)
+            self.assertEqual((count, config.config), expected, case[0])
+
+    def test_modify_section_lines(self):
+        # a pattern which can match indented lines is handled line by line
+        config = FRRConfig(running)
+        self.assertEqual(config.modify_section(r'\s+network .*', [' network 203.0.113.0/24']), 1)
+        self.assertEqual(config.config[11], ' network 203.0.113.0/24')
+        # up to the next line not indented
+        self.assertEqual(config.config[12], '!')
+
+        config = FRRConfig(running)
+        self.assertEqual(config.modify_section(r'router bgp \d+', stop_pattern='!', remove_stop_mark=True), 1)
+        self.assertEqual(config.config, running[:7] + running[15:])
+
+    def test_add_before(self):
+        config = FRRConfig(running)
+        self.assertTrue(config.add_before(r'(ip prefix-list .*|route-map .*|line vty)', 'ip route 0.0.0.0/0 192.0.2.254\n!'))
+        index = running.index('ip prefix-list PL seq 5 permit 192.0.2.0/24')
+        self.assertEqual(config.config, running[:index] + ['ip route 0.0.0.0/0 192.0.2.254', '!'] + running[index:])
+        self.assertFalse(config.add_before('^no such', ['x']))
+
+        config = FRRConfig(running)
+        config.modify_section(r'^route-map .*')
+        config.add_before('^line vty', ['route-map RM permit 10', '!'])
+        self.assertEqual(config.config[-4:], ['route-map RM permit 10', '!', 'line vty', '!'])
+
+    def test_delta(self):
+        config = FRRConfig(running)
+        self.assertEqual(config.delta(), [])
+        config.modify_section(r'^router bgp \d+$', '')
+        config.add_before(r'(ip prefix-list .*|route-map .*|line vty)', [
+            'router bgp 65000',
+            ' neighbor 192.0.2.2 remote-as 65002',
+            ' neighbor 192.0.2.3 remote-as 65003',
+            ' !',
+            ' address-family ipv4 unicast',
+            ' exit-address-family',
+            '!',
+        ])
+        config.modify_section(r'^route-map RM deny 20', [])
+        config.add_before('^line vty', ['interface eth0', ' ip ospf cost 10', '!'])
+        expected = [
+            'no route-map RM deny 20',
+            'router bgp 65000',
+            # the neighbor is not removed to change its AS
+            ' neighbor 192.0.2.2 remote-as 65002',
+            ' neighbor 192.0.2.3 remote-as 65003',
+            ' address-family ipv4 unicast',
+            '  no network 198.51.100.0/24',
+            '  exit',
+            ' exit',
+            'interface eth0',
+            ' ip ospf cost 10',
+            ' exit',
+        ]
+        self.assertEqual(config.delta(), expected)
+
+        # the same, comparing the whole configuration
+        whole = FRRConfig(running)
+        whole.config = config.config
+        self.assertEqual(whole.delta(), expected)
+
+        removed = FRRConfig(config.config)
+        removed.modify_section(r'^interface eth0', [])
+        self.assertEqual(removed.delta(), ['interface eth0', ' no ip ospf cost 10', ' exit'])
+
+    def test_delta_neighbor(self):
+        bgp = [
+            'router bgp 65000',
+            ' neighbor 192.0.2.2 remote-as 65002',
+            ' neighbor 192.0.2.2 description to the core',
+            ' neighbor 192.0.2.2 update-source lo',
+            ' neighbor 192.0.2.3 remote-as 65003',
+            ' neighbor 192.0.2.3 description to the edge',
+            ' !',
+            ' address-family ipv4 unicast',
+            '  neighbor 192.0.2.2 route-map RM in',
+            '  neighbor 192.0.2.3 route-map RM in',
+            ' exit-address-family',
+            '!',
+        ]
+        config = FRRConfig(bgp)
+        config.config = [_ for _ in bgp if '192.0.2.2' not in _]
+        # FRR removes the configuration of the neighbor with it, the other
+        # lines can not be removed once it is gone
+        self.assertEqual(config.delta(), [
+            'router bgp 65000',
+            ' no neighbor 192.0.2.2 remote-as 65002',
+            ' exit',
+        ])
+
+    def test_commit(self):
+        vtysh, reload = frr.path_vtysh, frr.path_frr_reload
+        try:
+            frr.path_vtysh, frr.path_frr_reload = '/bin/true', '/bin/true'
+            config = FRRConfig()
+            config.load_configuration('bgpd')
+            config.config = running
+            self.assertEqual(config.commit_configuration('bgpd')['method'], 'delta')
+            # nothing changed since
+            self.assertEqual(config.commit_configuration('bgpd')['lines'], 0)
+            # not loaded from this daemon
+            self.assertEqual(config.commit_configuration('zebra')['method'], 'reload')
+
+            frr.path_vtysh = '/bin/false'
+            config.modify_section(r'^route-map .*')
+            self.assertEqual(config.commit_configuration('bgpd')['method'], 'reload')
+        finally:
+            frr.path_vtysh, frr.path_frr_reload = vtysh, reload
+
+    def vty(self, answer, daemons=['bgpd', 'zebra']):
+        server = VtyServer(daemons, answer)
+        path_config, pool = frr.path_config, frr._pool
+        frr.path_config, frr._pool = server.directory.name, frr.VtyPool(timeout=5)
+
+        def cleanup():
+            frr._pool.close()
+            frr.path_config, frr._pool = path_config, pool
+            server.close()
+        self.addCleanup(cleanup)
+        return server
+
+    def test_vty(self):
+        def answer(daemon, command):
+            if command == 'show running-config':
+                return 0, '\n'.join(running) + '\n'
+            if command.startswith('bad'):
+                return 2, '% Unknown command: bad\n'
+            return 0, ''
+
+        server = self.vty(answer)
+        self.assertEqual(frr.get_configuration('bgpd'), '\n'.join(running) + '\n')
+        self.assertEqual(frr.execute('show version', daemon='bgpd'), '')
+        frr.configure(['router bgp 65000', 'neighbor 192.0.2.2 remote-as 65002'], daemon='bgpd')
+        with self.assertRaises(frr.ConfigurationNotValid):
+            frr.configure(['router bgp 65000', 'bad', 'neighbor 192.0.2.3 remote-as 65003'], daemon='bgpd')
+        with self.assertRaises(OSError):
+            frr.execute('bad', daemon='bgpd')
+
+        # the connection is reused, and always left out of configuration mode
+        self.assertEqual(server.connections, 1)
+        self.assertEqual([_ for d, _ in server.commands if d == 'bgpd'], [
+            'enable',
+            'show running-config',
+            'show version',
+            'configure terminal', 'router bgp 65000', 'neighbor 192.0.2.2 remote-as 65002', 'end',
+            'configure terminal', 'router bgp 65000', 'bad', 'end',
+            'bad',
+        ])
+
+    def test_vty_restart(self):
+        server = self.vty(lambda daemon, command: (0, command))
+        self.assertEqual(frr.execute('show version', daemon='bgpd'), 'show version')
+
+        # the connection kept is broken, the command is run on a new one
+        server.restart()
+        self.assertEqual(frr.execute('show version', daemon='bgpd'), 'show version')
+        self.assertEqual(server.connections, 2)
+
+        # the connections are not kept from one commit to the next
+        frr.invalidate()
+        self.assertEqual(frr.execute('show version', daemon='bgpd'), 'show version')
+        self.assertEqual(server.connections, 3)
+
+    def test_vty_timeout(self):
+        released = threading.Event()
+        self.addCleanup(released.set)
+
+        def answer(daemon, command):
+            if command == 'slow':
+                released.wait(timeout=5)
+            return 0, command
+
+        server = self.vty(answer)
+        frr._pool = frr.VtyPool(timeout=0.5)
+        self.assertEqual(frr.execute('show version', daemon='bgpd'), 'show version')
+
+        # the command may have been run, it is not run again
+        with self.assertRaises(OSError):
+            frr.execute('slow', daemon='bgpd')
+        self.assertEqual([_ for d, _ in server.commands if d == 'bgpd'].count('slow'), 1)
+        self.assertEqual(server.connections, 1)
+
+    def test_vty_concurrent(self):
+        barrier = threading.Barrier(2)
+
+        def answer(daemon, command):
+            if command != 'enable':
+                barrier.wait(timeout=5)
+            return 0, f'{daemon} {command}'
+
+        server = self.vty(answer)
+        results = []
+
+        def run():
+            results.append(frr.execute('show version', daemon='zebra'))
+
+        # the two commands are only answered when run at the same time
+        threads = [threading.Thread(target=run) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ['zebra show version'] * 2)
+        self.assertEqual(server.connections, 2)
+
+    def test_cache(self):
+        def answer(daemon, command):
+            if command == 'show running-config':
+                return 0, '\n'.join(running)
+            return 0, ''
+
+        server = self.vty(answer)
+        cache = frr._cache
+        frr._cache = frr.ConfigCache()
+        self.addCleanup(setattr, frr, '_cache', cache)
+
+        def shows():
+            return server.commands.count(('bgpd', 'show running-config'))
+
+        first = FRRConfig()
+        first.load_configuration('bgpd')
+        first.modify_section(r'^route-map .*')
+        self.assertEqual(first.commit_configuration('bgpd')['method'], 'delta')
+
+        # the configuration committed is used without reading it again
+        second = FRRConfig()
+        second.load_configuration('bgpd')
+        self.assertEqual(second.config, first.config)
+        self.assertEqual(shows(), 1)
+        self.assertEqual(frr.cache_statistics(), {'hits': 1, 'misses': 1})
+
+        # changed since second was loaded, so what it commits is not kept
+        frr.configure(['hostname router'], daemon='bgpd')
+        second.add_before('^line vty', ['ip route 0.0.0.0/0 192.0.2.254'])
+        second.commit_configuration('bgpd')
+        FRRConfig().load_configuration('bgpd')
+        self.assertEqual(shows(), 2)
+
+        frr.invalidate()
+        FRRConfig().load_configuration('bgpd')
+        FRRConfig().load_configuration('zebra')
+        self.assertEqual(frr.cache_statistics(), {'hits': 0, 'misses': 2})
+
+        # changed with vtysh by a conf_mode script
+        frr.changed('bgpd')
+        FRRConfig().load_configuration('bgpd')
+        FRRConfig().load_configuration('zebra')
+        self.assertEqual(frr.cache_statistics(), {'hits': 1, 'misses': 3})
+
+    def test_cache_changed_all(self):
+        hostname = ['router']
+
+        def answer(daemon, command):
+            if command == 'show running-config':
+                return 0, f'hostname {hostname[0]}'
+            return 0, ''
+
+        self.vty(answer)
+        cache = frr.ConfigCache()
+        self.assertEqual(cache.get('bgpd'), (0, ('hostname router',)))
+
+        # the integrated configuration was changed, bgpd is read again
+        hostname[0] = 'other'
+        cache.changed(None)
+        self.assertEqual(cache.get('bgpd'), (1, ('hostname other',)))
+        self.assertEqual(cache.statistics(), {'hits': 0, 'misses': 2})
+
+    def test_vty_unavailable(self):
+        # vtysh is used without the socket of the daemon
+        self.vty(lambda daemon, command: (0, ''), daemons=['zebra'])
+        vtysh = frr.path_vtysh
+        try:
+            frr.path_vtysh = '/bin/echo'
+            self.assertEqual(frr.execute('show version', daemon='bgpd'), '-c show version -d bgpd')
+        finally:
+            frr.path_vtysh = vtysh
+
+    @staticmethod
+    def legacy(config, start_pattern, replacement, count=0):
+        # the result of modify_section going through the lines
+        import re
+        if isinstance(replacement, str):
+            replacement = replacement.split('\n')
+        config = list(config)
+        _count = 0
+        _next = 0
+        while not count or _count < count:
+            start = None
+            for i in range(_next, len(config)):
+                if start is None:
+                    if re.match(start_pattern + '$', config[i]):
+                        start = i
+                    continue
+                if re.match(r'\S+', config[i]):
+                    break
+            else:
+                break
+            config[start:i] = replacement
+            _count += 1
+            _next = start + len(replacement)
+        return _count, config
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+#
+# Copyright (C) 2021 VyOS maintainers and contributors
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 or later as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import errno
+
+from unittest import TestCase
+from vyos import netlink
+
+class TestVyOSNetlink(TestCase):
+    def test_attrs(self):
+        data = netlink.attr(netlink.IFLA_IFNAME, b'eth0\0')
+        data += netlink.attr(netlink.IFLA_MTU, b'\xdc\x05\0\0')
+        data += netlink.attr(netlink.IFLA_PROTINFO | netlink.NLA_F_NESTED, b'')
+        # attributes are aligned on 4 bytes
+        self.assertEqual(len(data), 12 + 8 + 4)
+        self.assertEqual(netlink.attrs(data), {
+            netlink.IFLA_IFNAME: b'eth0\0',
+            netlink.IFLA_MTU: b'\xdc\x05\0\0',
+            netlink.IFLA_PROTINFO: b'',
+        })
+
+    def test_get_link(self):
+        link = netlink.get_link('lo')
+        self.assertEqual(link['ifname'], 'lo')
+        self.assertIn('LOOPBACK', link['flags'])
+        self.assertIn('lo', [_['ifname'] for _ in netlink.get_links()])
+        self.assertIn('127.0.0.1', [_['local'] for _ in netlink.get_addrs('lo')])
+
+        with self.assertRaises(netlink.NetlinkError) as e:
+            netlink.get_link('vyos-missing0')
+        self.assertEqual(e.exception.errno, errno.ENODEV)
+
+    def test_snapshot(self):
+        snapshot = netlink.Snapshot()
+        self.assertEqual(snapshot.link('lo')['ifname'], 'lo')
+        self.assertIn('lo', snapshot.ifnames())
+        self.assertIn(8, [_['prefixlen'] for _ in snapshot.addrs('lo')])
+
+        snapshot.invalidate('lo')
+        self.assertEqual(snapshot.link('lo'), netlink.get_link('lo'))
+
+        with self.assertRaises(netlink.NetlinkError):
+            snapshot.link('vyos-missing0')
+
+    def test_get_stats(self):
+        stats = netlink.get_stats('lo')
+        with open('/sys/class/net/lo/statistics/rx_errors') as f:
+            self.assertEqual(stats['rx_errors'], int(f.read()))
+        self.assertIn('tx_carrier_errors', stats)
+        index = netlink.get_link('lo')['ifindex']
+        self.assertGreaterEqual(netlink.get_stats()[index]['rx_packets'], stats['rx_packets'])
+
+    def test_bridge_vlans(self):
+        pvid = netlink.BRIDGE_VLAN_INFO_PVID | netlink.BRIDGE_VLAN_INFO_UNTAGGED
+        # a trunk port with every VLAN allowed and a native VLAN
+        trunk = {vid: 0 for vid in range(1, 4095)}
+        trunk[100] = pvid
+        ranges = netlink.vlan_ranges(trunk)
+        self.assertEqual(ranges, [(1, 99, 0), (100, 100, pvid), (101, 4094, 0)])
+
+        # what the kernel would send back in a dump
+        body = netlink._ifinfomsg.pack(netlink.AF_BRIDGE, 0, 1, 0, 0)
+        body += netlink.attr(netlink.IFLA_IFNAME, b'eth1\0')
+        body += netlink.attr(netlink.IFLA_AF_SPEC | netlink.NLA_F_NESTED,
+                             netlink._vlan_infos(ranges))
+        # 5 entries (two ranges and the pvid) rather than 4094
+        self.assertEqual(len(body), netlink._ifinfomsg.size + 12 + 4 + 5 * 8)
+        self.assertEqual(netlink._bridge_vlans(body), ('eth1', trunk))
+
+    def test_change_addrs(self):
+        if os.geteuid():
+            self.skipTest('changing addresses requires root')
+        addrs = [('lo', f'198.51.100.{_}/32') for _ in range(1, 255)]
+        try:
+            netlink.change_addrs(add=addrs)
+            assigned = [_['local'] for _ in netlink.get_addrs('lo')]
+            self.assertIn('198.51.100.254', assigned)
+            # the addresses which can be changed still are
+            with self.assertRaises(netlink.NetlinkError):
+                netlink.change_addrs(delete=addrs[:10], add=addrs[10:11])
+            self.assertNotIn('198.51.100.2', [_['local'] for _ in netlink.get_addrs('lo')])
+        finally:
+            netlink.change_addrs(delete=addrs)
+        self.assertNotIn('198.51.100.254', [_['local'] for _ in netlink.get_addrs('lo')])
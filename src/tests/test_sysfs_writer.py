@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+#
+# Copyright (C) 2021 VyOS maintainers and contributors
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 or later as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import tempfile
+
+from unittest import TestCase
+from vyos.ifconfig.control import SysfsWriter
+
+class TestSysfsWriter(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.forwarding = os.path.join(directory.name, 'forwarding')
+        self.mtu = os.path.join(directory.name, 'mtu')
+        for filename, value in ((self.forwarding, '1\n'), (self.mtu, '1500\n')):
+            with open(filename, 'w') as f:
+                f.write(value)
+
+    def read(self, filename):
+        with open(filename) as f:
+            return f.read()
+
+    def test_batch(self):
+        writer = SysfsWriter()
+        with writer.batch():
+            writer.write(self.forwarding, 0)
+            with writer.batch():
+                writer.write(self.mtu, 1500)
+                writer.write(self.forwarding, 1)
+            # nothing is written until the outermost batch ends
+            self.assertEqual(writer.pending(self.forwarding), '1')
+            self.assertEqual(writer.written, 0)
+        # the last value written wins, and the files holding it are skipped
+        self.assertIsNone(writer.pending(self.forwarding))
+        self.assertEqual((writer.written, writer.skipped), (0, 2))
+
+        writer.write(self.mtu, 9000)
+        self.assertEqual(self.read(self.mtu), '9000')
+        self.assertEqual(writer.written, 1)
+
+    def test_batch_error(self):
+        writer = SysfsWriter()
+        with self.assertRaises(ValueError):
+            with writer.batch():
+                writer.write(self.forwarding, 0)
+                raise ValueError('invalid MTU')
+        self.assertIsNone(writer.pending(self.forwarding))
+
+        # the writes of the failed batch are not done by the next one
+        with writer.batch():
+            writer.write(self.mtu, 9000)
+        self.assertEqual(self.read(self.forwarding), '1\n')
+        self.assertEqual(self.read(self.mtu), '9000')
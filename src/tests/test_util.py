@@ -16,6 +16,7 @@
 
 from unittest import TestCase
 from vyos.util import mangle_dict_keys
+from vyos.util import CopyOnWriteDict
 
 class TestVyOSUtil(TestCase):
     def test_key_mangline(self):
@@ -24,3 +25,23 @@ class TestVyOSUtil(TestCase):
         new_data = mangle_dict_keys(data, '-', '_')
         self.assertEqual(new_data, expected_data)
 
+    def test_copy_on_write(self):
+        data = {'address': ['192.0.2.1/24'], 'vif': {'10': {'mtu': '1500'}}}
+        cow = CopyOnWriteDict(data)
+        cow['vif']['10']['mtu'] = '9000'
+        cow['address'].append('192.0.2.2/24')
+        cow.setdefault('vif_s', {})['20'] = {}
+        for vif, vif_config in cow['vif'].items():
+            vif_config['ifname'] = f'eth0.{vif}'
+
+        self.assertEqual(data, {'address': ['192.0.2.1/24'], 'vif': {'10': {'mtu': '1500'}}})
+        self.assertEqual(cow, {'address': ['192.0.2.1/24', '192.0.2.2/24'],
+                               'vif': {'10': {'mtu': '9000', 'ifname': 'eth0.10'}},
+                               'vif_s': {'20': {}}})
+
+    def test_copy_on_write_unpack(self):
+        data = {'address': ['192.0.2.1/24'], 'vif': {'10': {'mtu': '1500'}}}
+        for copy in ({**CopyOnWriteDict(data)}, dict(CopyOnWriteDict(data))):
+            copy['vif']['10']['mtu'] = '9000'
+            copy['address'].append('192.0.2.2/24')
+        self.assertEqual(data, {'address': ['192.0.2.1/24'], 'vif': {'10': {'mtu': '1500'}}})